@@ -13,6 +13,11 @@ import sys
 from ml_models import TrafficPredictor
 from weather_api import WeatherAPI
 from data_generator import generate_traffic_dataset
+from traffic_dataset import load_traffic_data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from maps_service import MapsService
+from road_graph import RoadGraph
+from route_timing import best_departures
 
 st.set_page_config(
     page_title="Smart Traffic Flow Predictor",
@@ -64,36 +69,45 @@ def load_and_prepare_data():
         st.info("Generating traffic dataset...")
         df = generate_traffic_dataset(5000)
         df.to_csv('traffic_data.csv', index=False)
-    else:
-        df = pd.read_csv('traffic_data.csv')
-    return df
+    return load_traffic_data('traffic_data.csv')
 
 @st.cache_resource
 def initialize_predictor():
     """Initialize and train the predictor"""
-    predictor = TrafficPredictor()
+    predictor = TrafficPredictor(fast_inference=True)
     
     if not predictor.load_models():
         st.info("Training ML models... This may take a moment.")
         predictor.load_data('traffic_data.csv')
         predictor.train_all_models()
-        predictor.save_models()
     
     return predictor
 
+@st.cache_resource
+def get_weather_api():
+    """One weather client (and cache) shared across reruns and sessions"""
+    return WeatherAPI(os.environ.get('OPENWEATHER_API_KEY'))
+
+@st.cache_resource
+def get_maps_service():
+    """Offline router over the same road graph as the API (TRAFFIC_ROAD_GRAPH or a synthetic city)"""
+    graph_path = os.environ.get('TRAFFIC_ROAD_GRAPH')
+    graph = RoadGraph.load_any(graph_path) if graph_path else RoadGraph.synthetic_city()
+    return MapsService(road_graph=graph)
+
 def main():
     st.markdown('<h1 class="main-header"> Smart Local Traffic Flow Predictor</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">AI-Powered Route Optimization & Traffic Prediction System</p>', unsafe_allow_html=True)
     
     df = load_and_prepare_data()
     predictor = initialize_predictor()
-    weather_api = WeatherAPI()
+    weather_api = get_weather_api()
     
     st.sidebar.title(" Control Panel")
     
     page = st.sidebar.selectbox(
         "Choose Function",
-        [" Live Prediction", " Model Analysis", " Data Insights", " Route Comparison"]
+        [" Live Prediction", " Model Analysis", " Data Insights", " Route Comparison", " Best Departure"]
     )
     
     if page == " Live Prediction":
@@ -104,6 +118,8 @@ def main():
         show_data_insights(df)
     elif page == " Route Comparison":
         show_route_comparison(predictor, weather_api)
+    elif page == " Best Departure":
+        show_best_departure(predictor, weather_api)
 
 def show_live_prediction(predictor, weather_api):
     st.header(" Real-Time Traffic Prediction")
@@ -391,26 +407,29 @@ def show_route_comparison(predictor, weather_api):
     with col2:
         st.subheader(" Route Analysis")
         
+        day_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(scenario_day)
+        is_weekend = 1 if day_of_week >= 5 else 0
+        rush_hour = 1 if (7 <= scenario_hour <= 9) or (17 <= scenario_hour <= 19) else 0
+        
+        scenarios = [{
+            'hour': scenario_hour,
+            'day_of_week': day_of_week,
+            'is_weekend': is_weekend,
+            'rain_intensity': scenario_rain,
+            'temperature': weather_data['temperature'],
+            'humidity': weather_data['humidity'],
+            'event_flag': 1 if scenario_event else 0,
+            'rush_hour': rush_hour,
+            'avg_speed': route["base_speed"] * (1 - scenario_rain * 0.3)
+        } for route in routes]
+        
+        base_predictions = predictor.predict_traffic_batch(scenarios)
+        
         route_results = []
         
-        for route in routes:
-            day_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(scenario_day)
-            is_weekend = 1 if day_of_week >= 5 else 0
-            rush_hour = 1 if (7 <= scenario_hour <= 9) or (17 <= scenario_hour <= 19) else 0
-            
-            adjusted_speed = route["base_speed"] * (1 - scenario_rain * 0.3)
-            
-            predicted_traffic = predictor.predict_traffic(
-                hour=scenario_hour,
-                day_of_week=day_of_week,
-                is_weekend=is_weekend,
-                rain_intensity=scenario_rain,
-                temperature=weather_data['temperature'],
-                humidity=weather_data['humidity'],
-                event_flag=1 if scenario_event else 0,
-                rush_hour=rush_hour,
-                avg_speed=adjusted_speed
-            ) * route["traffic_factor"]
+        for route, scenario, base_prediction in zip(routes, scenarios, base_predictions):
+            adjusted_speed = scenario['avg_speed']
+            predicted_traffic = base_prediction * route["traffic_factor"]
             
             route_score = predictor.calculate_route_score(
                 predicted_traffic=predicted_traffic,
@@ -435,31 +454,28 @@ def show_route_comparison(predictor, weather_api):
     
     st.subheader(" Traffic Prediction Throughout the Day")
     
-    hourly_predictions = []
-    for hour in range(24):
-        day_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(scenario_day)
-        is_weekend = 1 if day_of_week >= 5 else 0
-        rush_hour = 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0
-        
-        traffic_pred = predictor.predict_traffic(
-            hour=hour,
-            day_of_week=day_of_week,
-            is_weekend=is_weekend,
-            rain_intensity=scenario_rain,
-            temperature=weather_data['temperature'],
-            humidity=weather_data['humidity'],
-            event_flag=1 if scenario_event else 0,
-            rush_hour=rush_hour,
-            avg_speed=35
-        )
-        
-        hourly_predictions.append({
-            'Hour': hour,
-            'Traffic Flow': traffic_pred,
-            'Period': 'Rush Hour' if rush_hour else 'Normal'
-        })
-    
-    hourly_df = pd.DataFrame(hourly_predictions)
+    day_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(scenario_day)
+    is_weekend = 1 if day_of_week >= 5 else 0
+    hours = np.arange(24)
+    rush_hours = (((hours >= 7) & (hours <= 9)) | ((hours >= 17) & (hours <= 19))).astype(int)
+    
+    hourly_features = pd.DataFrame({
+        'hour': hours,
+        'day_of_week': day_of_week,
+        'is_weekend': is_weekend,
+        'rain_intensity': scenario_rain,
+        'temperature': weather_data['temperature'],
+        'humidity': weather_data['humidity'],
+        'event_flag': 1 if scenario_event else 0,
+        'rush_hour': rush_hours,
+        'avg_speed': 35
+    })
+    
+    hourly_df = pd.DataFrame({
+        'Hour': hours,
+        'Traffic Flow': predictor.predict_traffic_batch(hourly_features),
+        'Period': np.where(rush_hours == 1, 'Rush Hour', 'Normal')
+    })
     
     fig_hourly = px.line(
         hourly_df, 
@@ -474,5 +490,53 @@ def show_route_comparison(predictor, weather_api):
     
     st.plotly_chart(fig_hourly, use_container_width=True)
 
+def show_best_departure(predictor, weather_api):
+    st.header(" Best Time to Leave")
+    
+    weather_data = weather_api.get_weather_data()
+    now = datetime.now().replace(second=0, microsecond=0)
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader(" Trip")
+        origin = st.text_input("From", "Koramangala")
+        destination = st.text_input("To", "Hebbal")
+        window_date = st.date_input("Date", now.date())
+        window_time = st.time_input("Leave no earlier than", now.time())
+        window_hours = st.slider("Window (hours)", 1, 24, 4)
+        step_minutes = st.radio("Resolution (minutes)", [5, 15], index=1, horizontal=True)
+        event_flag = st.checkbox("Special Event", False, key="departure_event")
+    
+    window_start = datetime.combine(window_date, window_time)
+    weather = {key: weather_data[key] for key in ('rain_intensity', 'temperature', 'humidity')}
+    routes = get_maps_service().get_routes(origin, destination, window_start)
+    result = best_departures(predictor, routes, window_start, window_hours * 60, step_minutes,
+                             weather, 1 if event_flag else 0)
+    
+    with col2:
+        st.subheader(" Recommended Departures")
+        best = result['best']
+        if best:
+            st.success(f" **Leave at {best[0]['departure_time'][11:]}** via {best[0]['route']} "
+                       f"- {best[0]['duration']}, arriving {best[0]['arrival_time'][11:]}")
+            st.dataframe(pd.DataFrame([{
+                'Leave': slot['departure_time'][11:],
+                'Arrive': slot['arrival_time'][11:],
+                'Route': slot['route'],
+                'Travel Time': slot['duration'],
+                'Route Score': slot['score']
+            } for slot in best]), use_container_width=True)
+    
+    if result['departures']:
+        grid_df = pd.DataFrame(np.array(result['duration_s']) / 60, columns=result['routes'])
+        grid_df['Departure'] = pd.to_datetime(result['departures'])
+        fig = px.line(
+            grid_df.melt(id_vars='Departure', var_name='Route', value_name='Travel Time (min)'),
+            x='Departure', y='Travel Time (min)', color='Route',
+            title=f"Predicted Travel Time by Departure ({step_minutes}-minute slots)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
 if __name__ == "__main__":
     main()
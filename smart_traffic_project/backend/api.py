@@ -1,66 +1,198 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+import time
+from datetime import datetime, timedelta
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
 
-from ml_models import TrafficPredictor
+from ml_models import TrafficPredictor, FEATURE_COLUMNS, DEFAULT_LATTICE_TOLERANCE
 from weather_api import WeatherAPI
 from maps_service import MapsService
+from model_reloader import ModelReloader
+from model_registry import ModelRegistry
+from online_learning import ObservationLog, OnlineLearner, OBSERVATION_DTYPE
+from road_graph import RoadGraph
+from route_timing import estimate_route_times, best_departures
+from traffic_forecast import TrafficForecaster
+from inference_scheduler import InferenceScheduler, QueueFull, InferenceTimeout
+from inference_pool import InferencePool
+import batch_formats
 import pandas as pd
 import numpy as np
 
 app = Flask(__name__)
 CORS(app)
 
+# Defaults applied to any feature missing from a prediction request
+DEFAULT_FEATURES = {
+    'hour': 8, 'day_of_week': 1, 'is_weekend': 0, 'rain_intensity': 0.0,
+    'temperature': 25, 'humidity': 60, 'event_flag': 0, 'rush_hour': 0, 'avg_speed': 35
+}
+
 # Initialize services
-predictor = TrafficPredictor()
-weather_api = WeatherAPI()
-maps_service = MapsService()
+PRIMARY_MODEL = os.environ.get('TRAFFIC_PRIMARY_MODEL', 'Random Forest')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 10))
+# Flask debugger and reloader for the development server; never on unless asked for
+DEBUG = os.environ.get('TRAFFIC_DEBUG') == '1'
+DATA_PATH = os.path.join(PROJECT_DIR, 'traffic_data.csv')
+# OSM extract (.osm/.osm.gz) or saved .npz graph; a synthetic city grid is used if unset
+ROAD_GRAPH_PATH = os.environ.get('TRAFFIC_ROAD_GRAPH')
+# Offline routes returned per request; 1 uses a single A* search instead of via-node alternatives
+ROUTE_ALTERNATIVES = int(os.environ.get('TRAFFIC_ROUTE_ALTERNATIVES', 3))
+# Departure optimizer: slot sizes (minutes) and the widest window searched
+DEPARTURE_STEPS = (5, 15)
+MAX_DEPARTURE_WINDOW = 24 * 60
+# Interpolated lattice lookups are opt-in, and only used if measured within the tolerance
+USE_LATTICE = os.environ.get('TRAFFIC_USE_LATTICE') == '1'
+LATTICE_TOLERANCE = float(os.environ.get('TRAFFIC_LATTICE_TOLERANCE', DEFAULT_LATTICE_TOLERANCE))
+# Micro-batching of single predictions: up to this many rows per model call (1 = off), optionally
+# lingering this long to fill a batch; a queued request gets a 503 after PREDICT_TIMEOUT seconds
+BATCH_MAX_SIZE = int(os.environ.get('TRAFFIC_BATCH_MAX_SIZE', 64))
+BATCH_MAX_WAIT_MS = float(os.environ.get('TRAFFIC_BATCH_MAX_WAIT_MS', 0))
+BATCH_MAX_QUEUE = int(os.environ.get('TRAFFIC_BATCH_MAX_QUEUE', 4096))
+PREDICT_TIMEOUT = float(os.environ.get('TRAFFIC_PREDICT_TIMEOUT', 10))
+# Worker processes for model evaluation (0 = evaluate in the serving process)
+INFERENCE_PROCESSES = int(os.environ.get('TRAFFIC_INFERENCE_PROCESSES', 0))
+OBSERVATIONS_PATH = os.environ.get('TRAFFIC_OBSERVATIONS_PATH', os.path.join(PROJECT_DIR, 'observations.bin'))
+
+inference_pool = InferencePool(INFERENCE_PROCESSES) if INFERENCE_PROCESSES else None
+
+def create_predictor():
+    return TrafficPredictor(fast_inference=True, use_lattice=USE_LATTICE, lattice_tolerance=LATTICE_TOLERANCE,
+                            primary_model=PRIMARY_MODEL, inference_pool=inference_pool)
+
+weather_api = WeatherAPI(os.environ.get('OPENWEATHER_API_KEY'))
+road_graph = RoadGraph.load_any(ROAD_GRAPH_PATH) if ROAD_GRAPH_PATH else RoadGraph.synthetic_city()
+
+def predicted_edge_weights(departure_time):
+    """Seconds per road-graph edge under the traffic predicted for departure_time"""
+    predictor = model_reloader.predictor
+    if predictor is None:
+        return road_graph.free_flow_times()
+    return road_graph.predicted_travel_times(predictor, departure_time, weather_api.get_weather_data())
+
+maps_service = MapsService(road_graph=road_graph, edge_weights=predicted_edge_weights,
+                           alternatives=ROUTE_ALTERNATIVES)
+model_registry = ModelRegistry()
 
-# Load models on startup
-try:
-    os.chdir('/Users/surjithsshetty/Desktop/aiml_CIE3/smart_traffic_project')
+def on_model_swap(predictor):
+    """Route durations were priced with the old model's edge weights"""
+    maps_service.clear_route_cache()
+
+model_reloader = ModelReloader(create_predictor, poll_interval=MODEL_WATCH_INTERVAL, on_swap=on_model_swap)
+retrain_lock = threading.Lock()
+# Created by start_background_services(), after the inference pool has forked
+observation_log = None
+online_learner = None
+forecaster = TrafficForecaster(lambda: model_reloader.predictor, weather_api)
+inference_scheduler = InferenceScheduler(lambda: model_reloader.predictor, max_batch_size=BATCH_MAX_SIZE,
+                                         max_wait=BATCH_MAX_WAIT_MS / 1000, max_queue=BATCH_MAX_QUEUE)
+
+# Set by backend/serve.py: background threads are started in each worker after fork
+PREFORK = os.environ.get('TRAFFIC_PREFORK') == '1'
+
+def load_active_model():
+    """Load the latest models (training them if there are none) and make them active"""
+    global predictor
+    predictor = create_predictor()
     if not predictor.load_models():
         print("Training models...")
-        predictor.load_data('traffic_data.csv')
+        predictor.load_data(DATA_PATH)
         predictor.train_models()
         predictor.save_models()
-    print("Models loaded successfully!")
-except Exception as e:
-    print(f"Error loading models: {e}")
+    model_reloader.activate(predictor)
+
+def start_background_services():
+    global observation_log, online_learner
+    if inference_pool is not None:
+        inference_pool.start()
+    observation_log = ObservationLog(OBSERVATIONS_PATH)
+    online_learner = OnlineLearner(observation_log, lambda: model_reloader.predictor)
+    model_reloader.start_watching()
+    online_learner.start()
+
+def after_fork():
+    """Give a pre-forked worker its own threads and file handles"""
+    model_reloader.after_fork()
+    inference_scheduler.after_fork()
+    if inference_pool is not None:
+        inference_pool.after_fork()
+    start_background_services()
+
+def startup():
+    """Load models on startup and, unless pre-forking, start the background services"""
+    try:
+        # Start the inference workers while this process is still single-threaded
+        if inference_pool is not None and not PREFORK:
+            inference_pool.start()
+        load_active_model()
+        if not PREFORK:
+            start_background_services()
+        print("Models loaded successfully!")
+    except Exception as e:
+        print(f"Error loading models: {e}")
+
+# Not while a multiprocessing child (e.g. an inference worker) re-imports the entry script:
+# multiprocessing aliases __mp_main__ to __main__, except during that import
+if sys.modules.get('__mp_main__', sys.modules['__main__']) is sys.modules['__main__']:
+    startup()
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and answering"""
+    return jsonify({'success': True, 'pid': os.getpid()})
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness: only passes once a warmed-up model is active"""
+    current = model_reloader.predictor
+    status = {'pid': os.getpid(), 'model_version': current.model_version if current else None}
+    if current is None:
+        return jsonify({'success': False, 'error': 'Model not loaded', **status}), 503
+    return jsonify({'success': True, **status})
 
 @app.route('/api/predict', methods=['POST'])
 def predict_traffic():
     try:
         data = request.json
+        if BATCH_MAX_SIZE > 1:
+            # Queued with concurrent requests and answered by one batched model call
+            predicted_traffic = inference_scheduler.predict(feature_row(data), PREDICT_TIMEOUT)
+        else:
+            predicted_traffic = predict_single(feature_row(data))
+        return jsonify(predict_result(model_reloader.predictor, data, predicted_traffic))
+    except (QueueFull, InferenceTimeout) as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_traffic_batch():
+    try:
+        # Binary bodies are answered in the same format; JSON stays the default
+        if request.mimetype in batch_formats.content_types():
+            body = binary_batch_result(model_reloader.predictor, request.get_data(), request.mimetype)
+            return Response(body, mimetype=request.mimetype)
+        return jsonify(batch_result(model_reloader.predictor, request.json.get('scenarios', [])))
         
-        predicted_traffic = predictor.predict_traffic(
-            data.get('hour', 8), data.get('day_of_week', 1), data.get('is_weekend', 0),
-            data.get('rain_intensity', 0.0), data.get('temperature', 25), data.get('humidity', 60),
-            data.get('event_flag', 0), data.get('rush_hour', 0), data.get('avg_speed', 35)
-        )
-        
-        route_score = predictor.calculate_route_score(
-            predicted_traffic, data.get('avg_speed', 35), 
-            data.get('rain_intensity', 0.0), 0.3 if data.get('event_flag', 0) else 0.0
-        )
-        
-        traffic_level = get_traffic_level(predicted_traffic)
-        recommendations = get_recommendations(route_score, data.get('rain_intensity', 0), 
-                                           data.get('rush_hour', 0), data.get('event_flag', 0))
-        
-        return jsonify({
-            'success': True,
-            'predicted_traffic': round(predicted_traffic, 0),
-            'route_score': round(route_score, 1),
-            'traffic_level': traffic_level,
-            'recommendations': recommendations
-        })
-        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/predict/cache', methods=['GET'])
+def get_prediction_cache_stats():
+    cache = model_reloader.predictor.prediction_cache
+    return jsonify({'success': True, 'enabled': cache is not None,
+                    'stats': cache.stats() if cache is not None else {}})
+
+@app.route('/api/predict/scheduler', methods=['GET'])
+def get_scheduler_stats():
+    return jsonify({'success': True, 'stats': inference_scheduler.metrics()})
+
 @app.route('/api/weather', methods=['GET'])
 def get_weather():
     try:
@@ -70,82 +202,351 @@ def get_weather():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/weather/cache', methods=['GET'])
+def get_weather_cache_stats():
+    return jsonify({'success': True, 'stats': weather_api.metrics()})
+
+@app.route('/api/forecast', methods=['GET'])
+def get_forecast():
+    try:
+        start = request.args.get('start')
+        forecast = forecaster.forecast(
+            datetime.fromisoformat(start) if start else datetime.now(),
+            days=request.args.get('days', 3, type=int),
+            step_minutes=request.args.get('step_minutes', 60, type=int),
+            avg_speed=request.args.get('avg_speed', DEFAULT_FEATURES['avg_speed'], type=float),
+            event_flag=request.args.get('event_flag', 0, type=int),
+            city=request.args.get('city')
+        )
+        return jsonify({'success': True, 'forecast': forecast})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/forecast/cache', methods=['GET'])
+def get_forecast_cache_stats():
+    return jsonify({'success': True, 'stats': forecaster.cache_stats()})
+
 @app.route('/api/models', methods=['GET'])
 def get_model_performance():
     try:
-        predictor.load_data('traffic_data.csv')
-        results = predictor.train_models()
+        result = model_performance(model_reloader.predictor)
+        if result is None:
+            return jsonify({
+                'success': False,
+                'error': 'No model metrics available. Retrain via POST /api/models/retrain'
+            }), 503
+        return jsonify(result)
         
-        model_data = []
-        for name, metrics in results.items():
-            model_data.append({
-                'name': name,
-                'mae': round(metrics['MAE'], 2),
-                'rmse': round(metrics['RMSE'], 2),
-                'r2': round(metrics['R2'], 4),
-                'accuracy': round(metrics['R2'] * 100, 1)
-            })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/models/retrain', methods=['POST'])
+def retrain_models():
+    if not retrain_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'Retraining already in progress'}), 409
+    
+    try:
+        return jsonify(retrain())
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        retrain_lock.release()
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_models():
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    
+    if version is not None:
+        if version not in model_registry.versions():
+            return jsonify({'success': False, 'error': f'Unknown model version {version}'}), 404
+    
+    # Point LATEST at the requested version so the watcher (and other workers) follow it,
+    # but only once this reload is claimed
+    pin_latest = (lambda: model_registry.set_latest(version)) if version is not None else None
+    if not model_reloader.reload(version, before_load=pin_latest):
+        return jsonify({'success': False, 'error': 'Reload already in progress',
+                        'status': model_reloader.status()}), 409
+    return jsonify({'success': True, 'status': model_reloader.status()}), 202
+
+@app.route('/api/models/status', methods=['GET'])
+def get_model_status():
+    return jsonify({'success': True, 'status': model_reloader.status(),
+                    'inference_pool': inference_pool.status() if inference_pool is not None else None})
+
+@app.route('/api/observations', methods=['POST'])
+def add_observations():
+    if observation_log is None:
+        return jsonify({'success': False, 'error': 'Observation log not started'}), 503
+    try:
+        data = request.json
+        records = observation_records(model_reloader.predictor, data.get('observations', []))
         
-        feature_importance = predictor.get_feature_importance()
-        features = feature_importance.to_dict('records') if feature_importance is not None else []
+        # Returns once the records are durable; the online model catches up in the background
+        observation_log.append(records)
         
-        return jsonify({
-            'success': True,
-            'models': model_data,
-            'feature_importance': features
-        })
+        return jsonify({'success': True, 'accepted': len(records),
+                        'status': online_learner.status()}), 202
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/observations/status', methods=['GET'])
+def get_observation_status():
+    if online_learner is None:
+        return jsonify({'success': False, 'error': 'Observation log not started'}), 503
+    return jsonify({'success': True, 'status': observation_status()})
+
+@app.route('/api/routes/cache', methods=['GET'])
+def get_route_cache_stats():
+    return jsonify({'success': True, 'stats': maps_service.cache_stats()})
+
 @app.route('/api/routes', methods=['POST'])
 def get_routes():
     try:
         data = request.json
-        origin = data.get('origin', 'Bangalore')
-        destination = data.get('destination', 'Mysore')
+        departure_time = parse_departure_time(data)
         
-        routes = maps_service.get_routes(origin, destination)
+        # Directions and both geocodes run concurrently; repeats are served from cache
+        trip = maps_service.plan_trip(data.get('origin', 'Bangalore'), data.get('destination', 'Mysore'),
+                                      departure_time)
+        return jsonify(route_results(model_reloader.predictor, trip, data, departure_time))
         
-        route_results = []
-        for route in routes:
-            adjusted_speed = route.get('base_speed', 40) * (1 - data.get('rain_intensity', 0) * 0.3)
-            
-            predicted_traffic = predictor.predict_traffic(
-                data.get('hour', 8), data.get('day_of_week', 1), data.get('is_weekend', 0),
-                data.get('rain_intensity', 0), data.get('temperature', 25), data.get('humidity', 60),
-                data.get('event_flag', 0), data.get('rush_hour', 0), adjusted_speed
-            ) * route.get('traffic_factor', 1.0)
-            
-            route_score = predictor.calculate_route_score(
-                predicted_traffic, adjusted_speed, data.get('rain_intensity', 0),
-                0.3 if data.get('event_flag', 0) else 0.0
-            )
-            
-            route_results.append({
-                'name': route['name'],
-                'distance': route['distance'],
-                'duration': route['duration'],
-                'traffic': round(predicted_traffic, 0),
-                'speed': round(adjusted_speed, 1),
-                'score': round(route_score, 1),
-                'polyline': route.get('polyline', ''),
-                'steps': route.get('steps', [])
-            })
-        
-        best_route = max(route_results, key=lambda x: x['score'])
-        
-        return jsonify({
-            'success': True, 
-            'routes': route_results,
-            'best_route': best_route,
-            'origin': origin,
-            'destination': destination
-        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/best-departure', methods=['POST'])
+def get_best_departure():
+    try:
+        start = time.perf_counter()
+        data = request.json
+        window_start, window_minutes, step_minutes = parse_departure_window(data)
+        routes = maps_service.get_routes(data.get('origin', 'Bangalore'), data.get('destination', 'Mysore'),
+                                         window_start)
+        return jsonify(best_departure_result(model_reloader.predictor, routes, data, window_start,
+                                             window_minutes, step_minutes, start))
         
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Request handling shared by this app and the asyncio port in async_api.py
+
+def feature_row(data):
+    """A prediction request's features in model column order, defaults filled in"""
+    return np.array([data.get(col, DEFAULT_FEATURES[col]) for col in FEATURE_COLUMNS], dtype=np.float64)
+
+def predict_result(predictor, data, predicted_traffic):
+    if data.get('online') and online_learner is not None:
+        # Add the correction learned from streamed observations
+        X = feature_row(data)[np.newaxis]
+        predicted_traffic = float(online_learner.predict(predictor, X, np.array([predicted_traffic]))[0])
+    
+    route_score = predictor.calculate_route_score(
+        predicted_traffic, data.get('avg_speed', 35), 
+        data.get('rain_intensity', 0.0), 0.3 if data.get('event_flag', 0) else 0.0
+    )
+    
+    return {
+        'success': True,
+        'predicted_traffic': round(predicted_traffic, 0),
+        'route_score': round(route_score, 1),
+        'traffic_level': get_traffic_level(predicted_traffic),
+        'recommendations': get_recommendations(route_score, data.get('rain_intensity', 0), 
+                                               data.get('rush_hour', 0), data.get('event_flag', 0))
+    }
+
+def batch_result(predictor, scenarios):
+    if scenarios and isinstance(scenarios[0], dict):
+        scenarios = [{**DEFAULT_FEATURES, **scenario} for scenario in scenarios]
+    
+    predictions, route_scores = predictor.score_traffic_batch(scenarios)
+    
+    return {
+        'success': True,
+        'count': int(len(predictions)),
+        'features': FEATURE_COLUMNS,
+        'predicted_traffic': np.round(predictions, 0).tolist(),
+        'route_score': np.round(route_scores, 1).tolist()
+    }
+
+def predict_single(row):
+    """One prediction straight from the model, without the batching scheduler"""
+    return float(model_reloader.predictor.predict_traffic_batch(row[None])[0])
+
+def binary_batch_result(predictor, data, content_type):
+    """Score a raw float32 or Arrow batch body and encode the results the same way"""
+    names, X = batch_formats.decode(data, content_type)
+    missing = [col for col in FEATURE_COLUMNS if col not in names]
+    if missing:
+        raise ValueError(f"Missing feature: {', '.join(missing)}")
+    if names != FEATURE_COLUMNS:
+        X = X[:, [names.index(col) for col in FEATURE_COLUMNS]]
+    
+    predictions, route_scores = predictor.score_traffic_batch(X)
+    results = np.column_stack([np.round(predictions, 0), np.round(route_scores, 1)])
+    return batch_formats.encode(['predicted_traffic', 'route_score'], results, content_type)
+
+def model_performance(predictor):
+    """Metrics saved with the active model (nothing is retrained), or None if it has none"""
+    results = predictor.results
+    if not results:
+        return None
+    
+    model_data = []
+    for name, metrics in results.items():
+        model_data.append({
+            'name': name,
+            'mae': round(metrics['MAE'], 2),
+            'rmse': round(metrics['RMSE'], 2),
+            'r2': round(metrics['R2'], 4),
+            'accuracy': round(metrics['R2'] * 100, 1)
+        })
+    
+    return {
+        'success': True,
+        'models': model_data,
+        'feature_importance': predictor.metadata.get('feature_importance', []),
+        'primary_model': predictor.primary_model,
+        'trained_at': predictor.metadata.get('trained_at')
+    }
+
+def retrain():
+    """Train and publish a new model version; callers hold retrain_lock"""
+    # Train on a separate instance so in-flight predictions keep using the old models
+    current = model_reloader.predictor
+    new_predictor = create_predictor()
+    new_predictor.load_data(DATA_PATH)
+    new_predictor.train_models(rf_params=current.rf_params if current else None)
+    new_predictor.save_models()
+    model_reloader.activate(new_predictor)
+    return {'success': True, 'version': new_predictor.model_version,
+            'trained_at': new_predictor.metadata.get('trained_at')}
+
+def observation_records(predictor, observations):
+    """Observation dicts as OBSERVATION_DTYPE records; ValueError if any are incomplete"""
+    if isinstance(observations, dict):
+        observations = [observations]
+    if not observations:
+        raise ValueError('No observations given')
+    
+    X = predictor.to_feature_matrix(observations)
+    records = np.empty(len(observations), dtype=OBSERVATION_DTYPE)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        records[column] = X[:, i]
+    try:
+        records['traffic_flow'] = [row['traffic_flow'] for row in observations]
+    except KeyError:
+        raise ValueError('Missing traffic_flow')
+    
+    # observed_at may be epoch seconds or an ISO timestamp; defaults to now
+    now = pd.Timestamp.now(tz='UTC').timestamp()
+    records['observed_at'] = [
+        now if row.get('observed_at') is None
+        else float(row['observed_at']) if isinstance(row['observed_at'], (int, float))
+        else pd.Timestamp(row['observed_at']).timestamp()
+        for row in observations
+    ]
+    return records
+
+def observation_status():
+    status = online_learner.status()
+    
+    # Age of the batch-trained model relative to the newest observation
+    trained_at = model_reloader.predictor.metadata.get('trained_at')
+    latest = status['latest_observation_at']
+    status['model_trained_at'] = trained_at
+    status['model_staleness_seconds'] = (latest - pd.Timestamp(trained_at).to_pydatetime().timestamp()
+                                         if latest and trained_at else None)
+    return status
+
+def parse_departure_time(data):
+    return (datetime.fromisoformat(data['departure_time'])
+            if data.get('departure_time') else datetime.now())
+
+def route_results(predictor, trip, data, departure_time):
+    """Score a planned trip's routes from per-segment predictions"""
+    routes = trip['routes']
+    
+    # Every segment of every route in one model call, each at the hour it is reached
+    weather = {key: data[key] for key in ('rain_intensity', 'temperature', 'humidity') if key in data}
+    timings = estimate_route_times(predictor, routes, departure_time, weather, data.get('event_flag', 0))
+    
+    results = []
+    for route, timing in zip(routes, timings):
+        predicted_traffic = timing['predicted_traffic']
+        speed = timing['avg_speed_kmh']
+        
+        route_score = predictor.calculate_route_score(
+            predicted_traffic, speed, data.get('rain_intensity', 0),
+            0.3 if data.get('event_flag', 0) else 0.0
+        )
+        
+        results.append({
+            'name': route['name'],
+            'distance': route['distance'],
+            'duration': route['duration'],
+            'predicted_duration': f"{round(timing['duration_s'] / 60)} mins",
+            'predicted_duration_value': round(timing['duration_s']),
+            'free_flow_duration_value': round(timing['free_flow_s']),
+            'traffic': round(predicted_traffic, 0),
+            'speed': round(speed, 1),
+            'score': round(route_score, 1),
+            'segments': timing['segments'],
+            'polyline': route.get('polyline', ''),
+            'steps': route.get('steps', [])
+        })
+    
+    return {
+        'success': True, 
+        'routes': results,
+        'departure_time': departure_time.isoformat(timespec='minutes'),
+        'best_route': max(results, key=lambda x: x['score']),
+        'origin': data.get('origin', 'Bangalore'),
+        'destination': data.get('destination', 'Mysore'),
+        'origin_location': trip['origin_location'],
+        'destination_location': trip['destination_location']
+    }
+
+def parse_departure_window(data):
+    """(window_start, window_minutes, step_minutes) of a best-departure request"""
+    step_minutes = int(data.get('step_minutes', 15))
+    window_minutes = int(data.get('window_minutes', 120))
+    if step_minutes not in DEPARTURE_STEPS:
+        raise ValueError(f"step_minutes must be one of {DEPARTURE_STEPS}")
+    if not 0 <= window_minutes <= MAX_DEPARTURE_WINDOW:
+        raise ValueError(f"window_minutes must be between 0 and {MAX_DEPARTURE_WINDOW}")
+    if int(data.get('top', 5)) < 1:
+        raise ValueError("top must be at least 1")
+    
+    if data.get('window_start'):
+        window_start = datetime.fromisoformat(data['window_start'])
+    else:
+        # Next slot boundary from now
+        now = datetime.now().replace(second=0, microsecond=0)
+        window_start = now + timedelta(minutes=-now.minute % step_minutes)
+    return window_start, window_minutes, step_minutes
+
+def best_departure_result(predictor, routes, data, window_start, window_minutes, step_minutes, started):
+    weather = {key: data[key] for key in ('rain_intensity', 'temperature', 'humidity') if key in data}
+    
+    # Every slot x route x segment from one model call
+    result = best_departures(predictor, routes, window_start, window_minutes, step_minutes,
+                             weather, data.get('event_flag', 0), int(data.get('top', 5)))
+    return {
+        'success': True,
+        'origin': data.get('origin', 'Bangalore'),
+        'destination': data.get('destination', 'Mysore'),
+        'step_minutes': step_minutes,
+        **result,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
 def get_traffic_level(traffic):
     traffic = float(traffic)
     if traffic < 200:
@@ -172,4 +573,4 @@ def get_recommendations(score, rain, rush_hour, event):
     return recommendations
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    app.run(debug=DEBUG, port=5001)
\ No newline at end of file
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Asyncio port of the traffic API (FastAPI), with the same JSON contract as api.py
+
+    python backend/async_api.py                   # uvicorn on 0.0.0.0:5001
+    uvicorn async_api:app --app-dir backend --port 5001
+
+Request handlers never block the event loop: maps and weather calls are awaited as
+futures on I/O pools (so one request's directions and geocodes overlap), and model
+inference runs on a bounded executor. Models, caches and background services are the
+ones api.py sets up, so both apps behave identically; single predictions share its
+micro-batching scheduler.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Literal, Optional, Union
+
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+import api
+import batch_formats
+from inference_scheduler import QueueFull, InferenceTimeout
+
+# Inference is CPU-bound: one thread per core is enough to keep them busy
+INFERENCE_WORKERS = int(os.environ.get('TRAFFIC_INFERENCE_WORKERS', os.cpu_count() or 1))
+# Blocking maps calls waiting on the network; bounds concurrent upstream requests
+UPSTREAM_WORKERS = int(os.environ.get('TRAFFIC_UPSTREAM_WORKERS', 64))
+
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='inference')
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+app = FastAPI(title="Smart Traffic API")
+app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+# Schemas
+
+class Features(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
+    hour: int = Field(8, ge=0, le=23)
+    day_of_week: int = Field(1, ge=0, le=6)
+    is_weekend: int = 0
+    rain_intensity: float = Field(0.0, ge=0, le=1)
+    temperature: float = 25
+    humidity: float = 60
+    event_flag: int = 0
+    rush_hour: int = 0
+    avg_speed: float = Field(35, gt=0)
+
+class PredictRequest(Features):
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+    online: bool = False
+
+class TrafficLevel(BaseModel):
+    level: str
+    color: str
+    icon: str
+
+class PredictResponse(BaseModel):
+    success: bool
+    predicted_traffic: float
+    route_score: float
+    traffic_level: TrafficLevel
+    recommendations: List[str]
+
+class BatchRequest(BaseModel):
+    scenarios: List[Union[Dict[str, float], List[float]]] = []
+
+class BatchResponse(BaseModel):
+    success: bool
+    count: int
+    features: List[str]
+    predicted_traffic: List[float]
+    route_score: List[float]
+
+class WeatherData(BaseModel):
+    model_config = ConfigDict(extra='allow')
+
+    temperature: float
+    humidity: float
+    rain_intensity: float
+    weather_description: str
+    city: str
+
+class WeatherResponse(BaseModel):
+    success: bool
+    data: WeatherData
+
+class TripRequest(BaseModel):
+    origin: str = 'Bangalore'
+    destination: str = 'Mysore'
+    rain_intensity: Optional[float] = Field(None, ge=0, le=1)
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    event_flag: int = 0
+
+class RouteRequest(TripRequest):
+    departure_time: Optional[datetime] = None
+
+class RouteResult(BaseModel):
+    name: str
+    distance: str
+    duration: str
+    predicted_duration: str
+    predicted_duration_value: int
+    free_flow_duration_value: int
+    traffic: float
+    speed: float
+    score: float
+    segments: int
+    polyline: str
+    steps: List[str]
+
+class RoutesResponse(BaseModel):
+    success: bool
+    routes: List[RouteResult]
+    departure_time: str
+    best_route: RouteResult
+    origin: str
+    destination: str
+    origin_location: dict
+    destination_location: dict
+
+class BestDepartureRequest(TripRequest):
+    window_start: Optional[datetime] = None
+    window_minutes: int = Field(120, ge=0, le=api.MAX_DEPARTURE_WINDOW)
+    step_minutes: Literal[api.DEPARTURE_STEPS] = 15
+    top: int = Field(5, ge=1)
+
+class Observation(Features):
+    hour: int = Field(ge=0, le=23)
+    day_of_week: int = Field(ge=0, le=6)
+    is_weekend: int
+    rain_intensity: float = Field(ge=0, le=1)
+    temperature: float
+    humidity: float
+    event_flag: int
+    rush_hour: int
+    avg_speed: float = Field(gt=0)
+    traffic_flow: float
+    observed_at: Optional[Union[float, str]] = None
+
+class ObservationsRequest(BaseModel):
+    observations: Union[List[Observation], Observation] = []
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None
+
+# Helpers
+
+def error(status, message, **extra):
+    return JSONResponse({'success': False, 'error': message, **extra}, status_code=status)
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    first = exc.errors()[0]
+    field = '.'.join(str(part) for part in first['loc'] if part != 'body')
+    return error(400, f"{field}: {first['msg']}" if field else first['msg'])
+
+@app.exception_handler(ValueError)
+async def value_error(request: Request, exc: ValueError):
+    return error(400, str(exc))
+
+@app.exception_handler(QueueFull)
+@app.exception_handler(InferenceTimeout)
+async def inference_unavailable(request: Request, exc: Exception):
+    return error(503, str(exc))
+
+@app.exception_handler(Exception)
+async def server_error(request: Request, exc: Exception):
+    return error(500, str(exc))
+
+def infer(fn, *args):
+    """Run CPU-bound work on the inference executor"""
+    return asyncio.get_running_loop().run_in_executor(inference_executor, partial(fn, *args))
+
+def upstream(fn, *args):
+    """Run a blocking maps call on the upstream pool"""
+    return asyncio.get_running_loop().run_in_executor(upstream_executor, partial(fn, *args))
+
+async def current_weather(city):
+    """Weather for a city, falling back to mock data like WeatherAPI.get_weather_data"""
+    if api.weather_api.api_key == "demo_key":
+        return await asyncio.to_thread(api.weather_api.get_weather_data, city)
+    try:
+        return await asyncio.wrap_future(api.weather_api.get_weather_data_async(city))
+    except Exception as e:
+        print(f"Weather API error: {e}")
+        return await asyncio.to_thread(api.weather_api._get_mock_weather_data, city)
+
+# Endpoints
+
+@app.get('/api/health')
+async def health():
+    return {'success': True, 'pid': os.getpid()}
+
+@app.get('/api/ready')
+async def ready():
+    current = api.model_reloader.predictor
+    status = {'pid': os.getpid(), 'model_version': current.model_version if current else None}
+    if current is None:
+        return error(503, 'Model not loaded', **status)
+    return {'success': True, **status}
+
+@app.post('/api/predict', response_model=PredictResponse)
+async def predict_traffic(body: PredictRequest):
+    data = body.model_dump()
+    if api.BATCH_MAX_SIZE > 1:
+        # Awaits its slot in the scheduler's next batched model call; a lone request costs
+        # the same thread hand-off as infer(), so the scheduler's direct path buys nothing here
+        pending = asyncio.wrap_future(api.inference_scheduler.submit(api.feature_row(data)))
+        try:
+            predicted_traffic = await asyncio.wait_for(pending, api.PREDICT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise InferenceTimeout(f"No prediction within {api.PREDICT_TIMEOUT:g} s") from None
+    else:
+        predicted_traffic = await infer(api.predict_single, api.feature_row(data))
+    return api.predict_result(api.model_reloader.predictor, data, predicted_traffic)
+
+@app.post('/api/predict/batch', response_model=BatchResponse,
+          openapi_extra={'requestBody': {'content': {
+              'application/json': {'schema': BatchRequest.model_json_schema()},
+              **{content_type: {} for content_type in batch_formats.content_types()}}}})
+async def predict_traffic_batch(request: Request):
+    # Binary bodies are answered in the same format; JSON stays the default
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type in batch_formats.content_types():
+        body = await infer(api.binary_batch_result, api.model_reloader.predictor, await request.body(),
+                           content_type)
+        return Response(body, media_type=content_type)
+
+    try:
+        body = BatchRequest.model_validate_json(await request.body() or b'{}')
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return await infer(api.batch_result, api.model_reloader.predictor, body.scenarios)
+
+@app.get('/api/predict/cache')
+async def get_prediction_cache_stats():
+    cache = api.model_reloader.predictor.prediction_cache
+    return {'success': True, 'enabled': cache is not None,
+            'stats': cache.stats() if cache is not None else {}}
+
+@app.get('/api/predict/scheduler')
+async def get_scheduler_stats():
+    return {'success': True, 'stats': api.inference_scheduler.metrics()}
+
+@app.get('/api/weather', response_model=WeatherResponse)
+async def get_weather(city: str = 'Bangalore'):
+    return {'success': True, 'data': await current_weather(city)}
+
+@app.get('/api/weather/cache')
+async def get_weather_cache_stats():
+    return {'success': True, 'stats': api.weather_api.metrics()}
+
+@app.get('/api/forecast')
+async def get_forecast(start: Optional[datetime] = None, days: int = 3, step_minutes: int = 60,
+                       avg_speed: float = api.DEFAULT_FEATURES['avg_speed'], event_flag: int = 0,
+                       city: Optional[str] = None):
+    forecast = await infer(api.forecaster.forecast, start or datetime.now(), days, step_minutes,
+                           avg_speed, event_flag, city)
+    return {'success': True, 'forecast': forecast}
+
+@app.get('/api/forecast/cache')
+async def get_forecast_cache_stats():
+    return {'success': True, 'stats': api.forecaster.cache_stats()}
+
+@app.get('/api/models')
+async def get_model_performance():
+    result = api.model_performance(api.model_reloader.predictor)
+    if result is None:
+        return error(503, 'No model metrics available. Retrain via POST /api/models/retrain')
+    return result
+
+@app.post('/api/models/retrain')
+async def retrain_models():
+    if not api.retrain_lock.acquire(blocking=False):
+        return error(409, 'Retraining already in progress')
+    try:
+        # Training takes minutes; keep it off the inference pool that serves predictions
+        return await asyncio.to_thread(api.retrain)
+    finally:
+        api.retrain_lock.release()
+
+@app.post('/api/models/reload', status_code=202)
+async def reload_models(body: Optional[ReloadRequest] = None):
+    version = body.version if body else None
+    if version is not None:
+        if version not in api.model_registry.versions():
+            return error(404, f'Unknown model version {version}')
+
+    # Point LATEST at the requested version so the watcher (and other workers) follow it,
+    # but only once this reload is claimed
+    pin_latest = (lambda: api.model_registry.set_latest(version)) if version is not None else None
+    if not api.model_reloader.reload(version, before_load=pin_latest):
+        return error(409, 'Reload already in progress', status=api.model_reloader.status())
+    return {'success': True, 'status': api.model_reloader.status()}
+
+@app.get('/api/models/status')
+async def get_model_status():
+    return {'success': True, 'status': api.model_reloader.status(),
+            'inference_pool': api.inference_pool.status() if api.inference_pool is not None else None}
+
+@app.post('/api/observations', status_code=202)
+async def add_observations(body: ObservationsRequest):
+    if api.observation_log is None:
+        return error(503, 'Observation log not started')
+    observations = body.observations if isinstance(body.observations, list) else [body.observations]
+    records = api.observation_records(api.model_reloader.predictor,
+                                      [observation.model_dump(exclude_none=True) for observation in observations])
+
+    # Waits for the group commit's fsync without holding the event loop
+    await asyncio.to_thread(api.observation_log.append, records)
+    return {'success': True, 'accepted': len(records), 'status': api.online_learner.status()}
+
+@app.get('/api/observations/status')
+async def get_observation_status():
+    if api.online_learner is None:
+        return error(503, 'Observation log not started')
+    return {'success': True, 'status': api.observation_status()}
+
+@app.get('/api/routes/cache')
+async def get_route_cache_stats():
+    return {'success': True, 'stats': api.maps_service.cache_stats()}
+
+@app.post('/api/routes', response_model=RoutesResponse)
+async def get_routes(body: RouteRequest):
+    data = body.model_dump(mode='json', exclude_none=True)
+    departure_time = api.parse_departure_time(data)
+
+    # Directions and both geocodes in flight together; repeats are served from cache
+    maps = api.maps_service
+    routes, origin_location, destination_location = await asyncio.gather(
+        upstream(maps.get_routes, body.origin, body.destination, departure_time),
+        upstream(maps.geocode_address, body.origin),
+        upstream(maps.geocode_address, body.destination)
+    )
+    trip = {'routes': routes, 'origin_location': origin_location,
+            'destination_location': destination_location}
+    return await infer(api.route_results, api.model_reloader.predictor, trip, data, departure_time)
+
+@app.post('/api/best-departure')
+async def get_best_departure(body: BestDepartureRequest):
+    start = time.perf_counter()
+    data = body.model_dump(mode='json', exclude_none=True)
+    window_start, window_minutes, step_minutes = api.parse_departure_window(data)
+    routes = await upstream(api.maps_service.get_routes, body.origin, body.destination, window_start)
+    return await infer(api.best_departure_result, api.model_reloader.predictor, routes, data,
+                       window_start, window_minutes, step_minutes, start)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
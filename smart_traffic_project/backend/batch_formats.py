@@ -0,0 +1,99 @@
+"""
+Binary bodies for batch prediction, as an alternative to JSON
+
+application/x-traffic-batch (raw float32):
+
+    b'TRFB'                  magic
+    uint32, little-endian    header length H, a multiple of 4
+    H bytes                  ASCII column names, comma-separated, space-padded
+    n x columns float32      little-endian, row-major
+
+application/vnd.apache.arrow.stream: an Arrow IPC stream with one numeric column per
+name (needs pyarrow).
+
+Raw bodies decode to a NumPy view of the request bytes, with no per-element parsing.
+Either way, column names must be unique and every value finite.
+"""
+
+import numpy as np
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+
+RAW_CONTENT_TYPE = 'application/x-traffic-batch'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+RAW_MAGIC = b'TRFB'
+RAW_DTYPE = np.dtype('<f4')
+
+def content_types():
+    """Binary content types this server can read and write"""
+    return [RAW_CONTENT_TYPE] + ([ARROW_CONTENT_TYPE] if PYARROW_AVAILABLE else [])
+
+def _checked(names, X):
+    """Reject bodies the model cannot score: repeated names, non-numeric or non-finite values"""
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate column: {', '.join(duplicates)}")
+    if X.dtype.kind not in 'biuf':
+        raise ValueError("Batch columns must be numeric")
+    if not np.isfinite(X).all():
+        raise ValueError("Batch contains NaN or infinite values")
+    return names, X
+
+def encode_raw(names, X):
+    header = ','.join(names).encode('ascii')
+    header += b' ' * (-len(header) % 4)
+    rows = np.ascontiguousarray(X, dtype=RAW_DTYPE)
+    return RAW_MAGIC + len(header).to_bytes(4, 'little') + header + rows.tobytes()
+
+def decode_raw(data):
+    """Column names and an (n, columns) float32 view of a raw batch body"""
+    if len(data) < 8 or bytes(data[:4]) != RAW_MAGIC:
+        raise ValueError("Not a raw traffic batch: missing TRFB header")
+    header_length = int.from_bytes(data[4:8], 'little')
+    if header_length % 4 or len(data) < 8 + header_length:
+        raise ValueError("Malformed raw batch header")
+
+    try:
+        names = bytes(data[8:8 + header_length]).decode('ascii').strip().split(',')
+    except UnicodeDecodeError:
+        raise ValueError("Raw batch column names must be ASCII")
+    body = memoryview(data)[8 + header_length:]
+    row_bytes = RAW_DTYPE.itemsize * len(names)
+    if len(body) % row_bytes:
+        raise ValueError(f"Raw batch body is not a whole number of {len(names)}-column float32 rows")
+    return _checked(names, np.frombuffer(body, dtype=RAW_DTYPE).reshape(-1, len(names)))
+
+def encode_arrow(names, X):
+    table = pa.table({name: X[:, i] for i, name in enumerate(names)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def decode_arrow(data):
+    """Column names and an (n, columns) array from an Arrow IPC stream"""
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Invalid Arrow stream: {e}")
+    for name, column in zip(table.column_names, table.columns):
+        if column.null_count:
+            raise ValueError(f"Column {name} has null values")
+    # Single-chunk numeric columns convert without copying; stacking them makes the rows
+    return _checked(table.column_names, np.column_stack([column.to_numpy() for column in table.columns]))
+
+def decode(data, content_type):
+    if content_type == RAW_CONTENT_TYPE:
+        return decode_raw(data)
+    if content_type == ARROW_CONTENT_TYPE and PYARROW_AVAILABLE:
+        return decode_arrow(data)
+    raise ValueError(f"Unsupported batch content type {content_type}")
+
+def encode(names, X, content_type):
+    if content_type == ARROW_CONTENT_TYPE:
+        return encode_arrow(names, X)
+    return encode_raw(names, X)
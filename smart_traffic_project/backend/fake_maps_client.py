@@ -0,0 +1,51 @@
+import threading
+import time
+import zlib
+
+class FakeMapsClient:
+    """Offline stand-in for googlemaps.Client with a configurable per-call delay
+
+    Returns Directions and Geocoding payloads in the Google response shape, so
+    MapsService(client=FakeMapsClient()) runs its real parsing and caching code.
+    `calls` counts requests per method.
+    """
+
+    def __init__(self, delay=0.2, alternatives=3):
+        self.delay = delay
+        self.alternatives = alternatives
+        self.calls = {'directions': 0, 'geocode': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        time.sleep(self.delay)
+
+    def directions(self, origin, destination, mode="driving", alternatives=False, departure_time=None):
+        self._count('directions')
+        seed = zlib.crc32(f"{origin}|{destination}".encode())
+        routes = []
+        for i in range(self.alternatives if alternatives else 1):
+            distance = 8000 + (seed >> i) % 9000
+            duration = int(distance / (9 + 3 * i))
+            routes.append({
+                'overview_polyline': {'points': f"fake_polyline_{i + 1}"},
+                'legs': [{
+                    'distance': {'text': f"{distance / 1000:.1f} km", 'value': distance},
+                    'duration': {'text': f"{duration // 60} mins", 'value': duration},
+                    'steps': [{'html_instructions': f"Head out of {origin}",
+                               'distance': {'value': distance // 3}, 'duration': {'value': duration // 2}},
+                              {'html_instructions': f"Arrive at {destination}",
+                               'distance': {'value': distance - distance // 3},
+                               'duration': {'value': duration - duration // 2}}]
+                }]
+            })
+        return routes
+
+    def geocode(self, address):
+        self._count('geocode')
+        offset = zlib.crc32(address.encode()) % 1000 / 10000
+        return [{
+            'geometry': {'location': {'lat': 12.9 + offset, 'lng': 77.5 + offset}},
+            'formatted_address': f"{address}, Karnataka, India"
+        }]
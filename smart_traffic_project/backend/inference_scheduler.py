@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
+
+from ml_models import FEATURE_COLUMNS
+
+class QueueFull(RuntimeError):
+    """The scheduler already holds max_queue requests"""
+
+class InferenceTimeout(RuntimeError):
+    """A queued request was not answered within its timeout"""
+
+class InferenceScheduler:
+    """Micro-batches concurrent single-row predictions into one model call
+
+    Callers submit() a feature row and get a Future. A single thread answers up to
+    max_batch_size queued rows with one predict_traffic_batch call. Rows that arrive
+    while a model call is in flight form the next batch, so under load batches grow
+    with the number of concurrent callers and per-call model overhead is shared.
+
+    predict() skips the queue when no other caller is in flight and runs the model on
+    the caller's thread, so a lone request does not pay the hand-off. With max_wait
+    set, the thread lingers up to max_wait after the oldest queued row to fill a
+    batch, but only while other rows are queued.
+    """
+
+    def __init__(self, predictor_getter, max_batch_size=64, max_wait=0.0, max_queue=4096,
+                 history=2048):
+        self.predictor_getter = predictor_getter
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._stats = {'requests': 0, 'batches': 0, 'direct': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0,
+                       'max_queue_depth': 0, 'model_seconds': 0.0}
+        # Recent batch sizes and per-request queueing delays, for percentiles
+        self._batch_sizes = deque(maxlen=history)
+        self._waits = deque(maxlen=history)
+        self._reset()
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        # Callers inside predict(), queued or running directly
+        self._active = 0
+
+    def after_fork(self):
+        """Threads do not survive fork(); the child starts its own on first use"""
+        self._reset()
+
+    def _start(self):
+        # Started lazily by the first submit(), so a pre-fork master never owns the thread
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='inference-batcher')
+            self._thread.start()
+
+    def submit(self, features):
+        """Queue one feature row; the Future resolves to its predicted traffic"""
+        row = np.asarray(features, dtype=np.float64).reshape(len(FEATURE_COLUMNS))
+        future = Future()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise QueueFull(f"Inference queue full ({self.max_queue} requests)")
+            self._queue.append((row, future, time.perf_counter()))
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], len(self._queue))
+            self._start()
+            self._cond.notify()
+        return future
+
+    def predict(self, features, timeout=10.0):
+        """Predicted traffic for one row, batched with whatever else is in flight
+
+        Raises InferenceTimeout if a queued row is not answered within timeout seconds.
+        """
+        with self._cond:
+            self._active += 1
+            alone = self._active == 1
+        try:
+            if alone:
+                row = np.asarray(features, dtype=np.float64).reshape(1, len(FEATURE_COLUMNS))
+                prediction = float(self.predictor_getter().predict_traffic_batch(row)[0])
+                with self._cond:
+                    self._stats['direct'] += 1
+                return prediction
+
+            future = self.submit(features)
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                future.cancel()
+                with self._cond:
+                    self._stats['timeouts'] += 1
+                raise InferenceTimeout(f"No prediction within {timeout:g} s") from None
+        finally:
+            with self._cond:
+                self._active -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                deadline = self._queue[0][2] + self.max_wait
+                # A single queued row means no concurrent load to batch with: don't delay it
+                while 1 < len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch_size))]
+            # Skip callers that gave up (e.g. a disconnected async client) while queued
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                predictions = self.predictor_getter().predict_traffic_batch(np.stack([row for row, _, _ in batch]))
+                for (_, future, _), prediction in zip(batch, predictions):
+                    future.set_result(float(prediction))
+            except Exception as e:
+                print(f"Batched inference failed: {e}")
+                failed = True
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+            with self._cond:
+                self._stats['errors'] += failed
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['model_seconds'] += time.perf_counter() - started
+                self._batch_sizes.append(len(batch))
+                self._waits.extend(started - enqueued for _, _, enqueued in batch)
+
+    def metrics(self):
+        """Batch sizes, queue depth and the latency batching adds"""
+        with self._cond:
+            metrics = dict(self._stats)
+            metrics['queue_depth'] = len(self._queue)
+            sizes = np.array(self._batch_sizes)
+            waits = np.array(self._waits) * 1000
+        model_seconds = metrics.pop('model_seconds')
+        metrics.update({
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'avg_batch_size': metrics['requests'] / metrics['batches'] if metrics['batches'] else 0.0,
+            'p50_batch_size': float(np.percentile(sizes, 50)) if len(sizes) else 0.0,
+            'p99_batch_size': float(np.percentile(sizes, 99)) if len(sizes) else 0.0,
+            # Time from submit() until the request's batch reached the model
+            'p50_queue_wait_ms': float(np.percentile(waits, 50)) if len(waits) else 0.0,
+            'p99_queue_wait_ms': float(np.percentile(waits, 99)) if len(waits) else 0.0,
+            'avg_model_ms': model_seconds / metrics['batches'] * 1000 if metrics['batches'] else 0.0
+        })
+        return metrics
@@ -5,19 +5,82 @@ except ImportError:
     GOOGLEMAPS_AVAILABLE = False
     googlemaps = None
 
+import os
+import json
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import requests
 from datetime import datetime
+from road_graph import encode_polyline, ROAD_CLASS_NAMES
+
+GEOCODE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geocode_cache.json')
 
 class MapsService:
-    def __init__(self, api_key="demo_key"):
+    def __init__(self, api_key="demo_key", client=None, route_ttl=300, route_cache_size=1024,
+                 time_bucket_minutes=15, geocode_cache_path=GEOCODE_CACHE_FILE, max_workers=4,
+                 road_graph=None, edge_weights=None, alternatives=3):
         self.api_key = api_key
-        if api_key != "demo_key" and GOOGLEMAPS_AVAILABLE:
+        if client is not None:
+            # Any object with googlemaps-style directions()/geocode(), e.g. FakeMapsClient
+            self.gmaps = client
+        elif api_key != "demo_key" and GOOGLEMAPS_AVAILABLE:
             self.gmaps = googlemaps.Client(key=api_key)
         else:
             self.gmaps = None
+        
+        # Routes keyed by (origin, destination, departure time bucket), LRU with a TTL
+        self.route_ttl = route_ttl
+        self.route_cache_size = route_cache_size
+        self.time_bucket_seconds = time_bucket_minutes * 60
+        self._route_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'route_hits': 0, 'route_misses': 0, 'geocode_hits': 0, 'geocode_misses': 0}
+        
+        # Geocodes rarely change, so they persist across restarts
+        self.geocode_cache_path = geocode_cache_path
+        self._geocode_cache = {}
+        if geocode_cache_path and os.path.exists(geocode_cache_path):
+            try:
+                with open(geocode_cache_path) as f:
+                    self._geocode_cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable geocode cache: {e}")
+        
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='maps')
+        
+        # Offline routing: a RoadGraph plus edge_weights(departure_time) -> seconds per edge
+        self.road_graph = road_graph
+        self.edge_weights = edge_weights or (lambda departure_time: road_graph.free_flow_times())
+        self.alternatives = alternatives
     
-    def get_routes(self, origin, destination):
+    def get_routes(self, origin, destination, departure_time=None):
         """Get multiple route options between origin and destination"""
+        departure_time = departure_time or datetime.now()
+        key = (origin.strip().lower(), destination.strip().lower(),
+               int(departure_time.timestamp() // self.time_bucket_seconds))
+        
+        with self._lock:
+            entry = self._route_cache.get(key)
+            if entry is not None and time.time() - entry[1] < self.route_ttl:
+                self._route_cache.move_to_end(key)
+                self._stats['route_hits'] += 1
+                return [dict(route) for route in entry[0]]
+            self._stats['route_misses'] += 1
+        
+        routes = self._fetch_routes(origin, destination, departure_time)
+        
+        with self._lock:
+            self._route_cache[key] = (routes, time.time())
+            self._route_cache.move_to_end(key)
+            while len(self._route_cache) > self.route_cache_size:
+                self._route_cache.popitem(last=False)
+        return [dict(route) for route in routes]
+    
+    def _fetch_routes(self, origin, destination, departure_time):
         if self.gmaps:
             try:
                 # Get directions with alternatives
@@ -25,15 +88,77 @@ class MapsService:
                     origin, destination,
                     mode="driving",
                     alternatives=True,
-                    departure_time=datetime.now()
+                    departure_time=departure_time
                 )
                 return self._parse_google_routes(directions)
             except Exception as e:
                 print(f"Google Maps API error: {e}")
                 return self._get_mock_routes(origin, destination)
+        elif self.road_graph is not None:
+            try:
+                routes = self._get_graph_routes(origin, destination, departure_time)
+                if routes:
+                    return routes
+            except Exception as e:
+                print(f"Road graph routing error: {e}")
+            return self._get_mock_routes(origin, destination)
         else:
             return self._get_mock_routes(origin, destination)
     
+    def _get_graph_routes(self, origin, destination, departure_time):
+        """Alternative routes from the local road graph, weighted by predicted traffic"""
+        graph = self.road_graph
+        start, end = self.geocode_address(origin), self.geocode_address(destination)
+        source = graph.nearest_node(start['lat'], start['lng'])
+        target = graph.nearest_node(end['lat'], end['lng'])
+        
+        weights = self.edge_weights(departure_time)
+        if self.alternatives == 1:
+            # One route needs only a goal-directed A* search, not two full Dijkstra trees
+            found = graph.shortest_path(source, target, weights)
+            candidates = [(np.array(found[0], dtype=np.int64), found[1])] if found and found[0] else []
+        else:
+            candidates = graph.alternative_routes(source, target, weights, k=self.alternatives)
+        routes = []
+        for i, (edges, duration) in enumerate(candidates):
+            summary = graph.describe_route(edges, weights)
+            nodes = graph.route_nodes(edges)
+            main_road = max(summary['streets'], key=lambda street: street[1])[0] if edges.size else origin
+            routes.append({
+                'name': f"Route {i + 1} (via {main_road}) - {origin} to {destination}",
+                'distance': f"{summary['distance_m'] / 1000:.1f} km",
+                'duration': f"{max(1, round(duration / 60))} mins",
+                'distance_value': int(summary['distance_m']),
+                'duration_value': int(duration),
+                'polyline': encode_polyline(graph.lat[nodes], graph.lng[nodes]),
+                'steps': summary['steps'],
+                'traffic_factor': 1.0,
+                'base_speed': round(summary['free_flow_speed_kmh'], 1),
+                'edges': edges,
+                'segments': summary['segments']
+            })
+        return routes
+    
+    def plan_trip(self, origin, destination, departure_time=None):
+        """Routes plus geocoded endpoints, with the provider calls made concurrently"""
+        routes = self.executor.submit(self.get_routes, origin, destination, departure_time)
+        origin_location = self.executor.submit(self.geocode_address, origin)
+        destination_location = self.executor.submit(self.geocode_address, destination)
+        return {
+            'routes': routes.result(),
+            'origin_location': origin_location.result(),
+            'destination_location': destination_location.result()
+        }
+    
+    def cache_stats(self):
+        with self._lock:
+            return {**self._stats, 'cached_routes': len(self._route_cache),
+                    'cached_geocodes': len(self._geocode_cache)}
+    
+    def clear_route_cache(self):
+        with self._lock:
+            self._route_cache.clear()
+    
     def _parse_google_routes(self, directions):
         """Parse Google Maps API response"""
         routes = []
@@ -47,10 +172,20 @@ class MapsService:
                 'duration_value': leg['duration']['value'],
                 'polyline': route['overview_polyline']['points'],
                 'steps': [step['html_instructions'] for step in leg['steps']],
-                'traffic_factor': 1.0 + (i * 0.2)  # Simulate different traffic levels
+                'traffic_factor': 1.0 + (i * 0.2),  # Simulate different traffic levels
+                'segments': self._google_segments(leg)
             })
         return routes
     
+    def _google_segments(self, leg):
+        """One segment per step, at the speed Google expects for it"""
+        steps = [step for step in leg['steps'] if 'distance' in step and 'duration' in step] or [leg]
+        return [{
+            'length_m': float(step['distance']['value']),
+            'speed_kmh': step['distance']['value'] / max(step['duration']['value'], 1) * 3.6,
+            'road_class': ROAD_CLASS_NAMES.index('unclassified')
+        } for step in steps]
+    
     def _get_mock_routes(self, origin, destination):
         """Generate mock routes for demo"""
         routes = [
@@ -103,26 +238,59 @@ class MapsService:
                 'base_speed': 30
             }
         ]
+        
+        # Each step is an equal share of the route at the route's base speed
+        road_classes = {45: 'primary', 60: 'trunk', 30: 'residential'}
+        for route in routes:
+            route['segments'] = [{
+                'length_m': route['distance_value'] / len(route['steps']),
+                'speed_kmh': float(route['base_speed']),
+                'road_class': ROAD_CLASS_NAMES.index(road_classes[route['base_speed']])
+            } for _ in route['steps']]
         return routes
     
     def geocode_address(self, address):
         """Convert address to coordinates"""
+        key = address.strip().lower()
+        with self._lock:
+            cached = self._geocode_cache.get(key)
+            self._stats['geocode_hits' if cached else 'geocode_misses'] += 1
+        if cached:
+            return dict(cached)
+        
         if self.gmaps:
             try:
                 result = self.gmaps.geocode(address)
                 if result:
                     location = result[0]['geometry']['location']
-                    return {
+                    geocode = {
                         'lat': location['lat'],
                         'lng': location['lng'],
                         'formatted_address': result[0]['formatted_address']
                     }
+                    self._store_geocode(key, geocode)
+                    return dict(geocode)
             except Exception as e:
                 print(f"Geocoding error: {e}")
         
-        # Return mock coordinates for demo
+        # Return mock coordinates for demo (stable across processes, unlike hash()), hashing
+        # each axis separately so addresses don't all fall on one diagonal
         return {
-            'lat': 12.9716 + (hash(address) % 100) / 1000,
-            'lng': 77.5946 + (hash(address) % 100) / 1000,
+            'lat': 12.9716 + zlib.crc32(address.encode()) % 100 / 1000,
+            'lng': 77.5946 + zlib.crc32(b'lng:' + address.encode()) % 100 / 1000,
             'formatted_address': address
-        }
\ No newline at end of file
+        }
+    
+    def _store_geocode(self, key, geocode):
+        """Remember a provider geocode and rewrite the cache file atomically"""
+        with self._lock:
+            self._geocode_cache[key] = geocode
+            if not self.geocode_cache_path:
+                return
+            try:
+                tmp_path = self.geocode_cache_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._geocode_cache, f)
+                os.replace(tmp_path, self.geocode_cache_path)
+            except OSError as e:
+                print(f"Could not save geocode cache: {e}")
\ No newline at end of file
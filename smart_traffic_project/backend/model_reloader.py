@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import datetime
+
+# Representative requests used to warm a freshly loaded predictor before it goes live
+WARMUP_SCENARIOS = [
+    {'hour': 8, 'day_of_week': 1, 'is_weekend': 0, 'rain_intensity': 0.0, 'temperature': 25,
+     'humidity': 60, 'event_flag': 0, 'rush_hour': 1, 'avg_speed': 35},
+    {'hour': 18, 'day_of_week': 4, 'is_weekend': 0, 'rain_intensity': 0.5, 'temperature': 22,
+     'humidity': 80, 'event_flag': 1, 'rush_hour': 1, 'avg_speed': 25},
+    {'hour': 13, 'day_of_week': 6, 'is_weekend': 1, 'rain_intensity': 0.1, 'temperature': 30,
+     'humidity': 50, 'event_flag': 0, 'rush_hour': 0, 'avg_speed': 50}
+]
+
+class ModelReloader:
+    """Owns the active TrafficPredictor and swaps in new model versions without downtime
+
+    New versions are loaded and warmed up on a background thread. Only then is the
+    `predictor` reference replaced, in a single assignment, so a request either sees
+    the old predictor or the fully loaded new one. on_swap(predictor), if given, runs
+    after each swap, e.g. to drop results cached from the old model.
+    """
+
+    def __init__(self, predictor_factory, poll_interval=10.0, on_swap=None):
+        self.predictor_factory = predictor_factory
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.predictor = None
+        self.loading_version = None
+        self.last_error = None
+        self.failed_version = None
+        self.last_swap = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def activate(self, predictor):
+        """Warm up an already loaded predictor and make it the active one"""
+        self._warm_up(predictor)
+        self.predictor = predictor
+        self.last_swap = datetime.now().isoformat()
+        if self.on_swap is not None:
+            self.on_swap(predictor)
+        print(f"Active model version: {predictor.model_version}")
+
+    def reload(self, version=None, before_load=None):
+        """Start loading a registry version (LATEST by default) in the background
+
+        Returns False if a reload is already running. before_load runs once this
+        reload is claimed, before loading starts (e.g. to repoint LATEST).
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        if before_load is not None:
+            try:
+                before_load()
+            except Exception:
+                self._reload_lock.release()
+                raise
+
+        self.loading_version = version or 'latest'
+        thread = threading.Thread(target=self._load_and_swap, args=(version,), daemon=True)
+        thread.start()
+        return True
+
+    def _load_and_swap(self, version):
+        try:
+            predictor = self.predictor_factory()
+            if not predictor.load_models(version):
+                raise RuntimeError(f"Could not load model version {version or 'latest'}")
+            self.activate(predictor)
+            self.last_error = None
+            self.failed_version = None
+        except Exception as e:
+            self.last_error = str(e)
+            self.failed_version = version
+            print(f"Model reload failed: {e}")
+        finally:
+            self.loading_version = None
+            self._reload_lock.release()
+
+    def _warm_up(self, predictor):
+        """Touch the primary model and run a few predictions so first requests are fast"""
+        predictor.models[predictor.primary_model]
+        predictor.predict_traffic_batch(WARMUP_SCENARIOS)
+        for scenario in WARMUP_SCENARIOS:
+            predictor.predict_traffic(**scenario)
+
+    def start_watching(self):
+        """Poll the registry's LATEST pointer and reload when it moves"""
+        if self._watcher is not None or not self.poll_interval:
+            return
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def after_fork(self):
+        """Reset thread state in a forked child; call start_watching() again afterwards"""
+        self._reload_lock = threading.Lock()
+        self.loading_version = None
+        self._watcher = None
+    
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                current = self.predictor
+                if current is None:
+                    continue
+                latest = current.registry.latest_version()
+                if (latest and latest != current.model_version and latest != self.failed_version
+                        and self.loading_version is None):
+                    print(f"New model version {latest} found, reloading...")
+                    self.reload(latest)
+            except Exception as e:
+                print(f"Model watcher error: {e}")
+
+    def status(self):
+        current = self.predictor
+        return {
+            'active_version': current.model_version if current is not None else None,
+            'loading_version': self.loading_version,
+            'last_swap': self.last_swap,
+            'last_error': self.last_error,
+            'watch_interval': self.poll_interval
+        }
@@ -0,0 +1,274 @@
+import copy
+import os
+import threading
+import time
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+
+from ml_models import FEATURE_COLUMNS
+
+# One fixed-size binary record per observation
+OBSERVATION_DTYPE = np.dtype([(column, '<f4') for column in FEATURE_COLUMNS]
+                             + [('traffic_flow', '<f4'), ('observed_at', '<f8')])
+
+class ObservationLog:
+    """Append-only on-disk log of traffic observations with group commit
+
+    Callers hand records to append(), which blocks until they are on disk. A single
+    writer thread collects everything that arrived during the previous write and
+    flushes it with one write + fsync, so concurrent requests share the cost of
+    each fsync instead of paying for one apiece.
+
+    Several processes (pre-forked server workers) may share one log: batches go out
+    in a single O_APPEND write, and `committed` counts every record in the file, so
+    positions mean the same thing in all of them. Call after_fork() in each child.
+    """
+
+    def __init__(self, path, commit_delay=0.005, append_timeout=30.0):
+        self.path = path
+        self.commit_delay = commit_delay
+        self.append_timeout = append_timeout
+
+        # Drop a partially written trailing record left by a crash
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.committed = size // OBSERVATION_DTYPE.itemsize
+        if size % OBSERVATION_DTYPE.itemsize:
+            with open(path, 'r+b') as f:
+                f.truncate(self.committed * OBSERVATION_DTYPE.itemsize)
+
+        self.latest_observed_at = (float(self.read(self.committed - 1, self.committed)['observed_at'][0])
+                                   if self.committed else None)
+        self.commits = 0
+        self.write_errors = 0
+        self.last_error = None
+        self._fd = None
+        self._start_writer()
+
+    def _start_writer(self):
+        self._cond = threading.Condition()
+        # (records, outcome) per append() call; the writer fills outcome['error'] on failure
+        self._pending = []
+        # Records handed to append() and those whose commit has finished, written or failed
+        self._appended = 0
+        self._flushed = 0
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def after_fork(self):
+        """Give a forked child its own file handle and writer thread"""
+        self._start_writer()
+
+    def append(self, records):
+        """Queue records for the next group commit and wait until it is durable
+
+        Returns the log position (record count) once they are on disk. Raises OSError
+        if the write failed and TimeoutError if it did not finish in append_timeout.
+        """
+        records = np.asarray(records, dtype=OBSERVATION_DTYPE)
+        outcome = {'error': None}
+        with self._cond:
+            self._pending.append((records, outcome))
+            self._appended += len(records)
+            position = self._appended
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: self._flushed >= position, self.append_timeout):
+                raise TimeoutError(f"Observation log commit took over {self.append_timeout:g} s")
+            if outcome['error'] is not None:
+                raise outcome['error']
+            return self.committed
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+            # Let requests arriving right behind this one join the same commit
+            time.sleep(self.commit_delay)
+            with self._cond:
+                batch, self._pending = self._pending, []
+
+            records = np.concatenate([records for records, _ in batch])
+            try:
+                size = self._write(records.tobytes())
+            except Exception as e:
+                # Fail this commit's callers instead of the thread, so later appends still run
+                print(f"Observation log write failed: {e}")
+                error = e if isinstance(e, OSError) else OSError(str(e))
+                with self._cond:
+                    for _, outcome in batch:
+                        outcome['error'] = error
+                    self._flushed += len(records)
+                    self.write_errors += 1
+                    self.last_error = str(e)
+                    self._cond.notify_all()
+                continue
+
+            with self._cond:
+                self._flushed += len(records)
+                self.committed = max(self.committed, size // OBSERVATION_DTYPE.itemsize)
+                self.commits += 1
+                newest = float(records['observed_at'].max())
+                self.latest_observed_at = max(newest, self.latest_observed_at or newest)
+                self._cond.notify_all()
+
+    def _write(self, data):
+        """Append data durably and return the file size after it"""
+        view = memoryview(data)
+        written = 0
+        try:
+            # One write per batch keeps it contiguous when other processes append too
+            while written < len(view):
+                written += os.write(self._fd, view[written:])
+            os.fsync(self._fd)
+        except OSError:
+            if written:
+                # Drop a trailing partial record so later appends stay aligned
+                size = os.fstat(self._fd).st_size
+                if size % OBSERVATION_DTYPE.itemsize:
+                    os.ftruncate(self._fd, size - size % OBSERVATION_DTYPE.itemsize)
+            raise
+        return os.fstat(self._fd).st_size
+
+    def refresh(self):
+        """Pick up records committed by other processes sharing the file"""
+        committed = os.path.getsize(self.path) // OBSERVATION_DTYPE.itemsize
+        with self._cond:
+            if committed <= self.committed:
+                return
+            self.committed = committed
+        newest = float(self.read(committed - 1, committed)['observed_at'][0])
+        with self._cond:
+            self.latest_observed_at = max(newest, self.latest_observed_at or newest)
+            self._cond.notify_all()
+
+    def wait_for_commit(self, position, timeout=None):
+        """Block until the log holds more than position records"""
+        with self._cond:
+            if self._cond.wait_for(lambda: self.committed > position, timeout):
+                return True
+        self.refresh()
+        return self.committed > position
+
+    def read(self, start, stop):
+        """Committed records [start, stop) as a structured array"""
+        stop = min(stop, self.committed)
+        if stop <= start:
+            return np.empty(0, dtype=OBSERVATION_DTYPE)
+        return np.fromfile(self.path, dtype=OBSERVATION_DTYPE, count=stop - start,
+                           offset=start * OBSERVATION_DTYPE.itemsize)
+
+class OnlineLearner:
+    """Learns a correction to the active model from observed traffic, in the background
+
+    An SGD regressor is fit incrementally on the residuals (observed minus predicted)
+    of the active predictor, over its standardized features. Serving reads
+    `self.model`, which is replaced by a fresh copy after each update, so predictions
+    never wait on training. The correction restarts when a new model version goes live,
+    because the residuals of the old one no longer apply.
+
+    The correction lives only in memory, so a new learner replays the log from the
+    start. Each server process runs its own learner over the shared log; they see the
+    same records in the same order but may batch them differently, so their
+    corrections can differ slightly.
+    """
+
+    def __init__(self, observation_log, predictor_getter, batch_size=1024, learning_rate=0.005):
+        self.log = observation_log
+        self.predictor_getter = predictor_getter
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.model = None
+        self.model_version = None
+        self.applied = 0
+        self.applied_through = None
+        self.updated_at = None
+        self.updates = 0
+        # Mean absolute error of each batch before learning from it (prequential)
+        self.base_mae = None
+        self.online_mae = None
+        self.last_error = None
+        self._sgd = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def after_fork(self):
+        """Threads do not survive fork(); let start() launch a new one in the child"""
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self.log.wait_for_commit(self.applied, timeout=1.0)
+            try:
+                while self.applied < self.log.committed:
+                    records = self.log.read(self.applied, self.applied + self.batch_size)
+                    self._learn(records)
+                    self.applied += len(records)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Online learning error: {e}")
+                time.sleep(1.0)
+
+    def _learn(self, records):
+        predictor = self.predictor_getter()
+        if predictor is None:
+            return
+        if predictor.model_version != self.model_version:
+            self._sgd, self.model = None, None
+            self.model_version = predictor.model_version
+
+        X = np.column_stack([records[column] for column in FEATURE_COLUMNS]).astype(np.float64)
+        y = records['traffic_flow'].astype(np.float64)
+        # The exact model, not predict_traffic_batch: training rows must not churn the serving cache
+        base = np.maximum(0, predictor._predict_exact(X))
+        X_scaled = predictor.scaler.transform(X)
+
+        corrected = base + (self._sgd.predict(X_scaled) if self._sgd is not None else 0.0)
+        self.base_mae = self._smoothed(self.base_mae, np.abs(y - base).mean())
+        self.online_mae = self._smoothed(self.online_mae, np.abs(y - corrected).mean())
+
+        if self._sgd is None:
+            self._sgd = SGDRegressor(learning_rate='constant', eta0=self.learning_rate, random_state=42)
+        self._sgd.partial_fit(X_scaled, y - base)
+
+        self.model = copy.deepcopy(self._sgd)
+        self.applied_through = max(float(records['observed_at'].max()), self.applied_through or 0.0)
+        self.updated_at = time.time()
+        self.updates += 1
+
+    @staticmethod
+    def _smoothed(previous, value, alpha=0.1):
+        return value if previous is None else (1 - alpha) * previous + alpha * value
+
+    def predict(self, predictor, X, base_predictions):
+        """Apply the learned correction to predictions from the active predictor"""
+        model = self.model
+        if model is None or predictor.model_version != self.model_version:
+            return base_predictions
+        return np.maximum(0, base_predictions + model.predict(predictor.scaler.transform(X)))
+
+    def status(self):
+        now = time.time()
+        latest = self.log.latest_observed_at
+        return {
+            'observations': self.log.committed,
+            'pending': self.log.committed - self.applied,
+            'commits': self.log.commits,
+            'write_errors': self.log.write_errors,
+            'updates': self.updates,
+            'model_version': self.model_version,
+            'latest_observation_at': latest,
+            'model_updated_through': self.applied_through,
+            # How far the online model lags the newest observation it has been given
+            'staleness_seconds': (latest - self.applied_through if latest and self.applied_through
+                                  else None),
+            'seconds_since_update': now - self.updated_at if self.updated_at else None,
+            'base_mae': self.base_mae,
+            'online_mae': self.online_mae,
+            'last_error': self.last_error
+        }
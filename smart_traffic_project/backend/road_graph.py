@@ -0,0 +1,427 @@
+import os
+import gzip
+import heapq
+import xml.etree.ElementTree as ET
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# OSM highway classes we route on, fastest first, with default speeds (km/h)
+ROAD_CLASS_NAMES = ['motorway', 'trunk', 'primary', 'secondary', 'tertiary',
+                    'unclassified', 'residential', 'service']
+DEFAULT_SPEEDS_KMH = np.array([80, 65, 50, 40, 35, 30, 25, 15], dtype=np.float32)
+OSM_HIGHWAY_ALIASES = {'living_street': 'residential', 'road': 'unclassified'}
+
+# Predicted flow (vehicles/hour) at which traffic slows to a crawl on a tertiary road,
+# scaled by how much more (or less) traffic each road class absorbs
+JAM_FLOW = 1000.0
+ROAD_CLASS_CAPACITY = np.array([2.0, 1.6, 1.3, 1.1, 1.0, 0.9, 0.8, 0.6])
+MIN_SPEED_FACTOR = 0.2
+
+# avg_speed range (km/h) in the traffic model's training data; faster or slower roads
+# are predicted at the nearest end rather than extrapolated
+MODEL_SPEED_RANGE_KMH = (10.0, 60.0)
+
+EARTH_RADIUS_M = 6371000.0
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres; works elementwise on arrays"""
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def congestion_speed_factor(predicted_flow, road_class=None):
+    """Fraction of free-flow speed achievable at a predicted traffic flow"""
+    jam_flow = JAM_FLOW if road_class is None else JAM_FLOW * ROAD_CLASS_CAPACITY[road_class]
+    return np.clip(1 - np.asarray(predicted_flow) / jam_flow, MIN_SPEED_FACTOR, 1.0)
+
+def encode_polyline(lats, lngs):
+    """Google encoded polyline for a sequence of coordinates"""
+    result = []
+    previous = (0, 0)
+    for lat, lng in zip(lats, lngs):
+        point = (int(round(lat * 1e5)), int(round(lng * 1e5)))
+        for value in (point[0] - previous[0], point[1] - previous[1]):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        previous = point
+    return ''.join(result)
+
+def _osm_road_class(highway):
+    highway = OSM_HIGHWAY_ALIASES.get(highway, highway)
+    if highway.endswith('_link'):
+        highway = highway[:-5]
+    return ROAD_CLASS_NAMES.index(highway) if highway in ROAD_CLASS_NAMES else None
+
+def _osm_speed(maxspeed, road_class):
+    try:
+        if maxspeed.endswith('mph'):
+            return float(maxspeed[:-3]) * 1.609
+        return float(maxspeed)
+    except (AttributeError, ValueError):
+        return float(DEFAULT_SPEEDS_KMH[road_class])
+
+class RoadGraph:
+    """Directed road network in compressed sparse row (CSR) form
+
+    Outgoing edges of node u are indptr[u]:indptr[u + 1]; per-edge arrays (target,
+    length, free-flow speed, road class, street name) are indexed by edge id.
+    """
+
+    def __init__(self, lat, lng, indptr, indices, length_m, speed_kmh, road_class, edge_name, names):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.length_m = np.asarray(length_m, dtype=np.float32)
+        self.speed_kmh = np.asarray(speed_kmh, dtype=np.float32)
+        self.road_class = np.asarray(road_class, dtype=np.int8)
+        self.edge_name = np.asarray(edge_name, dtype=np.int32)
+        self.names = [str(name) for name in names]
+
+        self.edge_source = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.indptr))
+        self._speed_values, self._speed_index = np.unique(self.speed_kmh, return_inverse=True)
+        # Python lists make the A* inner loop several times faster than NumPy scalar access
+        self._indptr_list = self.indptr.tolist()
+        self._indices_list = self.indices.tolist()
+        # Reverse CSR (incoming edges) for searches backwards from a target
+        self._reverse_order = np.argsort(self.indices, kind='stable')
+        self._reverse_indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=self._reverse_indptr[1:])
+        self._reverse_indices = self.edge_source[self._reverse_order]
+
+    @property
+    def num_nodes(self):
+        return len(self.lat)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.lat, self.lng, self.indptr, self.indices, self.length_m,
+                                              self.speed_kmh, self.road_class, self.edge_name))
+
+    @classmethod
+    def from_edges(cls, lat, lng, sources, targets, length_m, speed_kmh, road_class,
+                   edge_name=None, names=None):
+        """Build the CSR arrays from an unordered edge list
+
+        Self-loops are dropped and parallel edges collapse to the shortest one, so a
+        (source, target) pair identifies a single edge.
+        """
+        sources, targets = np.asarray(sources), np.asarray(targets)
+        length_m = np.asarray(length_m)
+        if edge_name is None:
+            edge_name, names = np.full(len(sources), -1), []
+
+        order = np.lexsort((length_m, targets, sources))
+        order = order[sources[order] != targets[order]]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (sources[order][1:] != sources[order][:-1]) | (targets[order][1:] != targets[order][:-1])
+        order = order[first]
+
+        indptr = np.zeros(len(lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[order], minlength=len(lat)), out=indptr[1:])
+        return cls(lat, lng, indptr, targets[order], length_m[order],
+                   np.asarray(speed_kmh)[order], np.asarray(road_class)[order],
+                   np.asarray(edge_name)[order], names)
+
+    @classmethod
+    def from_osm(cls, path):
+        """Parse the drivable roads out of an OSM XML extract (.osm or .osm.gz)"""
+        opener = gzip.open if path.endswith('.gz') else open
+        coordinates = {}
+        ways = []
+        with opener(path, 'rb') as f:
+            for _, element in ET.iterparse(f, events=('end',)):
+                if element.tag == 'node':
+                    coordinates[element.get('id')] = (float(element.get('lat')), float(element.get('lon')))
+                    element.clear()
+                elif element.tag == 'way':
+                    tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                    road_class = _osm_road_class(tags.get('highway', ''))
+                    if road_class is not None:
+                        refs = [nd.get('ref') for nd in element.iter('nd')]
+                        ways.append((refs, road_class, tags))
+                    element.clear()
+                elif element.tag == 'relation':
+                    element.clear()
+
+        node_ids = {}
+        names = {}
+        sources, targets, speeds, classes, edge_names = [], [], [], [], []
+        for refs, road_class, tags in ways:
+            refs = [ref for ref in refs if ref in coordinates]
+            oneway = tags.get('oneway', 'yes' if ROAD_CLASS_NAMES[road_class] == 'motorway' else 'no')
+            speed = _osm_speed(tags.get('maxspeed'), road_class)
+            name = names.setdefault(tags.get('name') or tags.get('ref') or ROAD_CLASS_NAMES[road_class].title(),
+                                    len(names))
+            for a, b in zip(refs, refs[1:]):
+                a, b = node_ids.setdefault(a, len(node_ids)), node_ids.setdefault(b, len(node_ids))
+                directions = [(b, a)] if oneway == '-1' else [(a, b)] if oneway in ('yes', '1', 'true') \
+                    else [(a, b), (b, a)]
+                for u, v in directions:
+                    sources.append(u)
+                    targets.append(v)
+                    speeds.append(speed)
+                    classes.append(road_class)
+                    edge_names.append(name)
+
+        positions = np.array([coordinates[node_id] for node_id in node_ids], dtype=np.float64).reshape(-1, 2)
+        lat, lng = positions[:, 0], positions[:, 1]
+        sources, targets = np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+        length_m = haversine_m(lat[sources], lng[sources], lat[targets], lng[targets])
+        return cls.from_edges(lat, lng, sources, targets, length_m, speeds, classes,
+                              edge_names, sorted(names, key=names.get))
+
+    @classmethod
+    def synthetic_city(cls, rows=110, cols=110, spacing_m=100, origin=(12.9716, 77.5946), seed=42):
+        """Grid city for offline use: residential blocks, arterials every 5 and 10 streets and a ring road"""
+        rng = np.random.default_rng(seed)
+        dlat = spacing_m / 111320.0
+        dlng = spacing_m / (111320.0 * np.cos(np.radians(origin[0])))
+        row, col = np.divmod(np.arange(rows * cols), cols)
+        lat = origin[0] + (row + rng.uniform(-0.15, 0.15, rows * cols)) * dlat
+        lng = origin[1] + (col + rng.uniform(-0.15, 0.15, rows * cols)) * dlng
+
+        def street_class(line, last):
+            return np.select([(line == 0) | (line == last), line % 10 == 0, line % 5 == 0],
+                             [ROAD_CLASS_NAMES.index('trunk'), ROAD_CLASS_NAMES.index('primary'),
+                              ROAD_CLASS_NAMES.index('secondary')],
+                             default=ROAD_CLASS_NAMES.index('residential'))
+
+        horizontal = (row < rows) & (col < cols - 1)
+        vertical = row < rows - 1
+        a = np.concatenate([np.flatnonzero(horizontal), np.flatnonzero(vertical)])
+        b = np.concatenate([np.flatnonzero(horizontal) + 1, np.flatnonzero(vertical) + cols])
+        line = np.concatenate([row[horizontal], col[vertical]])
+        is_vertical = np.concatenate([np.zeros(horizontal.sum(), bool), np.ones(vertical.sum(), bool)])
+        classes = np.where(is_vertical, street_class(line, cols - 1), street_class(line, rows - 1))
+
+        # Knock out some residential blocks so the grid has dead ends and detours
+        keep = (classes != ROAD_CLASS_NAMES.index('residential')) | (rng.random(len(a)) > 0.08)
+        a, b, line, is_vertical, classes = a[keep], b[keep], line[keep], is_vertical[keep], classes[keep]
+
+        name_index = {}
+        edge_names = np.empty(len(a), dtype=np.int64)
+        for i, (vertical_street, number, road_class) in enumerate(zip(is_vertical, line, classes)):
+            if ROAD_CLASS_NAMES[road_class] == 'trunk':
+                name = 'Outer Ring Road'
+            elif ROAD_CLASS_NAMES[road_class] == 'residential':
+                name = f"{'Cross' if vertical_street else 'Street'} {number}"
+            else:
+                name = f"{'Avenue' if vertical_street else 'Main Road'} {number}"
+            edge_names[i] = name_index.setdefault(name, len(name_index))
+        names = sorted(name_index, key=name_index.get)
+
+        length_m = haversine_m(lat[a], lng[a], lat[b], lng[b])
+        return cls.from_edges(lat, lng, np.concatenate([a, b]), np.concatenate([b, a]),
+                              np.tile(length_m, 2), np.tile(DEFAULT_SPEEDS_KMH[classes], 2),
+                              np.tile(classes, 2), np.tile(edge_names, 2), names)
+
+    def save(self, path):
+        np.savez(path, lat=self.lat, lng=self.lng, indptr=self.indptr, indices=self.indices,
+                 length_m=self.length_m, speed_kmh=self.speed_kmh, road_class=self.road_class,
+                 edge_name=self.edge_name, names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    @classmethod
+    def load_any(cls, path):
+        """Load a saved .npz graph, or an OSM extract via a compiled .npz cached next to it"""
+        if path.endswith('.npz'):
+            return cls.load(path)
+        compiled = path + '.npz'
+        if os.path.exists(compiled) and os.path.getmtime(compiled) >= os.path.getmtime(path):
+            return cls.load(compiled)
+        graph = cls.from_osm(path)
+        graph.save(compiled)
+        return graph
+
+    def nearest_node(self, lat, lng):
+        """Closest node to a coordinate (equirectangular approximation)"""
+        dx = (self.lng - lng) * np.cos(np.radians(lat))
+        dy = self.lat - lat
+        return int(np.argmin(dx * dx + dy * dy))
+
+    def free_flow_times(self):
+        """Seconds to traverse each edge at its free-flow speed"""
+        return self.length_m / (self.speed_kmh / 3.6)
+
+    def predicted_travel_times(self, predictor, departure_time, weather=None, event_flag=0):
+        """Seconds per edge at the predicted congestion for a departure time
+
+        Features other than speed are the same for every edge, so the model runs once
+        per distinct free-flow speed rather than once per edge.
+        """
+        weather = weather or {}
+        hour = departure_time.hour
+        day_of_week = departure_time.weekday()
+        scenarios = [{
+            'hour': hour, 'day_of_week': day_of_week, 'is_weekend': int(day_of_week >= 5),
+            'rain_intensity': weather.get('rain_intensity', 0.0),
+            'temperature': weather.get('temperature', 25), 'humidity': weather.get('humidity', 60),
+            'event_flag': event_flag, 'rush_hour': int(7 <= hour <= 9 or 17 <= hour <= 19),
+            'avg_speed': float(np.clip(speed, *MODEL_SPEED_RANGE_KMH))
+        } for speed in self._speed_values]
+        flow = predictor.predict_traffic_batch(scenarios)[self._speed_index]
+        factors = congestion_speed_factor(flow, self.road_class).astype(np.float32)
+        return self.length_m / (self.speed_kmh / 3.6 * factors)
+
+    def shortest_path(self, source, target, weights):
+        """A* from source to target; returns (edge ids, cost) or None if unreachable
+
+        The heuristic is straight-line distance at the fastest speed any edge allows
+        under these weights, which never overestimates, so the path is optimal.
+        """
+        if source == target:
+            return [], 0.0
+
+        max_speed = float(np.max(self.length_m / np.maximum(weights, 1e-6)))
+        heuristic = (haversine_m(self.lat, self.lng, self.lat[target], self.lng[target])
+                     / max(max_speed, 1e-6)).tolist()
+        weights = np.asarray(weights, dtype=np.float64).tolist()
+        indptr, indices = self._indptr_list, self._indices_list
+
+        best = {source: 0.0}
+        via_edge = {}
+        heap = [(heuristic[source], 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                new_cost = cost + weights[edge]
+                if new_cost < best.get(neighbor, float('inf')):
+                    best[neighbor] = new_cost
+                    via_edge[neighbor] = edge
+                    heapq.heappush(heap, (new_cost + heuristic[neighbor], new_cost, neighbor))
+        else:
+            return None
+
+        edges = []
+        node = target
+        while node != source:
+            edge = via_edge[node]
+            edges.append(edge)
+            node = int(self.edge_source[edge])
+        return edges[::-1], best[target]
+
+    def _search_tree(self, weights, node, reverse=False):
+        """Distances and predecessors from node to every node (to node if reverse)"""
+        if reverse:
+            matrix = csr_matrix((weights[self._reverse_order], self._reverse_indices, self._reverse_indptr),
+                                shape=(self.num_nodes, self.num_nodes))
+        else:
+            matrix = csr_matrix((weights, self.indices, self.indptr), shape=(self.num_nodes, self.num_nodes))
+        return dijkstra(matrix, indices=node, return_predecessors=True)
+
+    def _edges_along(self, nodes):
+        """Edge ids joining consecutive nodes of a path"""
+        edges = []
+        for u, v in zip(nodes[:-1], nodes[1:]):
+            start = self.indptr[u]
+            edges.append(start + int(np.flatnonzero(self.indices[start:self.indptr[u + 1]] == v)[0]))
+        return np.array(edges, dtype=np.int64)
+
+    def alternative_routes(self, source, target, weights, k=3, max_stretch=1.4, max_overlap=0.7,
+                           max_candidates=300):
+        """Up to k distinct routes, best first, using via-node alternatives
+
+        One Dijkstra search forward from the source and one backward from the target
+        give the cost of the best route through every node. Via nodes are tried
+        cheapest first; their route is kept if it has no loops, is at most max_stretch
+        times the optimum and shares at most max_overlap of its length with every
+        route already kept. The first one accepted is the optimal route.
+        """
+        if source == target:
+            return []
+        weights = np.maximum(np.asarray(weights, dtype=np.float64), 1e-3)
+        cost_from, previous = self._search_tree(weights, source)
+        cost_to, following = self._search_tree(weights, target, reverse=True)
+        best = cost_from[target]
+        if not np.isfinite(best):
+            return []
+
+        via_cost = cost_from + cost_to
+        candidates = np.flatnonzero(via_cost <= best * max_stretch)
+        candidates = candidates[np.argsort(via_cost[candidates], kind='stable')]
+
+        covered = np.zeros(self.num_nodes, dtype=bool)
+        routes = []
+        tried = 0
+        for via in candidates:
+            if covered[via]:
+                continue
+            tried += 1
+            if tried > max_candidates:
+                break
+
+            nodes = [int(via)]
+            while nodes[-1] != source:
+                nodes.append(int(previous[nodes[-1]]))
+            nodes.reverse()
+            while nodes[-1] != target:
+                nodes.append(int(following[nodes[-1]]))
+            covered[nodes] = True
+            if len(set(nodes)) != len(nodes):
+                continue
+
+            edges = self._edges_along(nodes)
+            length = float(self.length_m[edges].sum())
+            if any(self.length_m[np.intersect1d(edges, accepted)].sum() > max_overlap * length
+                   for accepted, _ in routes):
+                continue
+            routes.append((edges, float(weights[edges].sum())))
+            if len(routes) == k:
+                break
+        return routes
+
+    def route_nodes(self, edges):
+        """Node sequence visited by a list of edge ids"""
+        if len(edges) == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate([[self.edge_source[edges[0]]], self.indices[edges]])
+
+    def describe_route(self, edges, travel_times):
+        """Turn-by-turn steps (one per street) plus totals and segments for a route
+
+        Segments are runs of edges with the same street, speed and road class.
+        """
+        steps = []
+        segments = []
+        for edge in edges:
+            name = self.names[self.edge_name[edge]] if self.edge_name[edge] >= 0 else 'unnamed road'
+            if steps and steps[-1][0] == name:
+                steps[-1][1] += float(self.length_m[edge])
+            else:
+                steps.append([name, float(self.length_m[edge])])
+            speed, road_class = float(self.speed_kmh[edge]), int(self.road_class[edge])
+            if segments and segments[-1]['name'] == name and segments[-1]['speed_kmh'] == speed \
+                    and segments[-1]['road_class'] == road_class:
+                segments[-1]['length_m'] += float(self.length_m[edge])
+            else:
+                segments.append({'name': name, 'length_m': float(self.length_m[edge]),
+                                 'speed_kmh': speed, 'road_class': road_class})
+        return {
+            'distance_m': float(self.length_m[edges].sum()),
+            'duration_s': float(np.asarray(travel_times)[edges].sum()),
+            'free_flow_speed_kmh': float(self.length_m[edges].sum()
+                                         / (self.length_m[edges] / self.speed_kmh[edges]).sum())
+                                   if len(edges) else 0.0,
+            'streets': [(name, length) for name, length in steps],
+            'segments': segments,
+            'steps': [f"Continue on {name} for {length / 1000:.1f} km" for name, length in steps]
+        }
@@ -0,0 +1,163 @@
+from datetime import timedelta
+import numpy as np
+
+from ml_models import FEATURE_COLUMNS
+from road_graph import congestion_speed_factor, MIN_SPEED_FACTOR, MODEL_SPEED_RANGE_KMH
+
+# How much rain slows free-flow speed at rain_intensity = 1
+RAIN_SPEED_PENALTY = 0.3
+
+# Longest prediction table (hours) built for one request
+MAX_TABLE_HOURS = 72
+
+def segment_arrays(routes):
+    """Concatenate the segments of every route into flat arrays plus each route's offset"""
+    lengths, speeds, classes, starts = [], [], [], [0]
+    for route in routes:
+        for segment in route['segments']:
+            lengths.append(segment['length_m'])
+            speeds.append(segment['speed_kmh'])
+            classes.append(segment['road_class'])
+        starts.append(len(lengths))
+    return (np.array(lengths, dtype=np.float64), np.array(speeds, dtype=np.float64),
+            np.array(classes, dtype=np.int64), np.array(starts, dtype=np.int64))
+
+def hourly_features(departure_time, hours, speeds, weather, event_flag):
+    """Feature matrix for every (hour offset, speed) pair, hour-major"""
+    start_hour = departure_time.hour + np.arange(hours)
+    hour = start_hour % 24
+    day_of_week = (departure_time.weekday() + start_hour // 24) % 7
+    columns = {
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'is_weekend': (day_of_week >= 5).astype(np.int64),
+        'rain_intensity': np.full(hours, weather.get('rain_intensity', 0.0)),
+        'temperature': np.full(hours, weather.get('temperature', 25)),
+        'humidity': np.full(hours, weather.get('humidity', 60)),
+        'event_flag': np.full(hours, event_flag),
+        'rush_hour': (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(np.int64)
+    }
+    X = np.empty((hours, len(speeds), len(FEATURE_COLUMNS)))
+    model_speeds = np.clip(speeds, *MODEL_SPEED_RANGE_KMH)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        X[:, :, i] = model_speeds[None, :] if column == 'avg_speed' else columns[column][:, None]
+    return X.reshape(-1, len(FEATURE_COLUMNS))
+
+def departure_grid(predictor, routes, first_departure, offsets_s, weather=None, event_flag=0,
+                   max_iterations=4):
+    """Travel times for every (departure, route) pair from one batched model call
+
+    Departures are first_departure plus each of offsets_s (seconds). Every segment is
+    predicted at the hour the vehicle reaches it: the model runs once on a table of
+    (hour, segment speed) pairs covering every hour any departure could reach, and
+    arrival hours are resolved by a few rounds of table lookups (each round
+    re-derives the hours from the previous travel times). Returns a dict of
+    (departures x routes) arrays, or None if the routes have no segments.
+    """
+    weather = weather or {}
+    lengths, speeds, classes, starts = segment_arrays(routes)
+    if len(lengths) == 0:
+        return None
+    speeds = np.maximum(speeds * (1 - weather.get('rain_intensity', 0.0) * RAIN_SPEED_PENALTY), 1.0)
+    free_flow = lengths / (speeds / 3.6)
+    route_of = np.repeat(np.arange(len(routes)), np.diff(starts))
+    # Segment -> route membership, so per-route sums are one matrix product for all departures
+    membership = np.zeros((len(lengths), len(routes)))
+    membership[np.arange(len(lengths)), route_of] = 1.0
+
+    # Seconds from the top of the first departure's hour
+    offsets_s = (first_departure.minute * 60 + first_departure.second
+                 + np.asarray(offsets_s, dtype=np.float64))
+    longest = (free_flow @ membership).max() / MIN_SPEED_FACTOR
+    hours = int(min(np.ceil((offsets_s.max() + longest) / 3600) + 1, MAX_TABLE_HOURS))
+    speed_values, speed_index = np.unique(speeds, return_inverse=True)
+
+    flow_table = predictor.predict_traffic_batch(
+        hourly_features(first_departure, hours, speed_values, weather, event_flag)
+    ).reshape(hours, len(speed_values))
+
+    start_hour = np.minimum(offsets_s // 3600, hours - 1).astype(np.int64)
+    hour_offset = np.repeat(start_hour[:, None], len(lengths), axis=1)
+    for iteration in range(max_iterations):
+        flow = flow_table[hour_offset, speed_index]
+        travel = free_flow / congestion_speed_factor(flow, classes)
+        # Seconds from departure at which each segment is entered
+        cumulative = np.cumsum(travel, axis=1)
+        route_start = np.concatenate([np.zeros((len(offsets_s), 1)), cumulative], axis=1)[:, starts[:-1]]
+        entered = cumulative - travel - route_start[:, route_of]
+        new_offset = np.minimum((offsets_s[:, None] + entered) // 3600, hours - 1).astype(np.int64)
+        if np.array_equal(new_offset, hour_offset) or iteration == max_iterations - 1:
+            break
+        hour_offset = new_offset
+
+    duration = travel @ membership
+    distance = lengths @ membership
+    # Length-weighted so long stretches count for more than short links
+    traffic = (flow * lengths) @ membership / np.maximum(distance, 1e-9)
+    last_hour = np.stack([hour_offset[:, starts[i]:starts[i + 1]].max(axis=1, initial=0)
+                          for i in range(len(routes))], axis=1)
+    return {
+        'duration_s': duration,
+        'free_flow_s': free_flow @ membership,
+        'distance_m': distance,
+        'avg_speed_kmh': np.divide(distance * 3.6, duration, out=np.zeros_like(duration), where=duration > 0),
+        'predicted_traffic': traffic,
+        'segments': np.diff(starts),
+        'hours_spanned': np.where(distance > 0, last_hour - start_hour[:, None] + 1, 0)
+    }
+
+def estimate_route_times(predictor, routes, departure_time, weather=None, event_flag=0, max_iterations=4):
+    """Time-dependent travel time for each route from per-segment traffic predictions"""
+    grid = departure_grid(predictor, routes, departure_time, [0], weather, event_flag, max_iterations)
+    if grid is None:
+        return []
+    return [{
+        'duration_s': float(grid['duration_s'][0, i]),
+        'free_flow_s': float(grid['free_flow_s'][i]),
+        'distance_m': float(grid['distance_m'][i]),
+        'avg_speed_kmh': float(grid['avg_speed_kmh'][0, i]),
+        'predicted_traffic': float(grid['predicted_traffic'][0, i]),
+        'segments': int(grid['segments'][i]),
+        'hours_spanned': int(grid['hours_spanned'][0, i])
+    } for i in range(len(routes))]
+
+def best_departures(predictor, routes, window_start, window_minutes=120, step_minutes=15,
+                    weather=None, event_flag=0, top=5):
+    """Rank departure slots in a time window by the quickest route at each slot
+
+    Every slot x route pair is scored from one model call (see departure_grid).
+    Returns the full grid plus the `top` slots, shortest trip first.
+    """
+    weather = weather or {}
+    offsets = np.arange(0, window_minutes + 1, step_minutes) * 60
+    grid = departure_grid(predictor, routes, window_start, offsets, weather, event_flag)
+    if grid is None:
+        return {'departures': [], 'routes': [], 'duration_s': [], 'score': [], 'best': []}
+
+    scores = predictor.calculate_route_score_batch(
+        grid['predicted_traffic'], grid['avg_speed_kmh'], weather.get('rain_intensity', 0.0),
+        0.3 if event_flag else 0.0
+    )
+    best_route = grid['duration_s'].argmin(axis=1)
+    slots = np.arange(len(offsets))
+    best_duration = grid['duration_s'][slots, best_route]
+    # Shortest trip first; ties go to the earlier departure
+    ranking = np.lexsort((offsets, np.round(best_duration)))[:top]
+
+    departures = [window_start + timedelta(seconds=int(offset)) for offset in offsets]
+    return {
+        'departures': [departure.isoformat(timespec='minutes') for departure in departures],
+        'routes': [route['name'] for route in routes],
+        'duration_s': np.round(grid['duration_s'], 1).tolist(),
+        'score': np.round(scores, 1).tolist(),
+        'best': [{
+            'departure_time': departures[slot].isoformat(timespec='minutes'),
+            'arrival_time': (departures[slot] + timedelta(seconds=float(best_duration[slot])))
+                            .isoformat(timespec='minutes'),
+            'route': routes[best_route[slot]]['name'],
+            'duration_s': round(float(best_duration[slot]), 1),
+            'duration': f"{round(best_duration[slot] / 60)} mins",
+            'score': round(float(scores[slot, best_route[slot]]), 1),
+            'predicted_traffic': round(float(grid['predicted_traffic'][slot, best_route[slot]]), 0)
+        } for slot in ranking]
+    }
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Production server for the traffic API: gunicorn with pre-forked workers
+
+    python backend/serve.py                       # one worker per CPU, 4 threads each, on 0.0.0.0:5001
+    python backend/serve.py --workers 4 --bind 127.0.0.1:8000
+    python backend/serve.py --app simple          # simple_backend.py instead of api.py
+
+The app (and its models) is loaded once in the master before forking, so every worker
+shares the model pages copy-on-write instead of loading its own copy. Signals to the
+master:
+
+    HUP   reload the latest registry model in the master, then replace the workers
+          gracefully (old ones finish their in-flight requests)
+    TERM  graceful shutdown, waiting up to --graceful-timeout seconds
+"""
+
+import argparse
+import gc
+import importlib
+import multiprocessing
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BACKEND_DIR)
+sys.path[:0] = [BACKEND_DIR, PROJECT_DIR]
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+APPS = {'api': 'api', 'simple': 'simple_backend'}
+
+class TrafficServer(BaseApplication):
+    """Runs a Flask app module under gunicorn with the model preloaded in the master"""
+
+    def __init__(self, module_name, options):
+        self.module_name = module_name
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('pre_fork', self._pre_fork)
+        self.cfg.set('post_fork', self._post_fork)
+        self.cfg.set('on_reload', self._on_reload)
+
+    def load(self):
+        # Background threads do not survive fork(); workers start their own in post_fork
+        os.environ['TRAFFIC_PREFORK'] = '1'
+        return importlib.import_module(self.module_name).app
+
+    def _module(self):
+        return sys.modules.get(self.module_name)
+
+    @staticmethod
+    def _pre_fork(server, worker):
+        # Keep the collector from touching (and so copying) objects the master already holds
+        gc.freeze()
+
+    def _post_fork(self, server, worker):
+        after_fork = getattr(self._module(), 'after_fork', None)
+        if after_fork is not None:
+            after_fork()
+        server.log.info(f"Worker {worker.pid} ready")
+
+    def _on_reload(self, server):
+        load_active_model = getattr(self._module(), 'load_active_model', None)
+        if load_active_model is not None:
+            server.log.info("Reloading models before replacing workers")
+            load_active_model()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the traffic API with pre-forked gunicorn workers")
+    parser.add_argument('--app', choices=sorted(APPS), default='api')
+    parser.add_argument('--bind', default=os.environ.get('TRAFFIC_BIND', '0.0.0.0:5001'))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('TRAFFIC_WORKERS', multiprocessing.cpu_count())))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('TRAFFIC_THREADS', 4)),
+                        help="threads per worker (>1 uses the gthread worker; 1 is the sync worker)")
+    parser.add_argument('--timeout', type=int, default=60)
+    parser.add_argument('--graceful-timeout', type=int, default=30)
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument('--pid', default=None, help="write the master pid here, for signals")
+    args = parser.parse_args()
+
+    if not GUNICORN_AVAILABLE:
+        print("gunicorn is not installed: pip install gunicorn")
+        sys.exit(1)
+
+    if args.threads == 1:
+        # A sync worker handles one request at a time, so there is nothing to batch with
+        os.environ.setdefault('TRAFFIC_BATCH_MAX_SIZE', '1')
+
+    TrafficServer(APPS[args.app], {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        'pidfile': args.pid,
+        'accesslog': None
+    }).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+
+from ml_models import FEATURE_COLUMNS
+from route_timing import RAIN_SPEED_PENALTY
+
+# Forecast resolutions (minutes) and the longest horizon served
+FORECAST_STEPS = (15, 30, 60)
+MAX_FORECAST_DAYS = 14
+
+def calendar_features(start, periods, step_minutes):
+    """hour, day_of_week, is_weekend and rush_hour arrays for a regular time grid"""
+    times = np.datetime64(start.replace(tzinfo=None), 'm') + np.arange(periods) * np.timedelta64(step_minutes, 'm')
+    hour = times.astype('datetime64[h]').astype(np.int64) % 24
+    # 1970-01-01 was a Thursday (weekday 3)
+    day_of_week = (times.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    return times, {
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'is_weekend': (day_of_week >= 5).astype(np.int64),
+        'rush_hour': (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(np.int64)
+    }
+
+class TrafficForecaster:
+    """Predicted flow and route score over a multi-day horizon, cached per horizon start
+
+    The whole horizon is one feature matrix (calendar arrays plus per-hour weather from
+    the weather layer) and one model call. Results are kept per (horizon start, request
+    parameters, model version), so repeated polls within a step are dictionary lookups
+    and a model hot swap starts a fresh entry.
+    """
+
+    def __init__(self, predictor_getter, weather_api, cache_size=64):
+        self.predictor_getter = predictor_getter
+        self.weather_api = weather_api
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def forecast(self, start, days=3, step_minutes=60, avg_speed=35, event_flag=0, city=None):
+        """Forecast from `start` (floored to the step) for `days` days"""
+        if step_minutes not in FORECAST_STEPS:
+            raise ValueError(f"step_minutes must be one of {FORECAST_STEPS}")
+        if not 0 < days <= MAX_FORECAST_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_FORECAST_DAYS}")
+        start = start.replace(second=0, microsecond=0)
+        start -= timedelta(minutes=start.minute % step_minutes)
+
+        predictor = self.predictor_getter()
+        key = (start, days, step_minutes, float(avg_speed), int(event_flag), city,
+               getattr(predictor, 'model_version', None))
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self._stats['hits'] += 1
+                return result
+            self._stats['misses'] += 1
+
+        result = self._compute(predictor, start, days, step_minutes, avg_speed, event_flag, city)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, predictor, start, days, step_minutes, avg_speed, event_flag, city):
+        began = time.perf_counter()
+        periods = days * 24 * 60 // step_minutes
+        times, columns = calendar_features(start, periods, step_minutes)
+        weather = self.weather_api.weather_for_hours(columns['day_of_week'], columns['hour'], city)
+        columns.update(weather)
+        columns['event_flag'] = np.full(periods, event_flag)
+        columns['avg_speed'] = avg_speed * (1 - weather['rain_intensity'] * RAIN_SPEED_PENALTY)
+
+        X = np.column_stack([np.broadcast_to(columns[column], periods) for column in FEATURE_COLUMNS])
+        predictions, scores = predictor.score_traffic_batch(X)
+        return {
+            'start': start.isoformat(timespec='minutes'),
+            'days': days,
+            'step_minutes': step_minutes,
+            'timestamps': np.datetime_as_string(times, unit='m').tolist(),
+            'predicted_traffic': np.round(predictions, 0).tolist(),
+            'route_score': np.round(scores, 1).tolist(),
+            'rain_intensity': weather['rain_intensity'].tolist(),
+            'temperature': weather['temperature'].tolist(),
+            'model_version': getattr(predictor, 'model_version', None),
+            'compute_ms': round((time.perf_counter() - began) * 1000, 1)
+        }
+
+    def cache_stats(self):
+        with self._lock:
+            return {**self._stats, 'cached_horizons': len(self._cache)}
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/predict/batch request bodies: JSON vs raw float32 vs Arrow IPC
+
+    python benchmark_batch_formats.py
+
+Times parsing the body into a feature matrix on its own, then the full request
+through the Flask app (parse, score, encode the response) with the test client.
+"""
+
+import json
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import api
+import batch_formats
+from ml_models import FEATURE_COLUMNS
+
+def best_ms(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def random_rows(rng, n):
+    return np.column_stack([
+        rng.integers(0, 24, n), rng.integers(0, 7, n), rng.integers(0, 2, n),
+        rng.random(n).round(2), rng.uniform(15, 40, n).round(1), rng.uniform(30, 95, n).round(0),
+        rng.integers(0, 2, n), rng.integers(0, 2, n), rng.uniform(10, 60, n).round(1)
+    ])
+
+def main():
+    client = api.app.test_client()
+    predictor = api.model_reloader.predictor
+
+    print("\nBatch Format Benchmark")
+    print("=" * 50)
+    print(f"{'Rows':>8} {'Format':10} {'body':>10} {'parse (ms)':>11} {'request (ms)':>13}")
+
+    for n_rows in (10_000, 100_000):
+        X = random_rows(np.random.default_rng(0), n_rows)
+        scenarios = [dict(zip(FEATURE_COLUMNS, row)) for row in X.tolist()]
+        body = json.dumps({'scenarios': scenarios}).encode()
+
+        parse_ms = best_ms(lambda: predictor.to_feature_matrix(json.loads(body)['scenarios']))
+        request_ms = best_ms(lambda: client.post('/api/predict/batch', data=body, content_type='application/json'), 3)
+        print(f"{n_rows:>8,} {'JSON':10} {len(body) / 1e6:8.2f} MB {parse_ms:11.3f} {request_ms:13.1f}")
+
+        for label, content_type in (('raw', batch_formats.RAW_CONTENT_TYPE),
+                                    ('Arrow', batch_formats.ARROW_CONTENT_TYPE)):
+            if content_type not in batch_formats.content_types():
+                continue
+            body = batch_formats.encode(FEATURE_COLUMNS, X, content_type)
+            parse_ms = best_ms(lambda: batch_formats.decode(body, content_type))
+            request_ms = best_ms(lambda: client.post('/api/predict/batch', data=body, content_type=content_type), 3)
+            print(f"{n_rows:>8,} {label:10} {len(body) / 1e6:8.2f} MB {parse_ms:11.3f} {request_ms:13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Benchmark synthetic data generation throughput (rows/s)
+"""
+
+import os
+import sys
+import time
+import tempfile
+from data_generator import generate_traffic_dataset, write_traffic_dataset
+
+def rows_per_second(func, num_records):
+    start = time.perf_counter()
+    func()
+    return num_records / (time.perf_counter() - start)
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5_000, 100_000, 1_000_000, 5_000_000]
+
+    print("Data Generator Benchmark")
+    print("=" * 50)
+    print(f"\n{'Rows':>12} {'in memory (rows/s)':>20} {'to CSV (rows/s)':>18}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'traffic_data.csv')
+        for num_records in sizes:
+            in_memory = rows_per_second(lambda: generate_traffic_dataset(num_records), num_records)
+            to_csv = rows_per_second(lambda: write_traffic_dataset(path, num_records), num_records)
+            print(f"{num_records:12,} {in_memory:20,.0f} {to_csv:18,.0f}")
+
+if __name__ == "__main__":
+    main()
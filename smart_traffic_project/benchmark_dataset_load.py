@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark dataset loading: plain pd.read_csv vs the typed columnar dataset layer
+"""
+
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+from data_generator import write_traffic_dataset
+from traffic_dataset import load_traffic_data, convert_csv
+
+def timed_load(func, repeats=3):
+    """Best load time in milliseconds and the memory of the loaded frame in MB"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, df.memory_usage(deep=True).sum() / 1e6
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"Dataset Load Benchmark ({num_records:,} rows)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'traffic_data.csv')
+        parquet_path = os.path.join(tmp, 'traffic_data.parquet')
+        write_traffic_dataset(csv_path, num_records)
+        convert_csv(csv_path)
+        convert_csv(csv_path, parquet_path)
+
+        print(f"\n{'Loader':32} {'load (ms)':>10} {'memory (MB)':>12} {'file (MB)':>10}")
+        for label, path, loader in [
+            ("pd.read_csv (int64/float64)", csv_path, lambda: pd.read_csv(csv_path)),
+            ("load_traffic_data (Feather)", csv_path[:-4] + '.feather', lambda: load_traffic_data(csv_path)),
+            ("load_traffic_data (Parquet)", parquet_path, lambda: load_traffic_data(parquet_path))
+        ]:
+            load_ms, memory_mb = timed_load(loader)
+            print(f"{label:32} {load_ms:10.1f} {memory_mb:12.1f} {os.path.getsize(path) / 1e6:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark the flattened Random Forest engine against sklearn's predict
+"""
+
+import time
+import numpy as np
+from ml_models import TrafficPredictor, FlatForest, FEATURE_COLUMNS
+
+def load_predictor():
+    """Load saved models, training them if needed"""
+    predictor = TrafficPredictor()
+    if not predictor.load_models():
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+        predictor.save_models()
+    return predictor
+
+def time_call(func, X, repeats):
+    """Best wall time in milliseconds over several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def sample_rows(predictor, n_rows):
+    """Draw realistic feature rows from the training data"""
+    rng = np.random.default_rng(0)
+    X = predictor.df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    return X[rng.integers(0, len(X), n_rows)]
+
+def main():
+    print("Flattened Forest Inference Benchmark")
+    print("=" * 50)
+
+    predictor = load_predictor()
+    predictor.load_data('traffic_data.csv')
+    rf_model = predictor.models['Random Forest']
+
+    start = time.perf_counter()
+    flat_forest = FlatForest.from_sklearn(rf_model)
+    print(f"Export time: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(flat_forest.value):,} nodes, depth {flat_forest.max_depth})")
+
+    print(f"\n{'Rows':>8} {'sklearn (ms)':>14} {'flat (ms)':>12} {'speedup':>9} {'max diff':>10}")
+    for n_rows, repeats in [(1, 200), (100, 50), (100_000, 3)]:
+        X = sample_rows(predictor, n_rows)
+
+        max_diff = np.abs(rf_model.predict(X) - flat_forest.predict(X)).max()
+        sklearn_ms = time_call(rf_model.predict, X, repeats)
+        flat_ms = time_call(flat_forest.predict, X, repeats)
+
+        print(f"{n_rows:>8,} {sklearn_ms:>14.3f} {flat_ms:>12.3f} "
+              f"{sklearn_ms / flat_ms:>8.1f}x {max_diff:>10.2e}")
+
+    print(f"\nTrafficPredictor(fast_inference=True) uses the flat engine for batches "
+          f"up to {TrafficPredictor.flat_forest_max_rows:,} rows")
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark model evaluation in the serving process vs an InferencePool of 1..N processes
+
+    python benchmark_inference_pool.py              # up to one process per CPU
+    python benchmark_inference_pool.py 8 32 5       # <max processes> <threads> <seconds>
+
+Batch: one 100,000-row predict_traffic_batch call, split across the pool's workers.
+Single: caller threads (standing in for threaded Flask handlers) each predict and score
+one random scenario at a time. Prediction caches are off so every row reaches the model.
+"""
+
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+from ml_models import TrafficPredictor
+from inference_pool import InferencePool
+
+def load_predictor(inference_pool=None):
+    predictor = TrafficPredictor(fast_inference=True, cache_size=0, inference_pool=inference_pool)
+    if not predictor.load_models():
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+        predictor.save_models()
+    return predictor
+
+def random_rows(rng, n):
+    return np.column_stack([
+        rng.integers(0, 24, n), rng.integers(0, 7, n), rng.integers(0, 2, n),
+        rng.random(n).round(2), rng.uniform(15, 40, n).round(1), rng.uniform(30, 95, n).round(0),
+        rng.integers(0, 2, n), rng.integers(0, 2, n), rng.uniform(10, 60, n).round(1)
+    ]).astype(np.float64)
+
+def batch_rows_per_second(predictor, X, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict_traffic_batch(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+def single_requests_per_second(predictor, threads, duration):
+    counts = [0] * threads
+    deadline = time.perf_counter() + duration
+
+    def caller(index):
+        rows = random_rows(np.random.default_rng(index), 10000)
+        while time.perf_counter() < deadline:
+            row = rows[counts[index] % len(rows)]
+            traffic = predictor.predict_traffic(*row)
+            predictor.calculate_route_score(traffic, row[8], row[3], 0.3 if row[6] else 0.0)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=caller, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / duration
+
+def main():
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print("Inference Pool Benchmark")
+    print("=" * 50)
+    print(f"{os.cpu_count()} CPUs, {threads} caller threads, {duration:.0f} s per single-request run\n")
+
+    X = random_rows(np.random.default_rng(0), 100_000)
+    predictor = load_predictor()
+    batch = batch_rows_per_second(predictor, X)
+    single = single_requests_per_second(predictor, threads, duration)
+    print(f"{'Backend':20} {'batch rows/s':>13} {'speedup':>8} {'single req/s':>13} {'speedup':>8}")
+    print(f"{'in-process':20} {batch:13,.0f} {1:7.2f}x {single:13,.0f} {1:7.2f}x")
+
+    # 1, 2, 4, ... and max_processes itself
+    process_counts = [1]
+    while process_counts[-1] < max_processes:
+        process_counts.append(min(process_counts[-1] * 2, max_processes))
+
+    for processes in process_counts:
+        pool = InferencePool(processes)
+        pool.start()
+        try:
+            pooled = load_predictor(pool)
+            pooled.predict_traffic_batch(X[:processes * 10])  # workers load the model
+            pool_batch = batch_rows_per_second(pooled, X)
+            pool_single = single_requests_per_second(pooled, threads, duration)
+        finally:
+            pool.close()
+        label = f"pool, {processes} process{'es' if processes > 1 else ''}"
+        print(f"{label:20} {pool_batch:13,.0f} {pool_batch / batch:7.2f}x "
+              f"{pool_single:13,.0f} {pool_single / single:7.2f}x")
+
+if __name__ == "__main__":
+    main()
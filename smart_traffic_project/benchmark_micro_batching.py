@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-row predictions: one model call per request vs the micro-batching scheduler
+
+    python benchmark_micro_batching.py              # 1, 4, 16 and 64 caller threads, 3 s each
+    python benchmark_micro_batching.py 2 5          # <max wait ms> <seconds> (default 0 ms, 3 s)
+
+Caller threads stand in for concurrent API requests; each asks for a random scenario
+(so the prediction cache mostly misses) and waits for its answer before asking again.
+"""
+
+import os
+import sys
+import threading
+import time
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from ml_models import TrafficPredictor
+from inference_scheduler import InferenceScheduler
+
+CONCURRENCY = (1, 4, 16, 64)
+
+def random_rows(rng, n):
+    return np.column_stack([
+        rng.integers(0, 24, n), rng.integers(0, 7, n), rng.integers(0, 2, n),
+        rng.random(n).round(2), rng.uniform(15, 40, n).round(1), rng.uniform(30, 95, n).round(0),
+        rng.integers(0, 2, n), rng.integers(0, 2, n), rng.uniform(10, 60, n).round(1)
+    ]).astype(np.float64)
+
+def run(predict, threads, duration):
+    latencies = [[] for _ in range(threads)]
+    deadline = time.perf_counter() + duration
+
+    def caller(index):
+        rows = random_rows(np.random.default_rng(index), 100000)
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            predict(rows[i % len(rows)])
+            latencies[index].append(time.perf_counter() - start)
+            i += 1
+
+    workers = [threading.Thread(target=caller, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return len(all_latencies) / duration, np.percentile(all_latencies, 50), np.percentile(all_latencies, 99)
+
+def main():
+    max_wait_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    predictor = TrafficPredictor(fast_inference=True)
+    if not predictor.load_models():
+        print("Training models...")
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+        predictor.save_models()
+
+    print("Micro-batching Benchmark")
+    print("=" * 50)
+    print(f"{os.cpu_count()} CPUs, max wait {max_wait_ms:g} ms, {duration:.0f} s per run\n")
+    print(f"{'Mode':12} {'threads':>7} {'pred/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch':>6}")
+
+    for threads in CONCURRENCY:
+        throughput, p50, p99 = run(lambda row: predictor.predict_traffic(*row), threads, duration)
+        print(f"{'direct':12} {threads:7} {throughput:9.0f} {p50:9.2f} {p99:9.2f} {1:6.1f}")
+
+        scheduler = InferenceScheduler(lambda: predictor, max_wait=max_wait_ms / 1000)
+        throughput, p50, p99 = run(scheduler.predict, threads, duration)
+        print(f"{'batched':12} {threads:7} {throughput:9.0f} {p50:9.2f} {p99:9.2f} "
+              f"{scheduler.metrics()['avg_batch_size'] or 1.0:6.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold model loading: legacy single pickle vs the model registry
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import joblib
+from ml_models import TrafficPredictor
+
+# Each scenario runs in a fresh interpreter and reports (import ms, load + first prediction ms)
+LEGACY_LOAD = """
+import time
+start = time.perf_counter()
+import joblib, numpy as np, sklearn.ensemble, sklearn.linear_model
+imported = time.perf_counter()
+models = joblib.load({models_path!r})
+scaler = joblib.load({scaler_path!r})
+models['Random Forest'].predict(np.array([[8, 1, 0, 0.0, 25, 60, 0, 1, 35]]))
+print((imported - start) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+REGISTRY_LOAD = """
+import time
+start = time.perf_counter()
+from ml_models import TrafficPredictor
+imported = time.perf_counter()
+predictor = TrafficPredictor(fast_inference={fast_inference})
+predictor.load_models()
+predictor.predict_traffic(8, 1, 0, 0.0, 25, 60, 0, 1, 35)
+print((imported - start) * 1000, (time.perf_counter() - imported) * 1000)
+"""
+
+def run_timed(code, repeats=3):
+    """Best (import ms, load ms) reported by a snippet run in a new process"""
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        timings.append([float(value) for value in output.stdout.strip().splitlines()[-1].split()])
+    return min(timings, key=lambda timing: timing[1])
+
+def main():
+    print("Model Load Benchmark (load + first prediction)")
+    print("=" * 50)
+
+    predictor = TrafficPredictor()
+    if not predictor.load_models():
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+        predictor.save_models()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models_path = os.path.join(tmp, 'trained_models.pkl')
+        scaler_path = os.path.join(tmp, 'scaler.pkl')
+        joblib.dump(dict(predictor.models), models_path)
+        joblib.dump(predictor.scaler, scaler_path)
+
+        legacy = run_timed(LEGACY_LOAD.format(models_path=models_path, scaler_path=scaler_path))
+        registry = run_timed(REGISTRY_LOAD.format(fast_inference=False))
+        registry_fast = run_timed(REGISTRY_LOAD.format(fast_inference=True))
+
+    print(f"\n{'Scenario':36} {'imports (ms)':>13} {'load (ms)':>11}")
+    for label, (import_ms, load_ms) in [
+        ("Legacy trained_models.pkl", legacy),
+        (f"Registry {predictor.model_version}", registry),
+        ("Registry + mmapped flat forest", registry_fast)
+    ]:
+        print(f"{label:36} {import_ms:13.1f} {load_ms:11.1f}")
+
+if __name__ == "__main__":
+    main()
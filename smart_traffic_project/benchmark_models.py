@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Side-by-side report of every candidate model: accuracy, training time,
+single-row and batch latency, and pickled artifact size
+"""
+
+import io
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from ml_models import TrafficPredictor, FEATURE_COLUMNS
+
+def best_time_ms(func, repeats):
+    """Best wall time in milliseconds over several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def artifact_size_mb(model):
+    """Size of the model as joblib would write it"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell() / 1e6
+
+def build_report(predictor, batch_size=10000):
+    """One row per trained model"""
+    X = predictor.df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    X_batch = X[np.random.default_rng(0).integers(0, len(X), batch_size)]
+    X_single = X[:1]
+
+    rows = []
+    for name, model in predictor.models.items():
+        metrics = predictor.results[name]
+        rows.append({
+            'Model': name,
+            'MAE': round(metrics['MAE'], 2),
+            'R2': round(metrics['R2'], 4),
+            'Train (s)': round(metrics.get('train_time', float('nan')), 2),
+            'Single row (ms)': round(best_time_ms(lambda: predictor.predict_with_model(name, X_single), 50), 3),
+            f'Batch {batch_size:,} (ms)': round(best_time_ms(lambda: predictor.predict_with_model(name, X_batch), 5), 1),
+            'Artifact (MB)': round(artifact_size_mb(model), 2)
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    print("Model Comparison Report")
+    print("=" * 50)
+
+    predictor = TrafficPredictor()
+    predictor.load_data('traffic_data.csv')
+    predictor.train_models()
+
+    report = build_report(predictor)
+    print()
+    print(report.to_string(index=False))
+    print("\nSet the primary model with TrafficPredictor(primary_model=...) "
+          "or TRAFFIC_PRIMARY_MODEL for the API")
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the offline road-graph router on a city-sized network
+
+    python benchmark_routing.py                 # synthetic 320 x 320 grid (~100k nodes)
+    python benchmark_routing.py city.osm.gz     # your own OSM extract
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from road_graph import RoadGraph
+from ml_models import TrafficPredictor
+
+def percentiles_ms(timings):
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+def main():
+    print("Road Graph Routing Benchmark")
+    print("=" * 50)
+
+    start = time.perf_counter()
+    graph = RoadGraph.load_any(sys.argv[1]) if len(sys.argv) > 1 else RoadGraph.synthetic_city(320, 320)
+    print(f"Graph: {graph.num_nodes:,} nodes, {graph.num_edges:,} edges, "
+          f"{graph.nbytes / 1e6:.1f} MB CSR, built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    predictor = TrafficPredictor(fast_inference=True)
+    if not predictor.load_models():
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+
+    start = time.perf_counter()
+    weights = graph.predicted_travel_times(predictor, datetime(2024, 5, 6, 18, 0))
+    print(f"Predicted edge weights: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, graph.num_nodes, (20, 2))
+
+    start = time.perf_counter()
+    for source, _ in pairs:
+        graph.nearest_node(graph.lat[source], graph.lng[source])
+    nearest_ms = (time.perf_counter() - start) / len(pairs) * 1000
+
+    single, alternatives, hops = [], [], []
+    for source, target in pairs:
+        start = time.perf_counter()
+        found = graph.shortest_path(int(source), int(target), weights)
+        single.append(time.perf_counter() - start)
+        hops.append(len(found[0]) if found else 0)
+
+        start = time.perf_counter()
+        graph.alternative_routes(int(source), int(target), weights, k=3)
+        alternatives.append(time.perf_counter() - start)
+
+    print(f"Nearest node: {nearest_ms:.2f} ms")
+    print(f"\n{'Query (random pairs, avg ' + str(int(np.mean(hops))) + ' edges)':40} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for label, timings in [("A* shortest path", single), ("3 alternatives (via-node, 2 Dijkstras)", alternatives)]:
+        p50, p95 = percentiles_ms(timings)
+        print(f"{label:40} {p50:9.1f} {p95:9.1f}")
+
+if __name__ == "__main__":
+    main()
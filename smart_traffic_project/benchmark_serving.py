@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark API throughput: Werkzeug dev server vs pre-forked gunicorn workers
+
+    python benchmark_serving.py                 # 1, 2 and 4 workers, 8 clients, 10 s each
+    python benchmark_serving.py 4 16 20         # <max workers> <clients> <seconds>
+
+Each configuration serves the full backend/api.py; client processes post /api/predict
+with random feature values (so the prediction cache mostly misses) as fast as they can.
+Memory is reported as PSS (proportional set size), which counts shared pages once.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+import numpy as np
+import requests
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 5091
+
+DEV_SERVER = """
+import sys
+sys.path.insert(0, 'backend')
+import api
+api.app.run(threaded=True, port={port})
+"""
+
+def wait_ready(timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{PORT}/api/ready", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Server did not become ready")
+
+def pss_mb(pid):
+    """PSS of a process and its children, from /proc (Linux only)"""
+    pids = [pid] + [int(child) for child in open(f"/proc/{pid}/task/{pid}/children").read().split()]
+    total = 0
+    for p in pids:
+        with open(f"/proc/{p}/smaps_rollup") as f:
+            total += sum(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+    return total / 1024, len(pids)
+
+def client(args):
+    seed, duration = args
+    rng = np.random.default_rng(seed)
+    session = requests.Session()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        body = {'hour': int(rng.integers(0, 24)), 'day_of_week': int(rng.integers(0, 7)),
+                'rain_intensity': round(float(rng.random()), 2), 'avg_speed': round(float(rng.uniform(10, 60)), 1)}
+        start = time.perf_counter()
+        response = session.post(f"http://127.0.0.1:{PORT}/api/predict", json=body)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return latencies
+
+def run_load(clients, duration):
+    with Pool(clients) as pool:
+        results = pool.map(client, [(seed, duration) for seed in range(clients)])
+    latencies = np.concatenate([np.array(result) for result in results]) * 1000
+    return len(latencies) / duration, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+def benchmark(label, command, clients, duration):
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        wait_ready()
+        run_load(clients, 1)  # warm-up
+        throughput, p50, p99 = run_load(clients, duration)
+        memory, processes = pss_mb(server.pid)
+        print(f"{label:28} {throughput:9.0f} {p50:9.1f} {p99:9.1f} {memory:8.0f} MB ({processes} proc)")
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print("API Serving Benchmark")
+    print("=" * 50)
+    print(f"{os.cpu_count()} CPUs, {clients} client processes, {duration:.0f} s per run\n")
+    print(f"{'Server':28} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'PSS':>8}")
+
+    benchmark("Werkzeug dev server", [sys.executable, '-W', 'ignore', '-c', DEV_SERVER.format(port=PORT)],
+              clients, duration)
+    workers = 1
+    while workers <= max_workers:
+        benchmark(f"gunicorn, {workers} worker{'s' if workers > 1 else ''}",
+                  [sys.executable, '-W', 'ignore', 'backend/serve.py', '--workers', str(workers),
+                   '--bind', f"127.0.0.1:{PORT}"], clients, duration)
+        workers *= 2
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,97 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+from traffic_dataset import TrafficDataWriter
 
-def generate_traffic_dataset(num_records=5000):
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+def _generate_chunk(rng, start_index, num_records):
+    """Vectorized generation of records start_index .. start_index + num_records - 1"""
+    index = np.arange(start_index, start_index + num_records)
+
+    # One record every 6 minutes starting Sunday 2023-01-01 00:00
+    hour = (index // 10) % 24
+    day_of_week = (6 + index // 240) % 7
+    is_weekend = (day_of_week >= 5).astype(np.int64)
+
+    rain_intensity = np.maximum(0, rng.normal(0.2, 0.3, num_records))
+    temperature = rng.normal(25, 8, num_records)
+    humidity = rng.uniform(30, 90, num_records)
+
+    event_flag = (rng.random(num_records) < 0.1).astype(np.int64)
+
+    rush_hour = (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(np.int64)
+
+    base_traffic = 200
+
+    hour_multiplier = np.select(
+        [(hour >= 7) & (hour <= 9), (hour >= 17) & (hour <= 19),
+         (hour >= 10) & (hour <= 16), (hour >= 20) & (hour <= 22)],
+        [2.5, 2.8, 1.5, 1.2],
+        default=0.5
+    )
+
+    weekend_multiplier = np.where(is_weekend == 1, 0.7, 1.0)
+
+    rain_multiplier = 1 + (rain_intensity * 0.8)
+
+    event_multiplier = np.where(event_flag == 1, 1.5, 1.0)
+
+    traffic_flow = base_traffic * hour_multiplier * weekend_multiplier * rain_multiplier * event_multiplier
+    traffic_flow += rng.normal(0, 30, num_records)
+    traffic_flow = np.maximum(50, traffic_flow)
+
+    max_speed = 60
+    avg_speed = max_speed * (1 - np.minimum(traffic_flow / 800, 0.8)) + rng.normal(0, 5, num_records)
+    avg_speed = np.clip(avg_speed, 10, max_speed)
+
+    return pd.DataFrame({
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'is_weekend': is_weekend,
+        'rain_intensity': np.round(rain_intensity, 2),
+        'temperature': np.round(temperature, 1),
+        'humidity': np.round(humidity, 1),
+        'event_flag': event_flag,
+        'rush_hour': rush_hour,
+        'avg_speed': np.round(avg_speed, 1),
+        'traffic_flow': np.round(traffic_flow, 0)
+    })
+
+def generate_traffic_dataset_chunks(num_records=5000, chunk_size=DEFAULT_CHUNK_SIZE, seed=42):
+    """Yield the dataset as DataFrames of at most chunk_size rows
+
+    Each chunk draws from its own generator seeded with (seed, chunk number), so the
+    output is reproducible for a given seed and chunk_size.
+    """
+    for chunk_number, start in enumerate(range(0, num_records, chunk_size)):
+        rng = np.random.default_rng([seed, chunk_number])
+        yield _generate_chunk(rng, start, min(chunk_size, num_records - start))
+
+def generate_traffic_dataset(num_records=5000, seed=42):
     """Generate realistic traffic dataset with weather and event data"""
-    
-    np.random.seed(42)
-    random.seed(42)
-    
-    data = []
-    start_date = datetime(2023, 1, 1)
-    
-    for i in range(num_records):
-        current_time = start_date + timedelta(hours=i/10)
-        hour = current_time.hour
-        day_of_week = current_time.weekday()
-        is_weekend = 1 if day_of_week >= 5 else 0
-        
-        rain_intensity = max(0, np.random.normal(0.2, 0.3))
-        temperature = np.random.normal(25, 8)
-        humidity = np.random.uniform(30, 90)
-        
-        event_flag = 1 if random.random() < 0.1 else 0
-        
-        rush_hour = 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0
-        
-        base_traffic = 200
-        
-        if 7 <= hour <= 9:
-            hour_multiplier = 2.5
-        elif 17 <= hour <= 19:
-            hour_multiplier = 2.8
-        elif 10 <= hour <= 16:
-            hour_multiplier = 1.5
-        elif 20 <= hour <= 22:
-            hour_multiplier = 1.2
-        else:
-            hour_multiplier = 0.5
-            
-        weekend_multiplier = 0.7 if is_weekend else 1.0
-        
-        rain_multiplier = 1 + (rain_intensity * 0.8)
-        
-        event_multiplier = 1.5 if event_flag else 1.0
-        
-        traffic_flow = base_traffic * hour_multiplier * weekend_multiplier * rain_multiplier * event_multiplier
-        traffic_flow += np.random.normal(0, 30)
-        traffic_flow = max(50, traffic_flow)
-        
-        max_speed = 60
-        avg_speed = max_speed * (1 - min(traffic_flow/800, 0.8)) + np.random.normal(0, 5)
-        avg_speed = max(10, min(avg_speed, max_speed))
-        
-        data.append({
-            'hour': hour,
-            'day_of_week': day_of_week,
-            'is_weekend': is_weekend,
-            'rain_intensity': round(rain_intensity, 2),
-            'temperature': round(temperature, 1),
-            'humidity': round(humidity, 1),
-            'event_flag': event_flag,
-            'rush_hour': rush_hour,
-            'avg_speed': round(avg_speed, 1),
-            'traffic_flow': round(traffic_flow, 0)
-        })
-    
-    return pd.DataFrame(data)
+    return _generate_chunk(np.random.default_rng([seed, 0]), 0, num_records)
+
+def write_traffic_dataset(path, num_records, chunk_size=DEFAULT_CHUNK_SIZE, seed=42):
+    """Stream a dataset to .csv, .feather or .parquet chunk by chunk so it never has to fit in memory"""
+    with TrafficDataWriter(path) as writer:
+        for chunk in generate_traffic_dataset_chunks(num_records, chunk_size, seed):
+            writer.write(chunk)
+    return writer.rows_written
 
 if __name__ == "__main__":
-    df = generate_traffic_dataset()
-    df.to_csv('/Users/surjithsshetty/Desktop/smart_traffic_project/traffic_data.csv', index=False)
-    print(f"Generated dataset with {len(df)} records")
-    print(df.head())
-    print(f"\nDataset shape: {df.shape}")
-    print(f"Traffic flow range: {df['traffic_flow'].min():.0f} - {df['traffic_flow'].max():.0f}")
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    output_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'traffic_data.csv')
+
+    if num_records <= DEFAULT_CHUNK_SIZE:
+        df = generate_traffic_dataset(num_records)
+        df.to_csv(output_path, index=False)
+        print(f"Generated dataset with {len(df)} records")
+        print(df.head())
+        print(f"\nDataset shape: {df.shape}")
+        print(f"Traffic flow range: {df['traffic_flow'].min():.0f} - {df['traffic_flow'].max():.0f}")
+    else:
+        written = write_traffic_dataset(output_path, num_records)
+        print(f"Generated dataset with {written:,} records in {output_path}")
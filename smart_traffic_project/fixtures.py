@@ -0,0 +1,33 @@
+"""
+Shared test fixtures: models trained once into a throwaway registry
+
+Import this before ml_models or backend/api. It points the model registry and the
+observation log at a temporary directory, so tests never train into or read from
+the real model_registry/.
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [path for path in (PROJECT_DIR, os.path.join(PROJECT_DIR, 'backend')) if path not in sys.path]
+TRAFFIC_DATA = os.path.join(PROJECT_DIR, 'traffic_data.csv')
+
+TEST_DIR = tempfile.mkdtemp(prefix='traffic-tests-')
+atexit.register(shutil.rmtree, TEST_DIR, True)
+os.environ['TRAFFIC_MODEL_REGISTRY'] = REGISTRY_DIR = os.path.join(TEST_DIR, 'model_registry')
+os.environ['TRAFFIC_OBSERVATIONS_PATH'] = os.path.join(TEST_DIR, 'observations.bin')
+
+from ml_models import TrafficPredictor
+
+def trained_predictor(**kwargs):
+    """A predictor loaded from the test registry, training and saving the models on first use"""
+    predictor = TrafficPredictor(registry_dir=REGISTRY_DIR, **kwargs)
+    if not predictor.load_models():
+        predictor.load_data(TRAFFIC_DATA)
+        predictor.train_models()
+        predictor.save_models()
+    return predictor
@@ -0,0 +1,242 @@
+import os
+import queue
+import signal
+import threading
+import atexit
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+from ml_models import TrafficPredictor, FEATURE_COLUMNS
+
+def _model_key(predictor):
+    """What a worker needs to load the same model the parent is serving"""
+    return (predictor.registry.root, predictor.model_version, predictor.primary_model)
+
+def _serve(conn, shm, slot_rows):
+    """Worker loop: predict the rows the parent wrote into this worker's shared buffer"""
+    # The parent shuts workers down; don't inherit its (e.g. gunicorn's) signal handlers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for signum in (signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    n_features = len(FEATURE_COLUMNS)
+    inputs = np.ndarray((slot_rows, n_features), dtype=np.float64, buffer=shm.buf)
+    outputs = np.ndarray(slot_rows, dtype=np.float64, buffer=shm.buf, offset=inputs.nbytes)
+    predictor, loaded_key = None, None
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            # The parent closed its end or exited
+            break
+        if message is None:
+            break
+
+        n_rows, model_key = message
+        try:
+            if model_key != loaded_key:
+                root, version, primary_model = model_key
+                # Registry arrays are memory-mapped, so every worker shares one copy in the page cache
+                predictor = TrafficPredictor(fast_inference=True, cache_size=0, primary_model=primary_model,
+                                             registry_dir=root)
+                if not predictor.load_models(version):
+                    raise RuntimeError(f"Could not load model version {version}")
+                loaded_key = model_key
+            outputs[:n_rows] = predictor._predict_exact(inputs[:n_rows])
+            conn.send(None)
+        except Exception as e:
+            conn.send(str(e))
+
+class _Worker:
+    def __init__(self, context, slot_rows):
+        n_features = len(FEATURE_COLUMNS)
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_rows * (n_features + 1) * 8)
+        self.inputs = np.ndarray((slot_rows, n_features), dtype=np.float64, buffer=self.shm.buf)
+        self.outputs = np.ndarray(slot_rows, dtype=np.float64, buffer=self.shm.buf, offset=self.inputs.nbytes)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn, self.shm, slot_rows),
+                                       daemon=True, name='inference-worker')
+        self.process.start()
+        child_conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        # Views into the buffer must go before it can be unmapped
+        del self.inputs, self.outputs
+        self.shm.close()
+        self.shm.unlink()
+
+class InferencePool:
+    """Runs model evaluation in worker processes, outside the serving process's GIL
+
+    Each worker loads the parent's model version from the registry, whose arrays are
+    memory-mapped, so the model is shared through the page cache instead of copied.
+    Feature rows and predictions travel through a shared-memory buffer per worker;
+    only a small (row count, model version) message is pickled per call. Batches are
+    split across idle workers, and concurrent callers each get their own worker.
+
+    Workers are started from a forkserver, a single-threaded process that imports this
+    module once, so they never inherit the serving process's threads or locks. A
+    worker that dies mid-call has its rows predicted in the calling process and is
+    replaced, up to max_restarts times; after that it is dropped, and once no workers
+    are left the pool stops running and predictors stay in-process.
+    """
+
+    def __init__(self, processes=None, slot_rows=16384, max_restarts=8):
+        self.processes = processes or os.cpu_count() or 1
+        self.slot_rows = slot_rows
+        self.max_restarts = max_restarts
+        self.requests = 0
+        self.rows = 0
+        self.lost_workers = 0
+        self.restarted_workers = 0
+        self._context = None
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            self._context = multiprocessing.get_context('forkserver')
+            self._context.set_forkserver_preload([__name__])
+            self._workers = [_Worker(self._context, self.slot_rows) for _ in range(self.processes)]
+            for worker in self._workers:
+                self._idle.put(worker)
+        atexit.register(self.close)
+        print(f"Inference pool started ({self.processes} processes)")
+
+    def after_fork(self):
+        """A forked server worker must not share its parent's pool; start() makes its own"""
+        self._context = None
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+            self._context = None
+        for worker in workers:
+            worker.close()
+
+    def _discard(self, worker):
+        """Replace a worker whose process died, or drop it once max_restarts are used up"""
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers.remove(worker)
+            self.lost_workers += 1
+            restart = self.restarted_workers < self.max_restarts
+            if restart:
+                self.restarted_workers += 1
+        worker.close()
+        print(f"Inference worker {worker.process.pid} died (exit code {worker.process.exitcode})")
+        if restart:
+            replacement = _Worker(self._context, self.slot_rows)
+            with self._lock:
+                # close() may have run meanwhile
+                if self._context is not None:
+                    self._workers.append(replacement)
+                    self._idle.put(replacement)
+                    return
+            replacement.close()
+            return
+        with self._lock:
+            remaining = len(self._workers)
+        print(f"Inference pool out of restarts, {remaining} workers left"
+              + ("" if remaining else "; predicting in-process"))
+
+    def predict(self, predictor, X):
+        """Raw primary-model predictions for X from the model predictor has loaded"""
+        X = np.asarray(X, dtype=np.float64)
+        model_key = _model_key(predictor)
+        predictions = np.empty(len(X))
+        # Spread a batch over the workers, in chunks that fit a worker's buffer
+        chunk_rows = min(self.slot_rows, max(1, -(-len(X) // self.processes)))
+        pending = []
+        lost = []
+        errors = []
+
+        def collect(worker, start, n_rows):
+            try:
+                error = worker.conn.recv()
+            except (EOFError, OSError):
+                self._discard(worker)
+                lost.append((start, n_rows))
+                return
+            if error is None:
+                predictions[start:start + n_rows] = worker.outputs[:n_rows]
+            else:
+                errors.append(error)
+            self._idle.put(worker)
+
+        def acquire():
+            """A live idle worker, or None once the pool has none left"""
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    # Finish this call's oldest chunk rather than wait on workers it is itself holding
+                    if pending:
+                        collect(*pending.pop(0))
+                        continue
+                    if not self._workers:
+                        return None
+                    try:
+                        worker = self._idle.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                if worker.process.is_alive():
+                    return worker
+                self._discard(worker)
+
+        try:
+            for start in range(0, len(X), chunk_rows):
+                chunk = X[start:start + chunk_rows]
+                while True:
+                    worker = acquire()
+                    if worker is None:
+                        lost.append((start, len(chunk)))
+                        break
+                    worker.inputs[:len(chunk)] = chunk
+                    try:
+                        worker.conn.send((len(chunk), model_key))
+                    except OSError:
+                        self._discard(worker)
+                        continue
+                    pending.append((worker, start, len(chunk)))
+                    break
+        finally:
+            while pending:
+                collect(*pending.pop(0))
+
+        if errors:
+            raise RuntimeError(f"Inference worker failed: {errors[0]}")
+        # Rows whose worker died are predicted here
+        for start, n_rows in lost:
+            predictions[start:start + n_rows] = predictor._predict_local(X[start:start + n_rows])
+        with self._lock:
+            self.requests += 1
+            self.rows += len(X)
+        return predictions
+
+    def status(self):
+        return {'processes': len(self._workers), 'idle': self._idle.qsize(),
+                'lost_workers': self.lost_workers, 'restarted_workers': self.restarted_workers,
+                'requests': self.requests, 'rows': self.rows}
@@ -1,29 +1,209 @@
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_score, KFold, ParameterGrid
 from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression, SGDRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
+try:
+    import lightgbm
+    LIGHTGBM_AVAILABLE = True
+except ImportError:
+    LIGHTGBM_AVAILABLE = False
+    lightgbm = None
+
+from prediction_cache import PredictionCache
+from prediction_lattice import PredictionLattice, LATTICE_FILE, LATTICE_META_FILE
+from model_registry import ModelRegistry, MODEL_REGISTRY_DIR
+from traffic_dataset import load_traffic_data, iter_traffic_data
+
+FEATURE_COLUMNS = ['hour', 'day_of_week', 'is_weekend', 'rain_intensity',
+                   'temperature', 'humidity', 'event_flag', 'rush_hour', 'avg_speed']
+
+RF_DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': 15, 'min_samples_leaf': 1}
+
+RF_PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [10, 15, None],
+    'min_samples_leaf': [1, 3]
+}
+
+# Kept in the model registry directory while a search runs
+SEARCH_CHECKPOINT_FILE = 'search_checkpoint.jsonl'
+
+# Default max_abs_error (vehicles/hour) a prediction lattice may have and still be used
+DEFAULT_LATTICE_TOLERANCE = 10.0
+
+# Models that are fit on standardized features
+SCALED_MODELS = ('Linear Regression', 'SGD Regressor')
+
+def dataset_hash(df):
+    """Stable fingerprint of a training DataFrame"""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+class ReservoirSample:
+    """Fixed-size uniform sample of a stream of rows (Algorithm R, vectorized per batch)"""
+
+    def __init__(self, size, n_columns, seed=42):
+        self.size = size
+        self.rows = np.empty((size, n_columns), dtype=np.float32)
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, rows):
+        rows = np.asarray(rows, dtype=np.float32)
+        fill = min(max(self.size - self.seen, 0), len(rows))
+        self.rows[self.seen:self.seen + fill] = rows[:fill]
+
+        # Row number t (0-based) replaces a random slot with probability size / (t + 1)
+        positions = np.arange(self.seen + fill, self.seen + len(rows))
+        slots = (self.rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+        keep = slots < self.size
+        self.rows[slots[keep]] = rows[fill:][keep]
+
+        self.seen += len(rows)
+
+    def sample(self):
+        return self.rows[:min(self.seen, self.size)]
+
+def _candidate_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def _init_search_worker(X, y, cv):
+    """Give each search worker its own copy of the training data once"""
+    global _search_data
+    _search_data = (X, y, cv)
+
+def _evaluate_candidate(params):
+    """Cross-validate one Random Forest configuration inside a worker process"""
+    X, y, cv = _search_data
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    scores = cross_val_score(model, X, y, cv=KFold(cv, shuffle=True, random_state=42),
+                             scoring='neg_mean_absolute_error', n_jobs=1)
+    return {
+        'params': params,
+        'cv_mae': float(-scores.mean()),
+        'cv_mae_std': float(scores.std()),
+        'wall_time': round(time.perf_counter() - start, 3)
+    }
+
+class FlatForest:
+    """Random Forest exported to flat NumPy arrays for low-overhead inference
+    
+    Every tree's nodes are concatenated into shared feature/threshold/left/right/value
+    arrays. Leaves point to themselves, so all trees can be walked together for a
+    fixed number of steps without per-tree branching or sklearn's input validation.
+    """
+    
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        # Interleaved (right, left) pairs so one gather picks the next node
+        self._children = np.stack([right, left], axis=1).ravel().astype(np.intp)
+        self._feature = feature.astype(np.intp)
+    
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Export a fitted RandomForestRegressor"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += tree.node_count
+        
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max(estimator.tree_.max_depth for estimator in forest.estimators_)
+        )
+    
+    def predict(self, X, chunk_size=1024):
+        """Average leaf value over all trees, matching RandomForestRegressor.predict"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_features = X.shape[1]
+        predictions = np.empty(len(X))
+        
+        for start in range(0, len(X), chunk_size):
+            X_chunk = X[start:start + chunk_size]
+            X_flat = X_chunk.ravel()
+            row_offsets = (np.arange(len(X_chunk)) * n_features)[:, None]
+            nodes = np.repeat(self.roots.astype(np.intp)[None, :], len(X_chunk), axis=0)
+            
+            for _ in range(self.max_depth):
+                go_left = X_flat[row_offsets + self._feature[nodes]] <= self.threshold[nodes]
+                nodes = self._children[2 * nodes + go_left]
+            
+            predictions[start:start + chunk_size] = self.value[nodes].mean(axis=1)
+        
+        return predictions
 
 class TrafficPredictor:
-    def __init__(self):
+    flat_forest_max_rows = 2048
+    
+    def __init__(self, fast_inference=False, cache_size=4096, cache_quantization=None,
+                 use_lattice=False, primary_model='Random Forest', registry_dir=MODEL_REGISTRY_DIR,
+                 inference_pool=None, lattice_tolerance=DEFAULT_LATTICE_TOLERANCE):
+        self.registry = ModelRegistry(registry_dir)
+        self.model_version = None
+        self.model_dir = None
         self.models = {}
         self.scaler = StandardScaler()
         self.feature_names = []
         self.results = {}
+        self.metadata = {}
+        self.rf_params = dict(RF_DEFAULT_PARAMS)
+        self.search_results = []
+        self.primary_model = primary_model
+        self.fast_inference = fast_inference
+        self.flat_forest = None
+        self.use_lattice = use_lattice
+        # Largest measured interpolation error (vehicles/hour) the lattice may serve with
+        self.lattice_tolerance = lattice_tolerance
+        self.lattice = None
+        self.prediction_cache = (PredictionCache(FEATURE_COLUMNS, cache_size, cache_quantization)
+                                 if cache_size else None)
+        # Optional InferencePool that evaluates saved models in worker processes
+        self.inference_pool = inference_pool
         
     def load_data(self, file_path):
         """Load and prepare the dataset"""
-        self.df = pd.read_csv(file_path)
+        self.df = load_traffic_data(file_path)
+        self.data_hash = None
         print(f"Dataset loaded: {self.df.shape}")
         return self.df
     
     def prepare_features(self):
         """Prepare features for training"""
-        feature_cols = ['hour', 'day_of_week', 'is_weekend', 'rain_intensity', 
-                       'temperature', 'humidity', 'event_flag', 'rush_hour', 'avg_speed']
+        feature_cols = list(FEATURE_COLUMNS)
         
         X = self.df[feature_cols]
         y = self.df['traffic_flow']
@@ -39,27 +219,62 @@ class TrafficPredictor:
         
         return X_train, X_test, y_train, y_test, X_train_scaled, X_test_scaled
     
-    def train_models(self):
+    def train_models(self, rf_params=None):
         """Train Linear Regression and Random Forest models"""
         X_train, X_test, y_train, y_test, X_train_scaled, X_test_scaled = self.prepare_features()
         
         print("Training Linear Regression...")
+        start = time.perf_counter()
         lr = LinearRegression()
         lr.fit(X_train_scaled, y_train)
+        train_times = {'Linear Regression': time.perf_counter() - start}
         lr_pred = lr.predict(X_test_scaled)
         self.models['Linear Regression'] = lr
         
         print("Training Random Forest...")
-        rf = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=15)
+        self.rf_params = {**RF_DEFAULT_PARAMS, **(rf_params or {})}
+        start = time.perf_counter()
+        rf = RandomForestRegressor(random_state=42, n_jobs=-1, **self.rf_params)
         rf.fit(X_train, y_train)
+        train_times['Random Forest'] = time.perf_counter() - start
+        # Keep single-row predictions off the joblib thread pool
+        rf.n_jobs = None
         rf_pred = rf.predict(X_test)
         self.models['Random Forest'] = rf
         
+        print("Training Gradient Boosting...")
+        start = time.perf_counter()
+        gb = HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, random_state=42)
+        gb.fit(X_train, y_train)
+        train_times['Gradient Boosting'] = time.perf_counter() - start
+        self.models['Gradient Boosting'] = gb
+        
         predictions = {
             'Linear Regression': lr_pred,
-            'Random Forest': rf_pred
+            'Random Forest': rf_pred,
+            'Gradient Boosting': gb.predict(X_test)
         }
         
+        if LIGHTGBM_AVAILABLE:
+            print("Training LightGBM...")
+            start = time.perf_counter()
+            lgbm = lightgbm.LGBMRegressor(n_estimators=300, learning_rate=0.05,
+                                          random_state=42, verbose=-1)
+            lgbm.fit(X_train, y_train)
+            train_times['LightGBM'] = time.perf_counter() - start
+            self.models['LightGBM'] = lgbm
+            predictions['LightGBM'] = lgbm.predict(X_test)
+        
+        return self._finish_training(predictions, train_times, X_test, y_test)
+    
+    def _finish_training(self, predictions, train_times, X_test, y_test):
+        """Score freshly trained models on the test set and reset derived state"""
+        self.metadata = {}
+        self.search_results = []
+        self.model_version = None
+        self.model_dir = None
+        self._models_changed()
+        
         self.results = {}
         for name, pred in predictions.items():
             mae = mean_absolute_error(y_test, pred)
@@ -70,6 +285,7 @@ class TrafficPredictor:
                 'MAE': mae,
                 'RMSE': rmse,
                 'R2': r2,
+                'train_time': train_times[name],
                 'predictions': pred
             }
         
@@ -78,6 +294,150 @@ class TrafficPredictor:
         
         return self.results
     
+    def train_models_incremental(self, data_path, chunk_size=100_000, n_epochs=3,
+                                 holdout_fraction=0.2, holdout_size=50_000,
+                                 forest_sample_size=200_000, rf_params=None, seed=42):
+        """Train on a dataset streamed in chunks, with memory bounded by the sample sizes
+        
+        Each row is assigned to the holdout with probability holdout_fraction (the same
+        assignment on every pass). The first pass fits the scaler with partial_fit and
+        fills two reservoir samples: up to holdout_size holdout rows for metrics and up
+        to forest_sample_size training rows for the tree models. Further passes train
+        an SGD Regressor, which replaces Linear Regression here, with partial_fit.
+        """
+        columns = FEATURE_COLUMNS + ['traffic_flow']
+        n_features = len(FEATURE_COLUMNS)
+        
+        def chunks():
+            for chunk_number, chunk in enumerate(iter_traffic_data(data_path, chunk_size, columns)):
+                rows = chunk[columns].to_numpy(dtype=np.float32)
+                holdout = np.random.default_rng([seed, chunk_number]).random(len(rows)) < holdout_fraction
+                yield chunk_number, rows[~holdout], rows[holdout], chunk
+        
+        print("Pass 1: fitting scaler and sampling holdout...")
+        start = time.perf_counter()
+        self.scaler = StandardScaler()
+        holdout_sample = ReservoirSample(holdout_size, len(columns), seed)
+        forest_sample = ReservoirSample(forest_sample_size, len(columns), seed + 1)
+        data_hasher = hashlib.sha256()
+        for _, train_rows, holdout_rows, chunk in chunks():
+            data_hasher.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+            if len(train_rows):
+                self.scaler.partial_fit(train_rows[:, :n_features])
+                forest_sample.add(train_rows)
+            holdout_sample.add(holdout_rows)
+        scaler_time = time.perf_counter() - start
+        print(f"  {forest_sample.seen:,} training rows, {holdout_sample.seen:,} holdout rows")
+        
+        print("Training SGD Regressor...")
+        start = time.perf_counter()
+        sgd = SGDRegressor(learning_rate='adaptive', eta0=0.01, alpha=1e-5, random_state=seed)
+        shuffle_rng = np.random.default_rng(seed)
+        for epoch in range(n_epochs):
+            for _, train_rows, _, _ in chunks():
+                if len(train_rows):
+                    train_rows = train_rows[shuffle_rng.permutation(len(train_rows))]
+                    sgd.partial_fit(self.scaler.transform(train_rows[:, :n_features]), train_rows[:, -1])
+            print(f"  epoch {epoch + 1}/{n_epochs} done")
+        train_times = {'SGD Regressor': scaler_time + time.perf_counter() - start}
+        
+        self.models = {'SGD Regressor': sgd}
+        self.feature_names = list(FEATURE_COLUMNS)
+        X_sample = pd.DataFrame(forest_sample.sample()[:, :n_features], columns=FEATURE_COLUMNS)
+        y_sample = forest_sample.sample()[:, -1]
+        
+        print(f"Training Random Forest on {len(X_sample):,} sampled rows...")
+        self.rf_params = {**RF_DEFAULT_PARAMS, **(rf_params or {})}
+        start = time.perf_counter()
+        rf = RandomForestRegressor(random_state=seed, n_jobs=-1, **self.rf_params)
+        rf.fit(X_sample, y_sample)
+        train_times['Random Forest'] = time.perf_counter() - start
+        rf.n_jobs = None
+        self.models['Random Forest'] = rf
+        
+        print(f"Training Gradient Boosting on {len(X_sample):,} sampled rows...")
+        start = time.perf_counter()
+        gb = HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, random_state=seed)
+        gb.fit(X_sample, y_sample)
+        train_times['Gradient Boosting'] = time.perf_counter() - start
+        self.models['Gradient Boosting'] = gb
+        
+        X_test = pd.DataFrame(holdout_sample.sample()[:, :n_features], columns=FEATURE_COLUMNS)
+        y_test = pd.Series(holdout_sample.sample()[:, -1], name='traffic_flow')
+        predictions = {name: self.predict_with_model(name, X_test.to_numpy() if name in SCALED_MODELS else X_test)
+                       for name in self.models}
+        
+        self.df = None
+        self.data_hash = data_hasher.hexdigest()[:16]
+        return self._finish_training(predictions, train_times, X_test, y_test)
+    
+    def train_all_models(self, param_grid=None, cv=3, n_workers=None,
+                         checkpoint_path=None, save=True):
+        """Cross-validated hyperparameter search, then train and save the best model
+        
+        Candidates run in a process pool (all cores by default). Each finished
+        candidate is appended to checkpoint_path (in the model registry directory
+        by default), so an interrupted search resumes where it stopped as long as
+        the data and fold count are unchanged. The checkpoint is removed once the
+        best model is trained.
+        """
+        if checkpoint_path is None:
+            os.makedirs(self.registry.root, exist_ok=True)
+            checkpoint_path = os.path.join(self.registry.root, SEARCH_CHECKPOINT_FILE)
+        X_train, _, y_train, _, _, _ = self.prepare_features()
+        data_hash = dataset_hash(self.df)
+        candidates = list(ParameterGrid(param_grid or RF_PARAM_GRID))
+        
+        finished = {}
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue  # partially written line from an interrupted run
+                    if result.get('data_hash') == data_hash and result.get('cv') == cv:
+                        finished[_candidate_key(result['params'])] = result
+        
+        pending = [params for params in candidates if _candidate_key(params) not in finished]
+        print(f"Hyperparameter search: {len(candidates)} candidates, "
+              f"{len(candidates) - len(pending)} resumed from checkpoint")
+        
+        def record(result):
+            result = {**result, 'data_hash': data_hash, 'cv': cv}
+            with open(checkpoint_path, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+            finished[_candidate_key(result['params'])] = result
+            print(f"  {result['params']}: CV MAE {result['cv_mae']:.2f} ({result['wall_time']:.1f}s)")
+        
+        n_workers = min(n_workers or os.cpu_count() or 1, len(pending))
+        if n_workers == 1:
+            _init_search_worker(X_train.to_numpy(), y_train.to_numpy(), cv)
+            for params in pending:
+                record(_evaluate_candidate(params))
+        elif pending:
+            # Spawned, not forked: callers such as the Streamlit app may have other threads running
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_search_worker,
+                                     initargs=(X_train.to_numpy(), y_train.to_numpy(), cv)) as pool:
+                futures = [pool.submit(_evaluate_candidate, params) for params in pending]
+                for future in as_completed(futures):
+                    record(future.result())
+        
+        search_results = sorted((finished[_candidate_key(params)] for params in candidates),
+                                key=lambda result: result['cv_mae'])
+        best = search_results[0]
+        print(f"Best parameters: {best['params']} (CV MAE {best['cv_mae']:.2f})")
+        
+        results = self.train_models(rf_params=best['params'])
+        self.search_results = search_results
+        # The search is finished; its results are kept in the model metadata
+        os.remove(checkpoint_path)
+        
+        if save:
+            self.save_models()
+        return results
+    
     def get_feature_importance(self):
         """Get feature importance from Random Forest"""
         if 'Random Forest' in self.models:
@@ -92,32 +452,156 @@ class TrafficPredictor:
     
     def predict_traffic(self, hour, day_of_week, is_weekend, rain_intensity, 
                        temperature, humidity, event_flag, rush_hour, avg_speed):
-        """Predict traffic using Random Forest (primary predictor)"""
+        """Predict traffic using the primary model (Random Forest by default)"""
         features = np.array([[hour, day_of_week, is_weekend, rain_intensity,
                             temperature, humidity, event_flag, rush_hour, avg_speed]])
         
-        # Use Random Forest as primary predictor
-        rf_model = self.models['Random Forest']
-        prediction = rf_model.predict(features)[0]
+        prediction = self._predict_cached(features)[0]
         return max(0, prediction)
     
+    def _predict_rows(self, X):
+        """Answer from the prediction lattice where it covers X, else run the model"""
+        if self.lattice is None:
+            return self._predict_exact(X)
+        
+        predictions, in_grid = self.lattice.predict(X)
+        if not in_grid.all():
+            predictions[~in_grid] = self._predict_exact(np.asarray(X)[~in_grid])
+        return predictions
+    
+    def _predict_exact(self, X):
+        """Run the primary model on an (n, 9) feature matrix"""
+        if self.inference_pool is not None and self.inference_pool.running and self.model_version is not None:
+            return self.inference_pool.predict(self, X)
+        return self._predict_local(X)
+    
+    def _predict_local(self, X):
+        """Run the primary model in this process"""
+        # The flat walk wins on small batches; sklearn's Cython loop wins on large ones
+        if self.flat_forest is not None and len(X) <= self.flat_forest_max_rows:
+            return self.flat_forest.predict(X)
+        return self.predict_with_model(self.primary_model, X)
+    
+    def predict_with_model(self, name, X):
+        """Raw predictions from one named model, scaling inputs where it needs them"""
+        if name in SCALED_MODELS:
+            X = self.scaler.transform(X)
+        return self.models[name].predict(X)
+    
+    def set_primary_model(self, name):
+        """Switch which trained model answers predict_traffic"""
+        if name not in self.models:
+            raise ValueError(f"Unknown model '{name}'. Available: {', '.join(self.models)}")
+        self.primary_model = name
+        self._models_changed()
+    
+    def _predict_cached(self, X):
+        """Serve repeat feature vectors from the prediction cache"""
+        if self.prediction_cache is not None and len(X) <= self.prediction_cache.max_size:
+            return self.prediction_cache.predict(X, self._predict_rows)
+        return self._predict_rows(X)
+    
+    def _models_changed(self, flat_forest=None):
+        """Rebuild the flattened forest and drop cached predictions after the models change"""
+        if self.models and self.primary_model not in self.models:
+            print(f"Primary model '{self.primary_model}' not available, using Random Forest")
+            self.primary_model = 'Random Forest'
+        
+        if self.fast_inference and self.primary_model == 'Random Forest':
+            # A memory-mapped export from the registry avoids unpickling the forest
+            self.flat_forest = flat_forest or FlatForest.from_sklearn(self.models['Random Forest'])
+        else:
+            self.flat_forest = None
+        
+        self.lattice = self._load_lattice() if self.use_lattice else None
+        
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+    
+    def _load_lattice(self):
+        """Memory-map the prediction lattice if it was built for the current models"""
+        try:
+            lattice = PredictionLattice.load(*self.lattice_paths())
+        except FileNotFoundError:
+            return None
+        
+        trained_at = self.metadata.get('trained_at')
+        if (trained_at is None or lattice.meta.get('trained_at') != trained_at
+                or lattice.meta.get('primary_model', 'Random Forest') != self.primary_model):
+            print("Prediction lattice is stale. Rebuild it with: python prediction_lattice.py")
+            return None
+        
+        # The error is a sample maximum, not a bound; refuse lattices that are visibly too coarse
+        if lattice.meta.get('max_abs_error', float('inf')) > self.lattice_tolerance:
+            print(f"Prediction lattice not used: max abs error {lattice.meta.get('max_abs_error')} "
+                  f"exceeds tolerance {self.lattice_tolerance:g}; predicting exactly")
+            return None
+        
+        print(f"Prediction lattice loaded (max abs error {lattice.meta['max_abs_error']:.2f})")
+        return lattice
+    
+    def lattice_paths(self):
+        """Lattice files live next to the active model version"""
+        model_dir = self.model_dir or '.'
+        return os.path.join(model_dir, LATTICE_FILE), os.path.join(model_dir, LATTICE_META_FILE)
+    
+    def to_feature_matrix(self, features):
+        """Convert a DataFrame, list of dicts or 2D array into an (n, 9) feature matrix"""
+        if isinstance(features, pd.DataFrame):
+            return features[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        
+        if isinstance(features, dict):
+            features = [features]
+        
+        if len(features) == 0:
+            return np.empty((0, len(FEATURE_COLUMNS)))
+        
+        if isinstance(features[0], dict):
+            try:
+                return np.array([[row[col] for col in FEATURE_COLUMNS] for row in features],
+                                dtype=np.float64)
+            except KeyError as e:
+                raise ValueError(f"Missing feature: {e.args[0]}")
+        
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected an (n, {len(FEATURE_COLUMNS)}) feature array, got shape {X.shape}")
+        return X
+    
+    def predict_traffic_batch(self, features):
+        """Predict traffic for many scenarios with a single call to the primary model"""
+        X = self.to_feature_matrix(features)
+        if len(X) == 0:
+            return np.empty(0)
+        
+        predictions = self._predict_cached(X)
+        return np.maximum(0, predictions)
+    
+    def score_traffic_batch(self, features, event_impact=None):
+        """Predict traffic and route scores for many scenarios at once
+        
+        event_impact defaults to 0.3 for rows with event_flag set, matching the API.
+        """
+        X = self.to_feature_matrix(features)
+        predictions = self.predict_traffic_batch(X)
+        
+        avg_speed = X[:, FEATURE_COLUMNS.index('avg_speed')]
+        rain_intensity = X[:, FEATURE_COLUMNS.index('rain_intensity')]
+        if event_impact is None:
+            event_impact = np.where(X[:, FEATURE_COLUMNS.index('event_flag')] > 0, 0.3, 0.0)
+        
+        scores = self.calculate_route_score_batch(predictions, avg_speed, rain_intensity, event_impact)
+        return predictions, scores
+    
     def compare_predictions(self, hour, day_of_week, is_weekend, rain_intensity, 
                           temperature, humidity, event_flag, rush_hour, avg_speed):
-        """Compare predictions from both Linear Regression and Random Forest"""
+        """Compare predictions from every trained model"""
         features = np.array([[hour, day_of_week, is_weekend, rain_intensity,
                             temperature, humidity, event_flag, rush_hour, avg_speed]])
         
-        # Linear Regression prediction (scaled features)
-        features_scaled = self.scaler.transform(features)
-        lr_prediction = self.models['Linear Regression'].predict(features_scaled)[0]
-        
-        # Random Forest prediction (original features)
-        rf_prediction = self.models['Random Forest'].predict(features)[0]
-        
-        return {
-            'Linear Regression': max(0, lr_prediction),
-            'Random Forest': max(0, rf_prediction)
-        }
+        return {name: max(0, self.predict_with_model(name, features)[0]) for name in self.models}
     
     def calculate_route_score(self, predicted_traffic, avg_speed, rain_intensity, event_impact):
         """Calculate route score using the weighted formula"""
@@ -133,29 +617,103 @@ class TrafficPredictor:
         
         return min(100, max(0, score * 100))
     
+    def calculate_route_score_batch(self, predicted_traffic, avg_speed, rain_intensity, event_impact):
+        """Vectorized version of calculate_route_score for NumPy arrays"""
+        max_traffic = 800
+        max_speed = 60
+        
+        w1, w2, w3, w4 = 0.4, 0.3, 0.2, 0.1
+        
+        score = (w1 * (1 - np.asarray(predicted_traffic) / max_traffic) + 
+                w2 * (np.asarray(avg_speed) / max_speed) + 
+                w3 * (1 - np.asarray(rain_intensity)) + 
+                w4 * (1 - np.asarray(event_impact)))
+        
+        return np.clip(score * 100, 0, 100)
+    
     def save_models(self):
-        """Save trained models"""
-        joblib.dump(self.models, 'trained_models.pkl')
-        joblib.dump(self.scaler, 'scaler.pkl')
-        print("Models saved successfully!")
+        """Save trained models and their metadata as a new registry version"""
+        self.metadata = self.get_metadata()
+        flat_forest = self.flat_forest
+        if flat_forest is None and 'Random Forest' in self.models:
+            flat_forest = FlatForest.from_sklearn(self.models['Random Forest'])
+        
+        self.model_version = self.registry.save(self.models, self.scaler, self.metadata,
+                                                flat_forest, self.primary_model)
+        self.model_dir = self.registry.version_dir(self.model_version)
+        print(f"Models saved successfully! ({self.model_version})")
     
-    def load_models(self):
-        """Load pre-trained models"""
+    def load_models(self, version=None):
+        """Load pre-trained models from the registry (latest version by default)"""
+        try:
+            artifact = self.registry.load(version, load_flat_forest=self.fast_inference)
+        except FileNotFoundError:
+            if version is not None:
+                print(f"Model version {version} not found.")
+                return False
+            return self._load_legacy_models()
+        
+        self.models = artifact['models']
+        self.scaler = artifact['scaler']
+        self.set_metadata(artifact['metadata'])
+        self.model_version = artifact['version']
+        self.model_dir = artifact['path']
+        
+        self._models_changed(flat_forest=artifact['flat_forest'])
+        print(f"Models loaded successfully! ({self.model_version})")
+        return True
+    
+    def _load_legacy_models(self):
+        """Load pickles written to the working directory by older versions"""
         try:
             self.models = joblib.load('trained_models.pkl')
             self.scaler = joblib.load('scaler.pkl')
-            print("Models loaded successfully!")
-            return True
         except:
             print("No saved models found. Please train models first.")
             return False
+        
+        try:
+            self.set_metadata(joblib.load('model_metadata.pkl'))
+        except FileNotFoundError:
+            print("No model metadata found. Retrain to record metrics.")
+            self.feature_names = list(FEATURE_COLUMNS)
+        
+        self.model_version = None
+        self.model_dir = None
+        self._models_changed()
+        print("Models loaded successfully!")
+        return True
+    
+    def get_metadata(self):
+        """Training metrics, feature importances and test-set predictions for the current models"""
+        feature_importance = self.get_feature_importance()
+        return {
+            'feature_names': list(self.feature_names),
+            'results': self.results,
+            'feature_importance': feature_importance.to_dict('records') if feature_importance is not None else [],
+            'y_test': np.asarray(getattr(self, 'y_test', [])),
+            'rf_params': self.rf_params,
+            'search_results': self.search_results,
+            'data_hash': (getattr(self, 'data_hash', None)
+                          or (dataset_hash(self.df) if getattr(self, 'df', None) is not None else None)),
+            'trained_at': pd.Timestamp.now().isoformat()
+        }
+    
+    def set_metadata(self, metadata):
+        """Restore state saved by get_metadata without retraining"""
+        self.feature_names = metadata.get('feature_names') or list(FEATURE_COLUMNS)
+        self.results = metadata.get('results', {})
+        self.y_test = metadata.get('y_test')
+        self.rf_params = metadata.get('rf_params', dict(RF_DEFAULT_PARAMS))
+        self.search_results = metadata.get('search_results', [])
+        self.metadata = metadata
 
 def main():
     predictor = TrafficPredictor()
     
     predictor.load_data('traffic_data.csv')
     
-    results = predictor.train_models()
+    results = predictor.train_all_models()
     
     print("\n" + "="*50)
     print("MODEL PERFORMANCE COMPARISON")
@@ -174,10 +732,14 @@ def main():
     for _, row in feature_imp.iterrows():
         print(f"{row['feature']:15}: {row['importance']:.4f}")
     
-    predictor.save_models()
+    print(f"\n{'='*50}")
+    print("HYPERPARAMETER SEARCH (Random Forest)")
+    print("="*50)
+    for result in predictor.search_results:
+        print(f"{str(result['params']):60} CV MAE {result['cv_mae']:6.2f}  {result['wall_time']:6.1f}s")
     
     print(f"\n{'='*50}")
-    print("EXAMPLE PREDICTION (Random Forest)")
+    print(f"EXAMPLE PREDICTION ({predictor.primary_model})")
     print("="*50)
     
     traffic_pred = predictor.predict_traffic(
@@ -205,8 +767,12 @@ def main():
     for model, pred in comparison.items():
         print(f"{model:18}: {pred:.0f} vehicles/hour")
     
-    print(f"\nPrimary Predictor: Random Forest (Higher Accuracy: R² = {predictor.results['Random Forest']['R2']:.4f})")
-    print(f"Backup Model: Linear Regression (R² = {predictor.results['Linear Regression']['R2']:.4f})")
+    primary = predictor.primary_model
+    print(f"\nPrimary Predictor: {primary} (R² = {predictor.results[primary]['R2']:.4f})")
+    backup = max((name for name in predictor.results if name != primary),
+                 key=lambda name: predictor.results[name]['R2'], default=None)
+    if backup is not None:
+        print(f"Backup Model: {backup} (R² = {predictor.results[backup]['R2']:.4f})")
 
 if __name__ == "__main__":
     main()
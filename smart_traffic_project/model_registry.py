@@ -0,0 +1,185 @@
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+import joblib
+import numpy as np
+import sklearn
+
+MODEL_REGISTRY_DIR = os.environ.get('TRAFFIC_MODEL_REGISTRY',
+                                    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_registry'))
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+FORMAT_VERSION = 1
+
+def _model_filename(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') + '.joblib'
+
+class LazyModels(MutableMapping):
+    """Model dict that unpickles each model from the registry on first access
+
+    Keeps cold start cheap when requests only need the memory-mapped flat forest.
+    """
+
+    def __init__(self, paths):
+        self._paths = dict(paths)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            if name not in self._paths:
+                raise KeyError(name)
+            with self._lock:
+                if name not in self._loaded:
+                    self._loaded[name] = joblib.load(self._paths[name], mmap_mode='r')
+        return self._loaded[name]
+
+    def __setitem__(self, name, model):
+        self._loaded[name] = model
+        self._paths.setdefault(name, None)
+
+    def __delitem__(self, name):
+        del self._paths[name]
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+class ModelRegistry:
+    """Versioned model artifacts with a manifest per version
+
+    Each version directory holds one uncompressed joblib file per model (so NumPy
+    arrays can be loaded with mmap_mode='r' and shared between processes), the
+    scaler, the training metadata, the exported flat forest and manifest.json.
+    LATEST names the active version.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def versions(self):
+        """All saved versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if re.fullmatch(r'v\d+', name))
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if os.path.isdir(self.version_dir(version)) else None
+
+    def version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def read_manifest(self, version=None):
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def save(self, models, scaler, metadata, flat_forest=None, primary_model=None):
+        """Write a new version and point LATEST at it; returns the version name"""
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+
+        try:
+            model_files = {}
+            for name, model in models.items():
+                model_files[name] = _model_filename(name)
+                joblib.dump(model, os.path.join(staging, model_files[name]))
+            joblib.dump(scaler, os.path.join(staging, 'scaler.joblib'))
+            joblib.dump(metadata, os.path.join(staging, 'metadata.joblib'))
+            if flat_forest is not None:
+                joblib.dump(flat_forest, os.path.join(staging, 'flat_forest.joblib'))
+
+            manifest = {
+                'format_version': FORMAT_VERSION,
+                'version': None,
+                'created_at': datetime.now().isoformat(),
+                'trained_at': metadata.get('trained_at'),
+                'feature_names': metadata.get('feature_names', []),
+                'primary_model': primary_model,
+                'models': model_files,
+                'metrics': {
+                    name: {key: float(value) for key, value in metrics.items()
+                           if key in ('MAE', 'RMSE', 'R2', 'train_time')}
+                    for name, metrics in metadata.get('results', {}).items()
+                },
+                'rf_params': metadata.get('rf_params'),
+                'data_hash': metadata.get('data_hash'),
+                'sklearn_version': sklearn.__version__,
+                'numpy_version': np.__version__,
+                'python_version': sys.version.split()[0],
+                'files': {name: os.path.getsize(os.path.join(staging, name))
+                          for name in sorted(os.listdir(staging))}
+            }
+
+            # Renaming the finished directory claims the version number; a rename onto a
+            # version another process published first fails, so take the next number
+            while True:
+                existing = self.versions()
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+                manifest['version'] = version
+                with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                    json.dump(manifest, f, indent=2)
+                try:
+                    os.rename(staging, self.version_dir(version))
+                    break
+                except OSError:
+                    if not os.path.isdir(self.version_dir(version)):
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.set_latest(version)
+        return version
+
+    def set_latest(self, version):
+        """Atomically switch the active version"""
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + LATEST_FILE + '-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(self.root, LATEST_FILE))
+
+    def load(self, version=None, load_flat_forest=True):
+        """Load a version (LATEST by default); models are unpickled lazily"""
+        version = version or self.latest_version()
+        if version is None:
+            raise FileNotFoundError(f"No model versions in {self.root}")
+
+        path = self.version_dir(version)
+        manifest = self.read_manifest(version)
+        if manifest['sklearn_version'] != sklearn.__version__:
+            print(f"Warning: model {version} was trained with scikit-learn "
+                  f"{manifest['sklearn_version']}, running {sklearn.__version__}")
+
+        flat_forest_path = os.path.join(path, 'flat_forest.joblib')
+        return {
+            'version': version,
+            'path': path,
+            'manifest': manifest,
+            'models': LazyModels({name: os.path.join(path, filename)
+                                  for name, filename in manifest['models'].items()}),
+            'scaler': joblib.load(os.path.join(path, 'scaler.joblib')),
+            'metadata': joblib.load(os.path.join(path, 'metadata.joblib')),
+            'flat_forest': (joblib.load(flat_forest_path, mmap_mode='r')
+                            if load_flat_forest and os.path.exists(flat_forest_path) else None)
+        }
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Step per feature; defaults match the precision recorded in traffic_data.csv
+DEFAULT_QUANTIZATION = {
+    'hour': 1,
+    'day_of_week': 1,
+    'is_weekend': 1,
+    'rain_intensity': 0.01,
+    'temperature': 0.1,
+    'humidity': 0.1,
+    'event_flag': 1,
+    'rush_hour': 1,
+    'avg_speed': 0.1
+}
+
+class PredictionCache:
+    """Thread-safe LRU cache of model predictions keyed on quantized feature vectors
+
+    The grid is used only for lookup: the model runs on the real rows, so inputs at
+    the grid's precision get exactly the uncached prediction. Inputs finer than a
+    step share the value computed for the first row seen in that cell.
+    """
+
+    def __init__(self, feature_names, max_size=4096, quantization=None):
+        self.feature_names = list(feature_names)
+        self.max_size = max_size
+        self.quantization = {**DEFAULT_QUANTIZATION, **(quantization or {})}
+        self.steps = np.array([self.quantization.get(name, 1) for name in self.feature_names],
+                              dtype=np.float64)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def quantize(self, X):
+        """Map feature rows to integer grid coordinates"""
+        return np.rint(np.asarray(X, dtype=np.float64) / self.steps).astype(np.int64)
+
+    def predict(self, X, predict_fn):
+        """Return predictions for X, calling predict_fn only for uncached grid points"""
+        grid = self.quantize(X)
+        keys = [row.tobytes() for row in grid]
+        predictions = np.empty(len(keys))
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    predictions[i] = value
+            self.hits += len(keys) - sum(len(rows) for rows in missing.values())
+            self.misses += sum(len(rows) for rows in missing.values())
+
+        if missing:
+            first_rows = [rows[0] for rows in missing.values()]
+            values = predict_fn(np.asarray(X)[first_rows])
+
+            with self._lock:
+                for (key, rows), value in zip(missing.items(), values):
+                    predictions[rows] = value
+                    self._entries[key] = float(value)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return predictions
+
+    def clear(self):
+        """Drop all entries, e.g. after the models change"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
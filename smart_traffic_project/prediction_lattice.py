@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Precomputed prediction lattice for constant-time traffic lookups
+
+The forest is evaluated once over every (hour, day_of_week, event_flag, rush_hour)
+combination and a grid of the continuous inputs bounded by the UI sliders. Lookups
+then use multilinear interpolation over rain, temperature, humidity and speed.
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+import numpy as np
+
+LATTICE_FILE = 'prediction_lattice.npy'
+LATTICE_META_FILE = 'prediction_lattice.json'
+
+# Continuous axes: feature -> (lower bound, upper bound, grid points). Rain and speed
+# follow the slider steps; refine() doubles axes from here until the lattice is
+# within tolerance of the model.
+DEFAULT_AXES = {
+    'rain_intensity': (0.0, 1.0, 11),
+    'temperature': (10.0, 40.0, 4),
+    'humidity': (20.0, 100.0, 3),
+    'avg_speed': (10.0, 60.0, 51)
+}
+
+DISCRETE_FEATURES = ['hour', 'day_of_week', 'event_flag', 'rush_hour']
+DISCRETE_SIZES = [24, 7, 2, 2]
+CONTINUOUS_FEATURES = ['rain_intensity', 'temperature', 'humidity', 'avg_speed']
+
+# Largest continuous grid refine() will build: 50,000 points x 672 discrete cells is 134 MB
+MAX_GRID_POINTS = 50_000
+
+def _sample_rows(feature_names, bounds, n_samples, seed):
+    """Random in-bounds feature rows: discrete features on their grid, the rest uniform"""
+    rng = np.random.default_rng(seed)
+    X = np.empty((n_samples, len(feature_names)))
+    for name, size in zip(DISCRETE_FEATURES, DISCRETE_SIZES):
+        X[:, feature_names.index(name)] = rng.integers(0, size, n_samples)
+    for name, (low, high) in zip(CONTINUOUS_FEATURES, bounds):
+        X[:, feature_names.index(name)] = rng.uniform(low, high, n_samples)
+    X[:, feature_names.index('is_weekend')] = X[:, feature_names.index('day_of_week')] >= 5
+    return X
+
+def _error_stats(errors):
+    return {
+        'error_samples': len(errors),
+        'max_abs_error': round(float(errors.max()), 2),
+        'p99_abs_error': round(float(np.percentile(errors, 99)), 2),
+        'mean_abs_error': round(float(errors.mean()), 2)
+    }
+
+def interpolation_error(predict_fn, feature_names, axes=None, n_samples=20000, seed=0):
+    """Error a lattice over these axes would have, without building it
+
+    Evaluates the model at the 16 grid corners around each sample instead of over
+    the whole grid, so candidate axes can be compared cheaply.
+    """
+    axes_config = {**DEFAULT_AXES, **(axes or {})}
+    axes = [np.linspace(*axes_config[name]) for name in CONTINUOUS_FEATURES]
+    X = _sample_rows(feature_names, [(axis[0], axis[-1]) for axis in axes], n_samples, seed)
+    cols = [feature_names.index(name) for name in CONTINUOUS_FEATURES]
+
+    lower, fraction = [], []
+    for col, axis in zip(cols, axes):
+        position = np.interp(X[:, col], axis, np.arange(len(axis)))
+        low = np.minimum(np.floor(position).astype(np.intp), len(axis) - 2)
+        lower.append(low)
+        fraction.append(position - low)
+
+    approx = np.zeros(n_samples)
+    for corner in itertools.product((0, 1), repeat=len(axes)):
+        X_corner = X.copy()
+        weights = np.ones(n_samples)
+        for k, (col, axis) in enumerate(zip(cols, axes)):
+            X_corner[:, col] = axis[lower[k] + corner[k]]
+            weights *= fraction[k] if corner[k] else 1 - fraction[k]
+        approx += weights * predict_fn(X_corner)
+    return _error_stats(np.abs(approx - predict_fn(X)))
+
+def _describe(axes):
+    return ' x '.join(f"{name} {axes[name][2]}" for name in CONTINUOUS_FEATURES)
+
+class PredictionLattice:
+    """Grid of model predictions with multilinear interpolation lookups"""
+
+    def __init__(self, values, axes, feature_names, meta=None):
+        self.values = values
+        self.axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        self.feature_names = list(feature_names)
+        self.meta = meta or {}
+        self._discrete_cols = [self.feature_names.index(name) for name in DISCRETE_FEATURES]
+        self._continuous_cols = [self.feature_names.index(name) for name in CONTINUOUS_FEATURES]
+        self._weekend_col = self.feature_names.index('is_weekend')
+        self._corners = np.array(list(itertools.product((0, 1), repeat=len(self.axes))),
+                                 dtype=np.intp)[:, :, None]
+
+    @classmethod
+    def build(cls, predict_fn, feature_names, axes=None, error_samples=20000):
+        """Evaluate predict_fn over the full grid and measure interpolation error"""
+        axes_config = {**DEFAULT_AXES, **(axes or {})}
+        axes = [np.linspace(*axes_config[name]) for name in CONTINUOUS_FEATURES]
+        if min(len(axis) for axis in axes) < 2:
+            raise ValueError("Each continuous axis needs at least 2 grid points")
+
+        start = time.perf_counter()
+        continuous_grid = np.array(list(itertools.product(*axes)))
+        values = np.empty(DISCRETE_SIZES + [len(axis) for axis in axes], dtype=np.float32)
+
+        # One model call per discrete combination keeps memory bounded
+        for hour, day, event, rush in itertools.product(*[range(size) for size in DISCRETE_SIZES]):
+            block = {
+                'hour': hour, 'day_of_week': day, 'is_weekend': int(day >= 5),
+                'event_flag': event, 'rush_hour': rush
+            }
+            X = np.empty((len(continuous_grid), len(feature_names)))
+            for col, name in enumerate(feature_names):
+                if name in block:
+                    X[:, col] = block[name]
+                else:
+                    X[:, col] = continuous_grid[:, CONTINUOUS_FEATURES.index(name)]
+            values[hour, day, event, rush] = predict_fn(X).reshape(values.shape[4:])
+
+        lattice = cls(values, axes, feature_names)
+        lattice.meta = {
+            'shape': list(values.shape),
+            'axes': {name: axis.tolist() for name, axis in zip(CONTINUOUS_FEATURES, axes)},
+            'feature_names': list(feature_names),
+            'build_seconds': round(time.perf_counter() - start, 2)
+        }
+        lattice.meta.update(lattice.measure_error(predict_fn, error_samples))
+        return lattice
+
+    @classmethod
+    def refine(cls, predict_fn, feature_names, tolerance, axes=None, max_points=MAX_GRID_POINTS,
+               error_samples=20000):
+        """Build a lattice whose measured max error is within tolerance
+
+        Starting from axes, repeatedly doubles the resolution of whichever axis lowers
+        the sampled error most. Returns (lattice, error); the lattice is None if the
+        grid would exceed max_points continuous points before reaching the tolerance.
+        """
+        config = {**DEFAULT_AXES, **(axes or {})}
+        error = interpolation_error(predict_fn, feature_names, config, error_samples)
+        print(f"  {_describe(config)}: max abs error {error['max_abs_error']:.2f}")
+        while error['max_abs_error'] > tolerance:
+            candidates = []
+            for name in CONTINUOUS_FEATURES:
+                low, high, points = config[name]
+                trial = {**config, name: (low, high, 2 * points - 1)}
+                if np.prod([trial[axis][2] for axis in CONTINUOUS_FEATURES]) <= max_points:
+                    candidates.append((interpolation_error(predict_fn, feature_names, trial, error_samples), trial))
+            if not candidates:
+                return None, error
+            error, config = min(candidates, key=lambda candidate: (candidate[0]['max_abs_error'],
+                                                                   candidate[0]['p99_abs_error']))
+            print(f"  {_describe(config)}: max abs error {error['max_abs_error']:.2f}")
+
+        lattice = cls.build(predict_fn, feature_names, config, error_samples)
+        return lattice, {key: lattice.meta[key] for key in error}
+
+    def measure_error(self, predict_fn, n_samples=20000, seed=0):
+        """Empirical error against the exact model at random in-bounds points"""
+        X = _sample_rows(self.feature_names, [(axis[0], axis[-1]) for axis in self.axes], n_samples, seed)
+        approx, _ = self.predict(X)
+        return _error_stats(np.abs(approx - predict_fn(X)))
+
+    def predict(self, X):
+        """Interpolated predictions plus a mask of rows the lattice covers
+
+        Rows outside the grid bounds, with non-integer discrete features or with
+        is_weekend disagreeing with day_of_week are left as NaN for the caller.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        predictions = np.full(len(X), np.nan)
+
+        discrete = X[:, self._discrete_cols]
+        in_grid = np.all((discrete == np.rint(discrete)) & (discrete >= 0) &
+                         (discrete < np.array(DISCRETE_SIZES)), axis=1)
+        in_grid &= X[:, self._weekend_col] == (X[:, self._discrete_cols[1]] >= 5)
+        for col, axis in zip(self._continuous_cols, self.axes):
+            in_grid &= (X[:, col] >= axis[0]) & (X[:, col] <= axis[-1])
+
+        rows = np.nonzero(in_grid)[0]
+        if len(rows) == 0:
+            return predictions, in_grid
+
+        index = tuple(discrete[rows].astype(np.intp).T)
+        lower, fraction = [], []
+        for col, axis in zip(self._continuous_cols, self.axes):
+            position = np.interp(X[rows, col], axis, np.arange(len(axis)))
+            low = np.minimum(np.floor(position).astype(np.intp), len(axis) - 2)
+            lower.append(low)
+            fraction.append(position - low)
+        lower, fraction = np.stack(lower), np.stack(fraction)
+
+        # Gather all 2^4 surrounding grid points at once: (corner, axis, row)
+        corner_index = lower[None] + self._corners
+        weights = np.where(self._corners, fraction[None], 1 - fraction[None]).prod(axis=1)
+        corner_values = self.values[index + tuple(corner_index[:, k] for k in range(len(self.axes)))]
+        total = (weights * corner_values).sum(axis=0)
+
+        predictions[rows] = total
+        return predictions, in_grid
+
+    def save(self, path=LATTICE_FILE, meta_path=LATTICE_META_FILE):
+        """Write the grid as a plain .npy so it can be memory-mapped"""
+        np.save(path, self.values)
+        with open(meta_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path=LATTICE_FILE, meta_path=LATTICE_META_FILE):
+        """Memory-map a saved lattice"""
+        with open(meta_path) as f:
+            meta = json.load(f)
+        values = np.load(path, mmap_mode='r')
+        axes = [meta['axes'][name] for name in CONTINUOUS_FEATURES]
+        return cls(values, axes, meta['feature_names'], meta)
+
+def main():
+    from ml_models import TrafficPredictor, FEATURE_COLUMNS, DEFAULT_LATTICE_TOLERANCE
+
+    primary_model = sys.argv[1] if len(sys.argv) > 1 else 'Random Forest'
+    predictor = TrafficPredictor(primary_model=primary_model)
+    if not predictor.load_models():
+        predictor.load_data('traffic_data.csv')
+        predictor.train_models()
+        predictor.save_models()
+
+    tolerance = float(os.environ.get('TRAFFIC_LATTICE_TOLERANCE', DEFAULT_LATTICE_TOLERANCE))
+    print(f"Refining prediction lattice to a max error of {tolerance:g}...")
+    lattice, error = PredictionLattice.refine(predictor._predict_exact, FEATURE_COLUMNS, tolerance)
+    if lattice is None:
+        print(f"No grid within {MAX_GRID_POINTS:,} continuous points reaches {tolerance:g} for "
+              f"{predictor.primary_model} (best max abs error {error['max_abs_error']:.2f}); "
+              f"not saving a lattice, predictions stay exact")
+        sys.exit(1)
+
+    lattice.meta['trained_at'] = predictor.metadata.get('trained_at')
+    lattice.meta['primary_model'] = predictor.primary_model
+    lattice.save(*predictor.lattice_paths())
+
+    meta = lattice.meta
+    print(f"Lattice shape: {tuple(meta['shape'])} ({lattice.values.nbytes / 1e6:.1f} MB)")
+    print(f"Build time: {meta['build_seconds']:.1f} s")
+    print(f"Max abs error vs exact model: {meta['max_abs_error']:.2f} vehicles/hour "
+          f"(p99 {meta['p99_abs_error']:.2f}, mean {meta['mean_abs_error']:.2f}, "
+          f"{meta['error_samples']:,} samples)")
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the Flask API endpoints in-process with the test client
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from fixtures import trained_predictor
+import api
+from ml_models import TrafficPredictor
+from model_registry import ModelRegistry
+from model_reloader import ModelReloader
+
+def wait_for_reload(reloader, timeout=30):
+    deadline = time.time() + timeout
+    while reloader.loading_version is not None:
+        assert time.time() < deadline, "reload did not finish"
+        time.sleep(0.01)
+
+def test_batch_prediction_endpoint():
+    """Batch results match single predictions, and an empty batch is an empty result"""
+    client = api.app.test_client()
+    scenarios = [{'hour': 8, 'rush_hour': 1}, {'hour': 18, 'day_of_week': 4, 'rain_intensity': 0.5},
+                 {'hour': 2, 'avg_speed': 60, 'event_flag': 1}]
+    
+    batch = client.post('/api/predict/batch', json={'scenarios': scenarios}).get_json()
+    assert batch['success'] and batch['count'] == 3
+    for i, scenario in enumerate(scenarios):
+        single = client.post('/api/predict', json=scenario).get_json()
+        assert batch['predicted_traffic'][i] == single['predicted_traffic']
+        assert batch['route_score'][i] == single['route_score']
+    
+    # Positional rows in FEATURE_COLUMNS order give the same answers as dicts
+    rows = [[{**api.DEFAULT_FEATURES, **scenario}[col] for col in batch['features']] for scenario in scenarios]
+    assert client.post('/api/predict/batch', json={'scenarios': rows}).get_json()['predicted_traffic'] == \
+        batch['predicted_traffic']
+    
+    empty = client.post('/api/predict/batch', json={'scenarios': []})
+    assert empty.status_code == 200 and empty.get_json()['count'] == 0
+    
+    bad = client.post('/api/predict/batch', json={'scenarios': [[1, 2, 3]]})
+    assert bad.status_code == 400
+    print(f"   Batch of {batch['count']} matches single predictions: {batch['predicted_traffic']}")
+    print("✅ Batch prediction endpoint test completed!")
+
+def test_hot_reload():
+    """Reloads swap the served version, and a rejected reload leaves LATEST alone"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = trained_predictor(fast_inference=True)
+        predictor.registry = ModelRegistry(tmp)
+        predictor.save_models()
+        predictor.save_models()
+        
+        registry = ModelRegistry(tmp)
+        reloader = ModelReloader(lambda: TrafficPredictor(fast_inference=True, registry_dir=tmp), poll_interval=0,
+                                 on_swap=api.on_model_swap)
+        served = TrafficPredictor(fast_inference=True, registry_dir=tmp)
+        served.load_models()
+        reloader.activate(served)
+        
+        original = api.model_registry, api.model_reloader
+        api.model_registry, api.model_reloader = registry, reloader
+        try:
+            client = api.app.test_client()
+            assert client.get('/api/models/status').get_json()['status']['active_version'] == 'v0002'
+            
+            # While another reload holds the claim, a rollback is refused without touching LATEST
+            reloader._reload_lock.acquire()
+            response = client.post('/api/models/reload', json={'version': 'v0001'})
+            reloader._reload_lock.release()
+            assert response.status_code == 409
+            assert registry.latest_version() == 'v0002'
+            
+            assert client.post('/api/models/reload', json={'version': 'v0042'}).status_code == 404
+            
+            # Routes priced by the old model are dropped on the swap
+            assert client.post('/api/routes', json={'origin': 'Hennur', 'destination': 'Yelahanka'}).get_json()['success']
+            assert api.maps_service.cache_stats()['cached_routes'] >= 1
+            response = client.post('/api/models/reload', json={'version': 'v0001'})
+            assert response.status_code == 202
+            wait_for_reload(reloader)
+            assert api.maps_service.cache_stats()['cached_routes'] == 0
+            assert registry.latest_version() == 'v0001'
+            assert reloader.predictor.model_version == 'v0001' and reloader.predictor is not served
+            assert client.post('/api/predict', json={'hour': 8}).get_json()['success']
+            
+            # A version that fails to load keeps the current one serving
+            reloader.reload('v0099')
+            wait_for_reload(reloader)
+            status = client.get('/api/models/status').get_json()['status']
+            assert status['active_version'] == 'v0001' and status['last_error']
+        finally:
+            api.model_registry, api.model_reloader = original
+    print("✅ Hot reload test completed!")
+
+def test_best_departure_validation():
+    """Out-of-range best-departure parameters are 400s, with the same rules as the async API"""
+    client = api.app.test_client()
+    body = {'origin': 'Koramangala', 'destination': 'Hebbal', 'window_start': '2024-05-06T07:00',
+            'window_minutes': 60, 'step_minutes': 15}
+    response = client.post('/api/best-departure', json={**body, 'top': 2})
+    assert response.status_code == 200 and len(response.get_json()['best']) == 2
+    
+    for invalid in ({'top': 0}, {'top': -3}, {'step_minutes': 7}, {'window_minutes': -1}):
+        response = client.post('/api/best-departure', json={**body, **invalid})
+        assert response.status_code == 400 and response.get_json()['success'] is False, invalid
+    print("✅ Best departure validation test completed!")
+
+if __name__ == "__main__":
+    test_batch_prediction_endpoint()
+    test_hot_reload()
+    test_best_departure_validation()
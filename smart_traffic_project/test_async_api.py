@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test the asyncio API port against the Flask API and under concurrent route requests
+"""
+
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import fixtures
+import httpx
+import numpy as np
+import api
+import async_api
+import batch_formats
+from inference_scheduler import InferenceScheduler, InferenceTimeout
+from ml_models import FEATURE_COLUMNS
+from maps_service import MapsService
+from fake_maps_client import FakeMapsClient
+from weather_api import WeatherAPI
+
+async def post_all(requests):
+    transport = httpx.ASGITransport(app=async_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await asyncio.gather(*[client.request(method, path, json=body) for method, path, body in requests])
+
+async def post_binary(path, body, content_type):
+    transport = httpx.ASGITransport(app=async_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await client.post(path, content=body, headers={'Content-Type': content_type})
+
+def test_async_api_contract():
+    """Same JSON as the Flask app for the endpoints the frontend uses"""
+    flask = api.app.test_client()
+    body = {'hour': 18, 'day_of_week': 4, 'rush_hour': 1, 'avg_speed': 25, 'origin': 'A', 'destination': 'B'}
+    route_body = {'origin': 'Koramangala', 'destination': 'Hebbal', 'departure_time': '2024-05-06T18:00'}
+
+    predict, weather, models, routes, invalid = asyncio.run(post_all([
+        ('POST', '/api/predict', body), ('GET', '/api/weather', None), ('GET', '/api/models', None),
+        ('POST', '/api/routes', route_body), ('POST', '/api/predict', {'hour': 30})
+    ]))
+    assert predict.json() == flask.post('/api/predict', json=body).get_json()
+    assert weather.json() == flask.get('/api/weather').get_json()
+    assert models.json() == flask.get('/api/models').get_json()
+    assert routes.json() == flask.post('/api/routes', json=route_body).get_json()
+
+    # Schema validation errors keep the {success, error} shape
+    assert invalid.status_code == 400 and invalid.json()['success'] is False
+    print(f"   400 error: {invalid.json()['error']}")
+    print("✅ Async API contract test completed!")
+
+def test_async_api_concurrent_routes():
+    """Many slow upstream route requests overlap instead of queueing behind each other"""
+    original = api.maps_service
+    api.maps_service = MapsService(client=FakeMapsClient(delay=0.2), geocode_cache_path=None)
+    try:
+        requests = [('POST', '/api/routes', {'origin': f"Origin {i}", 'destination': 'Mysore'}) for i in range(50)]
+        start = time.perf_counter()
+        responses = asyncio.run(post_all(requests))
+        elapsed = time.perf_counter() - start
+    finally:
+        api.maps_service = original
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()['origin'] for response in responses}) == 50
+    # 50 requests x 3 upstream calls of 200 ms each, all in flight at once
+    assert elapsed < 2.0, elapsed
+    print(f"   50 concurrent route requests in {elapsed:.2f} s")
+    print("✅ Async API concurrency test completed!")
+
+def test_micro_batched_predictions():
+    """Concurrent single predictions are answered together, with per-row results unchanged"""
+    before = api.inference_scheduler.metrics()
+    bodies = [{'hour': i % 24, 'day_of_week': i % 7, 'avg_speed': 20 + i, 'rain_intensity': 0.5} for i in range(64)]
+    responses = asyncio.run(post_all([('POST', '/api/predict', body) for body in bodies]))
+    after = api.inference_scheduler.metrics()
+
+    predictor = api.model_reloader.predictor
+    for body, response in zip(bodies, responses):
+        expected = predictor.predict_traffic(*api.feature_row(body))
+        assert response.json()['predicted_traffic'] == round(expected, 0)
+
+    requests = after['requests'] - before['requests']
+    batches = after['batches'] - before['batches']
+    assert requests == 64 and batches < 64, (requests, batches)
+    print(f"   64 concurrent predictions in {batches} model calls, "
+          f"p99 queue wait {after['p99_queue_wait_ms']:.2f} ms")
+
+    stats = api.app.test_client().get('/api/predict/scheduler').get_json()['stats']
+    assert stats['queue_depth'] == 0 and stats['avg_batch_size'] > 1
+    print("✅ Micro-batching test completed!")
+
+def test_lone_prediction_not_delayed():
+    """A lone request skips the queue, and a queued one goes to the model without waiting out max_wait"""
+    scheduler = InferenceScheduler(lambda: api.model_reloader.predictor, max_wait=0.5)
+    row = api.feature_row({'hour': 8})
+    expected = api.model_reloader.predictor.predict_traffic(*row)
+    assert scheduler.predict(row) == expected
+    assert scheduler.metrics()['direct'] == 1 and scheduler.metrics()['batches'] == 0
+    
+    start = time.perf_counter()
+    for _ in range(10):
+        assert scheduler.submit(row).result() == expected
+    elapsed = time.perf_counter() - start
+    
+    assert elapsed < 0.5, elapsed
+    assert scheduler.metrics()['p99_queue_wait_ms'] < 100
+    print(f"   10 sequential queued predictions in {elapsed * 1000:.1f} ms with a 500 ms max wait")
+    print("✅ Lone request latency test completed!")
+
+def test_prediction_timeout():
+    """A queued request stuck behind a slow model gives up with InferenceTimeout and a 503"""
+    class SlowPredictor:
+        def predict_traffic_batch(self, X):
+            time.sleep(0.5)
+            return np.zeros(len(X))
+    
+    scheduler = InferenceScheduler(SlowPredictor)
+    row = api.feature_row({'hour': 8})
+    # The first caller runs directly; the second is queued and waits on the slow batch
+    first = threading.Thread(target=scheduler.predict, args=(row,))
+    first.start()
+    time.sleep(0.05)
+    try:
+        scheduler.predict(row, timeout=0.1)
+        assert False, "expected InferenceTimeout"
+    except InferenceTimeout:
+        pass
+    first.join()
+    assert scheduler.metrics()['timeouts'] == 1
+    
+    original, api.PREDICT_TIMEOUT = api.PREDICT_TIMEOUT, 0.0
+    try:
+        response = asyncio.run(post_all([('POST', '/api/predict', {'hour': 8})]))[0]
+    finally:
+        api.PREDICT_TIMEOUT = original
+    assert response.status_code == 503 and response.json()['success'] is False
+    print("✅ Prediction timeout test completed!")
+
+def test_binary_batch_formats():
+    """Raw float32 and Arrow batch bodies score the same as JSON and answer in kind"""
+    rng = np.random.default_rng(0)
+    # Values exactly representable in float32, so every format sees the same inputs
+    X = np.column_stack([rng.integers(0, 24, 500), rng.integers(0, 7, 500), rng.integers(0, 2, 500),
+                         rng.integers(0, 5, 500) / 4, rng.integers(15, 40, 500), rng.integers(30, 95, 500),
+                         rng.integers(0, 2, 500), rng.integers(0, 2, 500), rng.integers(20, 120, 500) / 2])
+    flask = api.app.test_client()
+    expected = flask.post('/api/predict/batch', json={'scenarios': X.tolist()}).get_json()
+
+    # Columns in a different order than the model's are matched by name
+    names = FEATURE_COLUMNS[::-1]
+    for content_type in batch_formats.content_types():
+        body = batch_formats.encode(names, X[:, ::-1], content_type)
+        flask_response = flask.post('/api/predict/batch', data=body, content_type=content_type)
+        async_response = asyncio.run(post_binary('/api/predict/batch', body, content_type))
+
+        for response in (flask_response.data, async_response.content):
+            result_names, results = batch_formats.decode(response, content_type)
+            assert result_names == ['predicted_traffic', 'route_score']
+            assert np.array_equal(results[:, 0], expected['predicted_traffic'])
+            assert np.allclose(results[:, 1], expected['route_score'], atol=1e-4)
+        assert async_response.headers['content-type'] == content_type
+        print(f"   {content_type}: {len(body):,} bytes for {len(X)} rows "
+              f"(JSON {len(json.dumps({'scenarios': X.tolist()})):,})")
+
+    bad = flask.post('/api/predict/batch', data=batch_formats.encode_raw(FEATURE_COLUMNS[:8], X[:, :8]),
+                     content_type=batch_formats.RAW_CONTENT_TYPE)
+    assert bad.status_code == 400 and 'avg_speed' in bad.get_json()['error']
+
+    # Bodies that decode but cannot be scored are 400s, not NaN predictions or 500s
+    nan_rows = X.copy()
+    nan_rows[3, 4] = np.nan
+    inf_rows = X.copy()
+    inf_rows[0, 0] = np.inf
+    header = ','.join(FEATURE_COLUMNS).replace('hour', 'h\u00f6ur', 1).encode('latin-1')
+    header += b' ' * (-len(header) % 4)
+    invalid = [
+        ('NaN or infinite', batch_formats.encode_raw(FEATURE_COLUMNS, nan_rows)),
+        ('NaN or infinite', batch_formats.encode_raw(FEATURE_COLUMNS, inf_rows)),
+        ('Duplicate column: hour', batch_formats.encode_raw(FEATURE_COLUMNS + ['hour'], np.hstack([X, X[:, :1]]))),
+        ('ASCII', batch_formats.RAW_MAGIC + len(header).to_bytes(4, 'little') + header)
+    ]
+    for message, body in invalid:
+        flask_response = flask.post('/api/predict/batch', data=body, content_type=batch_formats.RAW_CONTENT_TYPE)
+        async_response = asyncio.run(post_binary('/api/predict/batch', body, batch_formats.RAW_CONTENT_TYPE))
+        for status, error in ((flask_response.status_code, flask_response.get_json()['error']),
+                              (async_response.status_code, async_response.json()['error'])):
+            assert status == 400 and message in error, (status, error)
+    if batch_formats.PYARROW_AVAILABLE:
+        try:
+            batch_formats.decode_arrow(batch_formats.encode_arrow(FEATURE_COLUMNS, nan_rows))
+            raise AssertionError("NaN in an Arrow body should be rejected")
+        except ValueError as e:
+            assert 'NaN' in str(e)
+    print("✅ Binary batch format test completed!")
+
+def test_weather_fallback():
+    """An upstream weather failure serves mock data instead of a 500, as in the Flask app"""
+    original = api.weather_api
+    api.weather_api = WeatherAPI(api_key='test_key')
+    api.weather_api.executor.shutdown()
+    try:
+        weather, = asyncio.run(post_all([('GET', '/api/weather?city=Mysore', None)]))
+        flask = api.app.test_client().get('/api/weather?city=Mysore').get_json()
+        expected = api.weather_api._get_mock_weather_data('Mysore')
+    finally:
+        api.weather_api = original
+    assert weather.status_code == 200
+    assert weather.json() == flask == {'success': True, 'data': expected}
+    print("✅ Weather fallback test completed!")
+
+if __name__ == "__main__":
+    test_async_api_contract()
+    test_async_api_concurrent_routes()
+    test_micro_batched_predictions()
+    test_lone_prediction_not_delayed()
+    test_prediction_timeout()
+    test_binary_batch_formats()
+    test_weather_fallback()
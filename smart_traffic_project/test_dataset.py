@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic data generator and the typed dataset storage
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+import traffic_dataset
+from traffic_dataset import TRAFFIC_SCHEMA, load_traffic_data, iter_traffic_data, columnar_path
+from data_generator import generate_traffic_dataset, generate_traffic_dataset_chunks, write_traffic_dataset
+
+def test_generator_determinism():
+    """A seed always produces the same data, in memory, in chunks and on disk"""
+    df = generate_traffic_dataset(2000, seed=7)
+    pd.testing.assert_frame_equal(df, generate_traffic_dataset(2000, seed=7))
+    assert not df['traffic_flow'].equals(generate_traffic_dataset(2000, seed=8)['traffic_flow'])
+    
+    # Time columns follow the record index only: one record every 6 minutes from Sunday 00:00
+    assert df['hour'].iloc[[0, 9, 10, 239, 240]].tolist() == [0, 0, 1, 23, 0]
+    assert df['day_of_week'].iloc[[0, 240, 480]].tolist() == [6, 0, 1]
+    assert (df['is_weekend'] == (df['day_of_week'] >= 5)).all()
+    
+    chunks = list(generate_traffic_dataset_chunks(2500, chunk_size=1000, seed=7))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    pd.testing.assert_frame_equal(chunks[0], generate_traffic_dataset(1000, seed=7))
+    again = pd.concat(generate_traffic_dataset_chunks(2500, chunk_size=1000, seed=7), ignore_index=True)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), again)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f'traffic_{i}.csv') for i in range(2)]
+        for path in paths:
+            assert write_traffic_dataset(path, 2500, chunk_size=1000, seed=7) == 2500
+        with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b:
+            assert a.read() == b.read()
+        assert np.array_equal(pd.read_csv(paths[0])['hour'].to_numpy(), again['hour'].to_numpy())
+    print("✅ Generator determinism test completed!")
+
+def test_dataset_storage():
+    """CSV, Feather and Parquet all load with the compact schema and the same values"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'traffic.csv')
+        generate_traffic_dataset(3000, seed=3).to_csv(csv_path, index=False)
+        expected = pd.read_csv(csv_path)
+        
+        df = load_traffic_data(csv_path)
+        assert {column: str(dtype) for column, dtype in df.dtypes.items()} == TRAFFIC_SCHEMA
+        assert os.path.exists(columnar_path(csv_path))
+        assert np.allclose(df.to_numpy(np.float64), expected.to_numpy(np.float64), atol=1e-4)
+        
+        subset = load_traffic_data(csv_path, columns=['hour', 'traffic_flow'])
+        assert list(subset.columns) == ['hour', 'traffic_flow'] and subset['hour'].dtype == 'int8'
+        
+        # A newer CSV replaces the stale Feather copy
+        generate_traffic_dataset(1000, seed=4).to_csv(csv_path, index=False)
+        newer = os.path.getmtime(columnar_path(csv_path)) + 10
+        os.utime(csv_path, (newer, newer))
+        assert len(load_traffic_data(csv_path)) == 1000
+        
+        chunks = list(iter_traffic_data(csv_path, chunk_size=300))
+        assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+        assert all(chunk['rain_intensity'].dtype == 'float32' for chunk in chunks)
+        
+        parquet_path = os.path.join(tmp, 'traffic.parquet')
+        write_traffic_dataset(parquet_path, 2500, chunk_size=1000, seed=5)
+        parquet = load_traffic_data(parquet_path)
+        assert dict(parquet.dtypes.astype(str)) == TRAFFIC_SCHEMA
+        pd.testing.assert_frame_equal(parquet, pd.concat(iter_traffic_data(parquet_path, chunk_size=700),
+                                                         ignore_index=True))
+        
+        # Without pyarrow the CSV is parsed directly, with the same dtypes
+        traffic_dataset.PYARROW_AVAILABLE = False
+        try:
+            fallback = load_traffic_data(csv_path)
+        finally:
+            traffic_dataset.PYARROW_AVAILABLE = True
+        pd.testing.assert_frame_equal(fallback, load_traffic_data(csv_path))
+    print("✅ Dataset storage test completed!")
+
+if __name__ == "__main__":
+    test_generator_determinism()
+    test_dataset_storage()
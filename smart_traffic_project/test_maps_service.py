@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test MapsService caching against the local fake maps provider
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from maps_service import MapsService
+from fake_maps_client import FakeMapsClient
+from road_graph import RoadGraph
+from route_timing import estimate_route_times, best_departures
+from ml_models import TrafficPredictor, FEATURE_COLUMNS
+from datetime import datetime
+import numpy as np
+
+def test_route_and_geocode_cache():
+    """Concurrent provider calls, cached repeats and a geocode cache that survives restarts"""
+    print("🗺️  Testing MapsService caching")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        geocode_path = os.path.join(tmp, 'geocode_cache.json')
+        client = FakeMapsClient(delay=0.2)
+        maps = MapsService(client=client, geocode_cache_path=geocode_path)
+
+        # Directions and two geocodes overlap instead of taking 3 x 200 ms
+        start = time.perf_counter()
+        trip = maps.plan_trip("Bangalore", "Mysore")
+        cold = time.perf_counter() - start
+        assert len(trip['routes']) == 3
+        assert trip['origin_location']['formatted_address'].startswith("Bangalore")
+        assert cold < 0.5, cold
+
+        start = time.perf_counter()
+        assert maps.plan_trip("bangalore ", "Mysore") == trip
+        warm = time.perf_counter() - start
+        assert client.calls == {'directions': 1, 'geocode': 2}
+        print(f"   Cold: {cold * 1000:.0f} ms, cached: {warm * 1000:.2f} ms")
+
+        # A new service instance reads geocodes from disk
+        restarted_client = FakeMapsClient(delay=0.2)
+        restarted = MapsService(client=restarted_client, geocode_cache_path=geocode_path)
+        assert restarted.geocode_address("Mysore") == trip['destination_location']
+        assert restarted_client.calls['geocode'] == 0
+
+    # LRU eviction and TTL expiry
+    client = FakeMapsClient(delay=0)
+    maps = MapsService(client=client, route_cache_size=2, route_ttl=0.2, geocode_cache_path=None)
+    for destination in ["A", "B", "C", "A"]:
+        maps.get_routes("Origin", destination)
+    assert client.calls['directions'] == 4
+    maps.get_routes("Origin", "A")
+    assert client.calls['directions'] == 4
+    time.sleep(0.25)
+    maps.get_routes("Origin", "A")
+    assert client.calls['directions'] == 5
+
+    print(f"   Stats: {maps.cache_stats()}")
+    print("\n✅ MapsService caching test completed!")
+
+def test_offline_road_graph_routes():
+    """Without a maps key, routes come from the local road graph"""
+    graph = RoadGraph.synthetic_city(60, 60)
+    maps = MapsService(road_graph=graph, geocode_cache_path=None)
+    # Both mock geocodes fall inside this 6 km grid
+    routes = maps.get_routes("Hennur", "Yelahanka")
+    assert len(routes) == 3
+    assert len({route['polyline'] for route in routes}) == 3
+    assert routes[0]['duration_value'] <= routes[1]['duration_value'] <= routes[2]['duration_value']
+    
+    # The first alternative is the optimal route
+    weights = graph.free_flow_times()
+    source, target = graph.route_nodes(routes[0]['edges'])[[0, -1]]
+    _, best = graph.shortest_path(int(source), int(target), weights)
+    assert abs(best - weights[routes[0]['edges']].sum()) < 1e-3
+    
+    # A single route comes from one A* search and is the same optimal route
+    single = MapsService(road_graph=graph, geocode_cache_path=None, alternatives=1).get_routes("Hennur", "Yelahanka")
+    assert len(single) == 1 and np.array_equal(single[0]['edges'], routes[0]['edges'])
+    print(f"   {[route['name'] for route in routes]}")
+    print("✅ Offline road graph routing test completed!")
+
+def test_model_speed_range():
+    """Roads faster or slower than the training data are predicted at the nearest trained speed"""
+    graph = RoadGraph.synthetic_city(30, 30)
+    assert graph.speed_kmh.max() > 60 or graph.speed_kmh.min() < 10
+    seen = []
+    
+    class RecordingPredictor(RushHourPredictor):
+        to_feature_matrix = TrafficPredictor.to_feature_matrix
+        
+        def predict_traffic_batch(self, X):
+            X = self.to_feature_matrix(X)
+            seen.append(X[:, FEATURE_COLUMNS.index('avg_speed')])
+            return super().predict_traffic_batch(X)
+    
+    graph.predicted_travel_times(RecordingPredictor(), datetime(2024, 5, 6, 18, 0))
+    maps = MapsService(road_graph=graph, geocode_cache_path=None)
+    estimate_route_times(RecordingPredictor(), maps.get_routes("Hennur", "Yelahanka"), datetime(2024, 5, 6, 18, 0))
+    speeds = np.concatenate(seen)
+    assert speeds.min() >= 10 and speeds.max() <= 60
+    print("✅ Model speed range test completed!")
+
+def test_mock_geocode_spread():
+    """Mock geocodes hash latitude and longitude separately"""
+    maps = MapsService(geocode_cache_path=None)
+    offsets = [(g['lat'] - 12.9716, g['lng'] - 77.5946)
+               for g in map(maps.geocode_address, [f"Place {i}" for i in range(20)])]
+    assert any(abs(lat - lng) > 1e-9 for lat, lng in offsets)
+    print("✅ Mock geocode test completed!")
+
+class RushHourPredictor:
+    """Flow of 800 vehicles/hour from 17:00, 100 before; counts model calls"""
+    calls = 0
+    calculate_route_score_batch = TrafficPredictor.calculate_route_score_batch
+
+    def predict_traffic_batch(self, X):
+        self.calls += 1
+        return np.where(np.asarray(X)[:, 0] >= 17, 800.0, 100.0)
+
+def test_segment_route_timing():
+    """All segments of all routes are priced in one model call, at the hour each is reached"""
+    graph = RoadGraph.synthetic_city(60, 60)
+    maps = MapsService(road_graph=graph, geocode_cache_path=None)
+    routes = maps.get_routes("Hennur", "Yelahanka")
+    predictor = RushHourPredictor()
+
+    quiet = estimate_route_times(predictor, routes, datetime(2024, 5, 6, 10, 0))
+    assert predictor.calls == 1
+    assert all(timing['segments'] == len(route['segments']) for route, timing in zip(routes, quiet))
+    assert all(timing['duration_s'] >= timing['free_flow_s'] for timing in quiet)
+
+    # Leaving just before 17:00, only the segments reached after the hour slow down
+    late = estimate_route_times(predictor, routes, datetime(2024, 5, 6, 16, 58))
+    rush = estimate_route_times(predictor, routes, datetime(2024, 5, 6, 17, 0))
+    for quiet_timing, late_timing, rush_timing in zip(quiet, late, rush):
+        assert quiet_timing['duration_s'] < late_timing['duration_s'] < rush_timing['duration_s']
+        assert late_timing['hours_spanned'] == 2
+    print(f"   {[round(timing['duration_s']) for timing in late]} s leaving at 16:58")
+    print("✅ Segment route timing test completed!")
+
+def test_best_departure():
+    """Every slot x route in one model call; slots that finish before the rush rank first"""
+    graph = RoadGraph.synthetic_city(60, 60)
+    maps = MapsService(road_graph=graph, geocode_cache_path=None)
+    routes = maps.get_routes("Hennur", "Yelahanka")
+    predictor = RushHourPredictor()
+
+    start = time.perf_counter()
+    result = best_departures(predictor, routes, datetime(2024, 5, 6, 15, 0), 180, 5, top=3)
+    elapsed = time.perf_counter() - start
+    assert predictor.calls == 1
+    assert len(result['departures']) == 37 and len(result['duration_s'][0]) == len(routes)
+    assert elapsed < 0.1, elapsed
+
+    # Matches pricing each slot on its own
+    single = estimate_route_times(predictor, routes, datetime(2024, 5, 6, 16, 50))
+    assert np.allclose(result['duration_s'][22], [timing['duration_s'] for timing in single], atol=0.1)
+
+    best = result['best']
+    assert [slot['departure_time'][11:] for slot in best] == ['15:00', '15:05', '15:10']
+    assert all(slot['arrival_time'] < '2024-05-06T17:00' for slot in best)
+    print(f"   {len(result['departures'])} slots x {len(routes)} routes in {elapsed * 1000:.1f} ms")
+    print("✅ Best departure test completed!")
+
+if __name__ == "__main__":
+    test_route_and_geocode_cache()
+    test_offline_road_graph_routes()
+    test_model_speed_range()
+    test_mock_geocode_spread()
+    test_segment_route_timing()
+    test_best_departure()
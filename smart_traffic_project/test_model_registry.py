@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the versioned model registry: numbering, LATEST and concurrent saves
+"""
+
+import os
+import tempfile
+import multiprocessing
+from datetime import datetime
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import ModelRegistry
+
+def save_version(root, tag='test'):
+    registry = ModelRegistry(root)
+    metadata = {'trained_at': datetime.now().isoformat(), 'feature_names': ['x'], 'data_hash': tag}
+    return registry.save({'Linear Regression': LinearRegression()}, StandardScaler(), metadata,
+                         primary_model='Linear Regression')
+
+def test_registry_versions():
+    """Versions count up, LATEST follows saves and can be pointed back at an older version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(tmp)
+        assert registry.versions() == [] and registry.latest_version() is None
+        
+        assert save_version(tmp) == 'v0001'
+        assert save_version(tmp) == 'v0002'
+        assert registry.versions() == ['v0001', 'v0002']
+        assert registry.latest_version() == 'v0002'
+        assert registry.read_manifest()['version'] == 'v0002'
+        
+        registry.set_latest('v0001')
+        loaded = registry.load()
+        assert loaded['version'] == 'v0001' and loaded['manifest']['version'] == 'v0001'
+        assert 'Linear Regression' in loaded['models']
+        
+        # LATEST naming a missing version reads as no version
+        registry.set_latest('v0099')
+        assert registry.latest_version() is None
+        assert sorted(os.listdir(tmp)) == ['LATEST', 'v0001', 'v0002']
+    print("✅ Registry version test completed!")
+
+def test_concurrent_saves():
+    """Processes saving at the same time each get their own version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            versions = pool.starmap(save_version, [(tmp, str(i)) for i in range(8)])
+        
+        registry = ModelRegistry(tmp)
+        assert sorted(versions) == [f'v{i:04d}' for i in range(1, 9)], versions
+        assert registry.versions() == sorted(versions)
+        # Each directory holds the manifest of the save that claimed it
+        tags = {registry.read_manifest(version)['data_hash'] for version in versions}
+        assert tags == {str(i) for i in range(8)}
+        assert all(registry.read_manifest(v)['version'] == v for v in versions)
+        assert not [name for name in os.listdir(tmp) if name.startswith('.')]
+    print(f"   8 concurrent saves: {', '.join(sorted(versions))}")
+    print("✅ Concurrent save test completed!")
+
+if __name__ == "__main__":
+    test_registry_versions()
+    test_concurrent_saves()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test the observation log (group commit, durability, write failures) and the online learner
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from fixtures import trained_predictor
+import numpy as np
+from ml_models import FEATURE_COLUMNS
+from online_learning import ObservationLog, OnlineLearner, OBSERVATION_DTYPE
+
+def make_records(n, seed=0, offset=0.0, predictor=None, start=0):
+    """Random observations; traffic_flow is the model's prediction plus offset"""
+    rng = np.random.default_rng(seed)
+    records = np.zeros(n, dtype=OBSERVATION_DTYPE)
+    for column, (low, high) in zip(FEATURE_COLUMNS, [(0, 23), (0, 6), (0, 1), (0, 1), (15, 40),
+                                                     (30, 95), (0, 1), (0, 1), (10, 60)]):
+        records[column] = rng.uniform(low, high, n).round(0 if high in (1, 6, 23) else 1)
+    if predictor is not None:
+        X = np.column_stack([records[column] for column in FEATURE_COLUMNS]).astype(np.float64)
+        records['traffic_flow'] = np.maximum(0, predictor._predict_exact(X)) + offset
+    records['observed_at'] = 1_700_000_000 + start + np.arange(n)
+    return records
+
+def test_observation_log_durability():
+    """Concurrent appends share fsyncs, and everything committed is there after reopening"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'observations.bin')
+        log = ObservationLog(path)
+        chunks = [make_records(10, seed=i, start=10 * i) for i in range(20)]
+        threads = [threading.Thread(target=log.append, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert log.committed == 200
+        assert log.commits < 20, log.commits
+        print(f"   20 concurrent appends in {log.commits} commits")
+
+        # A crash mid-write leaves a partial record, which reopening drops
+        with open(path, 'ab') as f:
+            f.write(b'\0' * 5)
+        reopened = ObservationLog(path)
+        assert reopened.committed == 200
+        records = reopened.read(0, 200)
+        assert np.array_equal(np.sort(records, order='observed_at'), np.concatenate(chunks))
+        assert reopened.latest_observed_at == 1_700_000_199
+
+        # Another process's appends show up after refresh()
+        ObservationLog(path).append(make_records(5, seed=99, start=200))
+        reopened.refresh()
+        assert reopened.committed == 205
+    print("✅ Observation log durability test completed!")
+
+def test_observation_log_write_failure():
+    """A failed write raises in its callers and does not stop later commits"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ObservationLog(os.path.join(tmp, 'observations.bin'), append_timeout=5)
+        log.append(make_records(3))
+
+        good_fd = log._fd
+        log._fd = os.open(os.devnull, os.O_RDONLY)
+        try:
+            log.append(make_records(3, seed=1))
+            raise AssertionError("append() should fail when the write fails")
+        except OSError as e:
+            print(f"   Failed append raised: {e}")
+        os.close(log._fd)
+        log._fd = good_fd
+
+        assert log.append(make_records(3, seed=2)) == 6
+        assert log.write_errors == 1
+    print("✅ Observation log write failure test completed!")
+
+def test_online_learner_correction():
+    """The learner picks up a systematic residual, skips the serving cache and resets on a new model"""
+    predictor = trained_predictor(fast_inference=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ObservationLog(os.path.join(tmp, 'observations.bin'))
+        learner = OnlineLearner(log, lambda: predictor)
+        records = make_records(4096, predictor=predictor, offset=150.0)
+        X = np.column_stack([records[column] for column in FEATURE_COLUMNS]).astype(np.float64)
+        base = np.maximum(0, predictor._predict_exact(X))
+
+        cache_before = predictor.prediction_cache.stats()
+        for _ in range(5):
+            for start in range(0, len(records), learner.batch_size):
+                learner._learn(records[start:start + learner.batch_size])
+        assert predictor.prediction_cache.stats() == cache_before
+
+        correction = (learner.predict(predictor, X, base) - base).mean()
+        assert abs(correction - 150) < 30, correction
+        assert learner.online_mae < learner.base_mae
+        print(f"   Learned correction {correction:.1f} (true offset 150)")
+
+        # Residuals of the old model do not apply to a new version
+        current_version = predictor.model_version
+        predictor.model_version = 'v9999'
+        try:
+            assert np.array_equal(learner.predict(predictor, X, base), base)
+            learner._learn(records[:learner.batch_size])
+            assert learner.model_version == 'v9999'
+            assert learner._sgd.t_ <= learner.batch_size + 1
+        finally:
+            predictor.model_version = current_version
+    print("✅ Online learner test completed!")
+
+def test_online_learner_replays_log():
+    """A learner started on an existing log (e.g. after a restart) learns the records already in it"""
+    predictor = trained_predictor(fast_inference=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'observations.bin')
+        ObservationLog(path).append(make_records(2048, predictor=predictor, offset=150.0))
+
+        learner = OnlineLearner(ObservationLog(path), lambda: predictor)
+        assert learner.status()['pending'] == 2048
+        learner.start()
+        deadline = time.time() + 30
+        while learner.applied < 2048 and time.time() < deadline:
+            time.sleep(0.05)
+        assert learner.applied == 2048 and learner.updates == 2
+        assert learner.model is not learner._sgd
+    print("✅ Online learner replay test completed!")
+
+if __name__ == "__main__":
+    test_observation_log_durability()
+    test_observation_log_write_failure()
+    test_online_learner_correction()
+    test_online_learner_replays_log()
@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 import sys
 import os
+import time
+import signal
+import threading
+import json
+import tempfile
 sys.path.append('/Users/surjithsshetty/Desktop/aiml_CIE3/smart_traffic_project')
 
-from ml_models import TrafficPredictor
+from fixtures import trained_predictor, TEST_DIR
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from ml_models import TrafficPredictor, FlatForest, ReservoirSample, FEATURE_COLUMNS, dataset_hash
+from data_generator import write_traffic_dataset
+from inference_pool import InferencePool
+from prediction_lattice import PredictionLattice, CONTINUOUS_FEATURES
 
 def test_prediction():
     """Test the prediction functionality"""
     try:
-        predictor = TrafficPredictor()
-        
-        if not predictor.load_models():
-            print("Training models...")
-            predictor.load_data('traffic_data.csv')
-            predictor.train_models()
-            predictor.save_models()
+        predictor = trained_predictor()
         
         predicted_traffic = predictor.predict_traffic(
             hour=8, day_of_week=1, is_weekend=0, rain_intensity=0.0,
@@ -36,6 +41,297 @@ def test_prediction():
         print(f"Prediction Error: {e}")
         return False
 
+def test_flat_forest():
+    """The flattened forest predicts what sklearn predicts, row by row and across chunks"""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, size=(2500, 9))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) * 50 + rng.normal(0, 5, len(X))
+    forest = RandomForestRegressor(n_estimators=20, max_depth=12, random_state=0).fit(X, y)
+    flat = FlatForest.from_sklearn(forest)
+    
+    X_test = rng.uniform(-10, 110, size=(2500, 9))
+    assert np.allclose(flat.predict(X_test), forest.predict(X_test), rtol=0, atol=1e-9)
+    assert np.allclose(flat.predict(X_test, chunk_size=7), forest.predict(X_test), rtol=0, atol=1e-9)
+    assert np.allclose(flat.predict(X_test[:1]), forest.predict(X_test[:1]), rtol=0, atol=1e-9)
+    
+    # The predictor's export (memory-mapped from the registry when loaded) matches its sklearn model
+    predictor = trained_predictor(fast_inference=True, cache_size=0)
+    rows = np.random.default_rng(1).uniform([0, 0, 0, 0, 15, 30, 0, 0, 10], [23, 6, 1, 1, 40, 95, 1, 1, 60],
+                                            size=(500, 9)).round(1)
+    assert np.allclose(predictor.flat_forest.predict(rows), predictor.predict_with_model('Random Forest', rows),
+                       rtol=0, atol=1e-6)
+    print(f"   Flat forest: {flat.predict(X_test).shape[0]} rows match sklearn")
+    print("✅ Flat forest test completed!")
+
+def test_prediction_cache_invalidation():
+    """Cached predictions are dropped when the primary model changes or models are reloaded"""
+    predictor = trained_predictor(fast_inference=True)
+    row = dict(hour=8, day_of_week=1, is_weekend=0, rain_intensity=0.0, temperature=25,
+               humidity=60, event_flag=0, rush_hour=1, avg_speed=35)
+    
+    forest = predictor.predict_traffic(**row)
+    assert predictor.predict_traffic(**row) == forest
+    stats = predictor.prediction_cache.stats()
+    assert stats['size'] == 1 and stats['hits'] >= 1
+    
+    predictor.set_primary_model('Linear Regression')
+    assert predictor.prediction_cache.stats()['size'] == 0
+    linear = predictor.predict_traffic(**row)
+    X = predictor.to_feature_matrix([row])
+    assert linear == max(0, predictor.predict_with_model('Linear Regression', X)[0])
+    assert linear != forest
+    
+    predictor.set_primary_model('Random Forest')
+    assert predictor.predict_traffic(**row) == forest
+    predictor.load_models()
+    assert predictor.prediction_cache.stats()['size'] == 0
+    print(f"   Random Forest {forest:.0f}, Linear Regression {linear:.0f}: cache cleared on each switch")
+    print("✅ Prediction cache invalidation test completed!")
+
+def test_prediction_cache_parity():
+    """Turning the cache on, hitting it, or overflowing it never changes a prediction"""
+    uncached = trained_predictor(fast_inference=True, cache_size=0)
+    cached = trained_predictor(fast_inference=True, cache_size=64)
+    assert uncached.prediction_cache is None
+    
+    # Unrounded continuous inputs, each row repeated once
+    rng = np.random.default_rng(1)
+    X = np.empty((200, len(FEATURE_COLUMNS)))
+    X[:, FEATURE_COLUMNS.index('hour')] = rng.integers(0, 24, 200)
+    X[:, FEATURE_COLUMNS.index('day_of_week')] = rng.integers(0, 7, 200)
+    X[:, FEATURE_COLUMNS.index('is_weekend')] = X[:, FEATURE_COLUMNS.index('day_of_week')] >= 5
+    X[:, FEATURE_COLUMNS.index('rain_intensity')] = rng.uniform(0, 1, 200)
+    X[:, FEATURE_COLUMNS.index('temperature')] = rng.uniform(10, 40, 200)
+    X[:, FEATURE_COLUMNS.index('humidity')] = rng.uniform(20, 100, 200)
+    X[:, FEATURE_COLUMNS.index('event_flag')] = rng.integers(0, 2, 200)
+    X[:, FEATURE_COLUMNS.index('rush_hour')] = rng.integers(0, 2, 200)
+    X[:, FEATURE_COLUMNS.index('avg_speed')] = rng.uniform(10, 60, 200)
+    X[100:] = X[:100]
+    expected = uncached.predict_traffic_batch(X)
+    
+    # Over max_size the batch bypasses the cache; in chunks it misses, then hits
+    assert np.array_equal(cached.predict_traffic_batch(X), expected)
+    for _ in range(2):
+        for start in range(0, len(X), 50):
+            assert np.array_equal(cached.predict_traffic_batch(X[start:start + 50]), expected[start:start + 50])
+    assert cached.prediction_cache.stats()['hits'] > 0
+    print("✅ Prediction cache parity test completed!")
+
+def test_search_checkpoint_resume():
+    """An interrupted search resumes from its checkpoint, which is removed when the search finishes"""
+    grid = {'n_estimators': [10, 20, 30], 'max_depth': [4]}
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = TrafficPredictor(registry_dir=tmp)
+        predictor.load_data('traffic_data.csv')
+        checkpoint = os.path.join(tmp, 'search_checkpoint.jsonl')
+        
+        # One candidate finished before the interruption, the next was cut off mid-line
+        finished = {'params': {'max_depth': 4, 'n_estimators': 10}, 'cv_mae': 1.0, 'cv_mae_std': 0.0,
+                    'wall_time': 0.0, 'data_hash': dataset_hash(predictor.df), 'cv': 2}
+        with open(checkpoint, 'w') as f:
+            f.write(json.dumps(finished) + '\n' + '{"params": {"max_d')
+        
+        predictor.train_all_models(param_grid=grid, cv=2, n_workers=2, save=False)
+        # The resumed candidate kept its recorded score; the others were evaluated in spawned workers
+        assert predictor.search_results[0] == finished
+        assert sorted(r['params']['n_estimators'] for r in predictor.search_results[1:]) == [20, 30]
+        assert all(r['cv_mae'] > 1.0 for r in predictor.search_results[1:])
+        assert predictor.models['Random Forest'].n_estimators == 10
+        assert not os.path.exists(checkpoint)
+    print(f"   Resumed 1 of 3 candidates; best {predictor.search_results[0]['params']}")
+    print("✅ Search checkpoint resume test completed!")
+
+def test_reservoir_sample():
+    """The reservoir keeps every row until full, then a uniform sample of the stream"""
+    reservoir = ReservoirSample(100, 2)
+    reservoir.add(np.column_stack([np.arange(60), np.arange(60)]))
+    assert np.array_equal(reservoir.sample()[:, 0], np.arange(60))
+    
+    counts = np.zeros(10_000)
+    for seed in range(200):
+        reservoir = ReservoirSample(1000, 1, seed=seed)
+        for start in range(0, 10_000, 777):
+            reservoir.add(np.arange(start, min(start + 777, 10_000))[:, None])
+        rows = reservoir.sample()[:, 0].astype(np.int64)
+        assert reservoir.seen == 10_000 and len(np.unique(rows)) == 1000
+        counts[rows] += 1
+    # Every row is kept with probability 0.1, early or late in the stream
+    for part in np.split(counts, 10):
+        assert abs(part.mean() / 200 - 0.1) < 0.01, part.mean() / 200
+    print("✅ Reservoir sample test completed!")
+
+def test_incremental_training():
+    """Chunked training holds out a stable ~20% and fits usable models"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'traffic.feather')
+        write_traffic_dataset(path, 20_000, chunk_size=5000, seed=1)
+        
+        predictor = TrafficPredictor(fast_inference=True, registry_dir=tmp)
+        results = predictor.train_models_incremental(path, chunk_size=3000, n_epochs=2, holdout_size=10_000,
+                                                     forest_sample_size=4000, rf_params={'n_estimators': 20})
+        assert set(results) == {'SGD Regressor', 'Random Forest', 'Gradient Boosting'}
+        assert 3500 < len(predictor.y_test) < 4500
+        assert all(result['R2'] > 0.8 for result in results.values()), results
+        
+        # The holdout assignment and samples are the same on every run
+        again = TrafficPredictor(registry_dir=tmp)
+        again.train_models_incremental(path, chunk_size=3000, n_epochs=2, holdout_size=10_000,
+                                       forest_sample_size=4000, rf_params={'n_estimators': 20})
+        assert np.array_equal(again.X_test.to_numpy(), predictor.X_test.to_numpy())
+        assert again.data_hash == predictor.data_hash
+        
+        predictor.save_models()
+        assert predictor.registry.read_manifest()['data_hash'] == predictor.data_hash
+        assert predictor.predict_traffic(8, 1, 0, 0.0, 25, 60, 0, 1, 35) > 0
+    print(f"   Holdout {len(predictor.y_test)} rows, R2 " +
+          ", ".join(f"{name} {result['R2']:.2f}" for name, result in results.items()))
+    print("✅ Incremental training test completed!")
+
+def test_inference_pool():
+    """Worker processes return exactly the in-process predictions"""
+    predictor = trained_predictor(fast_inference=True, cache_size=0)
+    
+    pool = InferencePool(2)
+    pooled = trained_predictor(fast_inference=True, cache_size=0, inference_pool=pool)
+    pool.start()
+    try:
+        X = np.random.default_rng(0).uniform([0, 0, 0, 0, 15, 30, 0, 0, 10], [23, 6, 1, 1, 40, 95, 1, 1, 60],
+                                             size=(3000, 9)).round(1)
+        # Chunks below flat_forest_max_rows take the flat engine, equal to sklearn up to rounding
+        assert np.allclose(pooled.predict_traffic_batch(X), predictor.predict_traffic_batch(X))
+        assert pooled.predict_traffic(*X[0]) == predictor.predict_traffic(*X[0])
+        status = pool.status()
+    finally:
+        pool.close()
+    
+    assert status['processes'] == 2 and status['rows'] == 3001
+    print(f"   {status['rows']} rows predicted in {status['requests']} pool calls")
+    print("✅ Inference pool test completed!")
+
+def test_inference_pool_worker_death():
+    """Dead workers are replaced up to max_restarts, their rows are predicted in-process meanwhile,
+    and a pool with no workers left stops running"""
+    predictor = trained_predictor(fast_inference=True, cache_size=0)
+    
+    pool = InferencePool(2, slot_rows=256, max_restarts=1)
+    pooled = trained_predictor(fast_inference=True, cache_size=0, inference_pool=pool)
+    pool.start()
+    try:
+        X = np.random.default_rng(0).uniform([0, 0, 0, 0, 15, 30, 0, 0, 10], [23, 6, 1, 1, 40, 95, 1, 1, 60],
+                                             size=(2000, 9)).round(1)
+        expected = predictor._predict_local(X)
+        assert np.allclose(pooled._predict_exact(X), expected)
+        
+        # Killed while idle: replaced by a fresh worker
+        first, second = pool._workers
+        os.kill(first.process.pid, signal.SIGKILL)
+        first.process.join(5)
+        assert np.allclose(pooled._predict_exact(X), expected)
+        status = pool.status()
+        assert status['processes'] == 2 and status['lost_workers'] == 1 and status['restarted_workers'] == 1
+        assert first not in pool._workers
+        
+        # Killed while holding a chunk: the reply never comes, so the chunk is redone here,
+        # and with no restarts left the worker is not replaced
+        os.kill(second.process.pid, signal.SIGSTOP)
+        result = {}
+        caller = threading.Thread(target=lambda: result.update(predictions=pooled._predict_exact(X)))
+        caller.start()
+        time.sleep(0.2)
+        os.kill(second.process.pid, signal.SIGKILL)
+        caller.join(10)
+        assert np.allclose(result['predictions'], expected)
+        assert pool.status()['processes'] == 1 and pool.status()['lost_workers'] == 2
+        
+        last, = pool._workers
+        os.kill(last.process.pid, signal.SIGKILL)
+        last.process.join(5)
+        assert np.allclose(pooled._predict_exact(X), expected)
+        assert not pool.running and pool.status()['lost_workers'] == 3
+        # With no workers left the predictor stays in-process
+        assert np.allclose(pooled.predict_traffic_batch(X), predictor.predict_traffic_batch(X))
+    finally:
+        pool.close()
+    print("✅ Inference pool worker death test completed!")
+
+def test_prediction_lattice():
+    """The lattice matches the exact model at its knots and is only served within tolerance"""
+    predictor = trained_predictor(fast_inference=True, cache_size=0)
+    
+    # A deliberately coarse grid: exact at the knots, far off in between
+    axes = {'rain_intensity': (0.0, 1.0, 3), 'temperature': (10.0, 40.0, 2),
+            'humidity': (20.0, 100.0, 2), 'avg_speed': (10.0, 60.0, 6)}
+    lattice = PredictionLattice.build(predictor._predict_exact, FEATURE_COLUMNS, axes, error_samples=2000)
+    
+    rng = np.random.default_rng(0)
+    knots = np.empty((500, len(FEATURE_COLUMNS)))
+    knots[:, FEATURE_COLUMNS.index('hour')] = rng.integers(0, 24, 500)
+    knots[:, FEATURE_COLUMNS.index('day_of_week')] = rng.integers(0, 7, 500)
+    knots[:, FEATURE_COLUMNS.index('is_weekend')] = knots[:, FEATURE_COLUMNS.index('day_of_week')] >= 5
+    knots[:, FEATURE_COLUMNS.index('event_flag')] = rng.integers(0, 2, 500)
+    knots[:, FEATURE_COLUMNS.index('rush_hour')] = rng.integers(0, 2, 500)
+    for name, axis in zip(CONTINUOUS_FEATURES, lattice.axes):
+        knots[:, FEATURE_COLUMNS.index(name)] = rng.choice(axis, 500)
+    approx, in_grid = lattice.predict(knots)
+    assert in_grid.all()
+    assert np.allclose(approx, predictor._predict_exact(knots), atol=1e-3)
+    
+    lattice.meta.update(trained_at=predictor.metadata.get('trained_at'), primary_model=predictor.primary_model)
+    paths = predictor.lattice_paths()
+    assert all(path.startswith(TEST_DIR) for path in paths)
+    lattice.save(*paths)
+    try:
+        # Over the tolerance the lattice is refused and predictions stay exact
+        strict = trained_predictor(fast_inference=True, cache_size=0, use_lattice=True,
+                                  lattice_tolerance=lattice.meta['max_abs_error'] - 1)
+        assert strict.lattice is None
+        X = knots.copy()
+        for name, axis in zip(CONTINUOUS_FEATURES, lattice.axes):
+            X[:, FEATURE_COLUMNS.index(name)] = rng.uniform(axis[0], axis[-1], len(X))
+        assert np.array_equal(strict.predict_traffic_batch(X), predictor.predict_traffic_batch(X))
+        
+        lenient = trained_predictor(fast_inference=True, cache_size=0, use_lattice=True,
+                                   lattice_tolerance=lattice.meta['max_abs_error'])
+        assert lenient.lattice is not None
+    finally:
+        for path in paths:
+            os.remove(path)
+    
+    print(f"   Coarse lattice max abs error {lattice.meta['max_abs_error']:.1f}: refused below that tolerance")
+    print("✅ Prediction lattice test completed!")
+
+def test_lattice_refine():
+    """refine() doubles axes until the tolerance is met, and gives up at the point budget"""
+    speed_col = FEATURE_COLUMNS.index('avg_speed')
+    rain_col = FEATURE_COLUMNS.index('rain_intensity')
+    axes = {'rain_intensity': (0.0, 1.0, 2), 'temperature': (10.0, 40.0, 2),
+            'humidity': (20.0, 100.0, 2), 'avg_speed': (10.0, 60.0, 11)}
+    
+    # A parabola in speed: interpolation error is spacing^2 / 4, 6.25 on the 5 km/h grid
+    smooth = lambda X: (X[:, speed_col] - 35.0) ** 2
+    lattice, error = PredictionLattice.refine(smooth, FEATURE_COLUMNS, 2.0, axes, error_samples=2000)
+    assert lattice is not None and error['max_abs_error'] <= 2.0
+    assert lattice.meta['max_abs_error'] <= 2.0
+    assert [len(axis) for axis in lattice.axes] == [2, 2, 2, 21]
+    
+    # A step in rain never interpolates within tolerance
+    step = lambda X: 100.0 * (X[:, rain_col] > 0.33)
+    lattice, error = PredictionLattice.refine(step, FEATURE_COLUMNS, 1.0, axes, max_points=500,
+                                              error_samples=2000)
+    assert lattice is None and error['max_abs_error'] > 1.0
+    
+    print("✅ Lattice refine test completed!")
+
 if __name__ == "__main__":
     os.chdir('/Users/surjithsshetty/Desktop/aiml_CIE3/smart_traffic_project')
     test_prediction()
+    test_flat_forest()
+    test_prediction_cache_invalidation()
+    test_prediction_cache_parity()
+    test_search_checkpoint_resume()
+    test_reservoir_sample()
+    test_incremental_training()
+    test_inference_pool()
+    test_inference_pool_worker_death()
+    test_prediction_lattice()
+    test_lattice_refine()
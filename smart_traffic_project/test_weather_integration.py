@@ -8,7 +8,14 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from weather_api import WeatherAPI
+from weather_stub_server import WeatherStubServer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from traffic_forecast import TrafficForecaster
+from ml_models import FEATURE_COLUMNS
 import json
+import time
 
 def test_weather_api():
     """Test the weather API functionality"""
@@ -47,5 +54,120 @@ def test_weather_api():
     print(f"\n✅ Weather API integration test completed!")
     print(f"   The weather data will be automatically used in traffic predictions.")
 
+def test_weather_client_caching():
+    """Cache hits, request coalescing and stale-while-revalidate against the local stub"""
+    print("🌤️  Testing Weather client caching")
+    print("=" * 50)
+    
+    with WeatherStubServer(delay=0.1) as server:
+        weather_api = WeatherAPI(api_key="test", base_url=server.url, ttl=0.5, stale_ttl=60, error_ttl=0.5)
+        
+        # Twenty concurrent requests for one city share a single upstream call
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(weather_api.get_weather_data, ["Mumbai"] * 20))
+        assert server.requests == {"Mumbai": 1}, server.requests
+        assert all(result == results[0] for result in results)
+        assert results[0]['city'] == "Mumbai"
+        
+        # Fresh cache hit: no upstream call
+        start = time.perf_counter()
+        weather_api.get_weather_data("Mumbai")
+        assert time.perf_counter() - start < 0.05
+        assert server.total_requests() == 1
+        
+        # Past the TTL the old value is returned at once and refreshed in the background
+        time.sleep(0.6)
+        start = time.perf_counter()
+        assert weather_api.get_weather_data("Mumbai") == results[0]
+        assert time.perf_counter() - start < 0.05
+        time.sleep(0.3)
+        assert server.total_requests() == 2
+        
+        # During an upstream outage cached cities keep their last good value...
+        server.status_code = 500
+        time.sleep(0.6)
+        assert weather_api.get_weather_data("Mumbai") == results[0]
+        time.sleep(0.3)
+        assert weather_api.get_weather_data("Mumbai") == results[0]
+        
+        # ...and uncached ones fall back to mock data
+        assert weather_api.get_weather_data("Chennai")['city'] == 'AI Predicted Weather'
+        
+        # A failed city is not asked for again until error_ttl has passed
+        assert weather_api.get_weather_data("Chennai")['city'] == 'AI Predicted Weather'
+        assert server.requests["Chennai"] == 1
+        server.status_code = 200
+        time.sleep(0.6)
+        assert weather_api.get_weather_data("Chennai")['city'] == "Chennai"
+        assert server.requests["Chennai"] == 2
+        
+        metrics = weather_api.metrics()
+        print(f"   Metrics: {json.dumps(metrics)}")
+        assert metrics['coalesced'] == 19 and metrics['errors'] >= 2 and metrics['failure_hits'] >= 1
+        
+        # The cache keeps only the most recently used cities
+        small = WeatherAPI(api_key="test", base_url=server.url, cache_size=2)
+        for city in ["Pune", "Delhi", "Pune", "Goa"]:
+            small.get_weather_data(city)
+        assert small.metrics()['cached_cities'] == 2 and small.metrics()['evictions'] == 1
+        small.get_weather_data("Pune")
+        assert server.requests["Pune"] == 1 and small.metrics()['hits'] == 2
+    
+    print(f"\n✅ Weather client caching test completed!")
+
+def test_weather_climatology_repeatable():
+    """Offline weather is a fixed lookup, identical across calls and instances"""
+    first, second = WeatherAPI(), WeatherAPI()
+    for day in range(7):
+        for hour in range(24):
+            assert first.predict_weather_for_day(day, hour) == second.predict_weather_for_day(day, hour)
+    assert first.get_weather_data() == first.get_weather_data()
+    
+    per_city = WeatherAPI(per_city_climatology=True)
+    assert per_city.predict_weather_for_day(1, 8, "Mumbai") == second.predict_weather_for_day(1, 8, "mumbai ")
+    print("✅ Weather climatology is repeatable")
+
+class RecordingPredictor:
+    """Returns the hour as the flow and keeps every feature matrix it is given"""
+    model_version = 'v0001'
+    
+    def __init__(self):
+        self.batches = []
+    
+    def score_traffic_batch(self, X):
+        self.batches.append(X)
+        return X[:, FEATURE_COLUMNS.index('hour')], X[:, FEATURE_COLUMNS.index('avg_speed')]
+
+def test_traffic_forecast():
+    """A week of hourly features and weather in one model call, cached per horizon start"""
+    weather = WeatherAPI()
+    predictor = RecordingPredictor()
+    forecaster = TrafficForecaster(lambda: predictor, weather)
+    
+    forecast = forecaster.forecast(datetime(2024, 5, 10, 22, 40), days=7)
+    assert len(predictor.batches) == 1 and len(forecast['timestamps']) == 7 * 24
+    assert forecast['start'] == '2024-05-10T22:00'
+    X = predictor.batches[0]
+    # Friday 22:00 -> Saturday 00:00 two rows later
+    row = X[2]
+    assert row[FEATURE_COLUMNS.index('hour')] == 0 and row[FEATURE_COLUMNS.index('day_of_week')] == 5
+    assert row[FEATURE_COLUMNS.index('is_weekend')] == 1
+    assert row[FEATURE_COLUMNS.index('temperature')] == weather.predict_weather_for_day(5, 0)['temperature']
+    assert forecast['predicted_traffic'][:3] == [22, 23, 0]
+    
+    # Polling later in the same hour is a cache hit; a new model version is not
+    assert forecaster.forecast(datetime(2024, 5, 10, 22, 55), days=7) is forecast
+    predictor.model_version = 'v0002'
+    forecaster.forecast(datetime(2024, 5, 10, 22, 55), days=7)
+    assert len(predictor.batches) == 2
+    assert forecaster.cache_stats() == {'hits': 1, 'misses': 2, 'cached_horizons': 2}
+    
+    quarter_hourly = forecaster.forecast(datetime(2024, 5, 10, 22, 40), days=1, step_minutes=15)
+    assert quarter_hourly['timestamps'][:2] == ['2024-05-10T22:30', '2024-05-10T22:45']
+    print("✅ Traffic forecast test completed!")
+
 if __name__ == "__main__":
-    test_weather_api()
\ No newline at end of file
+    test_weather_api()
+    test_weather_client_caching()
+    test_weather_climatology_repeatable()
+    test_traffic_forecast()
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+
+# Smallest dtypes that hold every column without loss of the generator's precision
+TRAFFIC_SCHEMA = {
+    'hour': 'int8',
+    'day_of_week': 'int8',
+    'is_weekend': 'int8',
+    'rain_intensity': 'float32',
+    'temperature': 'float32',
+    'humidity': 'float32',
+    'event_flag': 'int8',
+    'rush_hour': 'int8',
+    'avg_speed': 'float32',
+    'traffic_flow': 'float32'
+}
+
+COLUMNAR_SUFFIX = '.feather'
+CSV_CHUNK_SIZE = 1_000_000
+
+def apply_schema(df):
+    """Downcast the known traffic columns in place and return the frame"""
+    for column, dtype in TRAFFIC_SCHEMA.items():
+        if column in df.columns and df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def columnar_path(csv_path):
+    """Where the columnar copy of a CSV dataset lives"""
+    return os.path.splitext(csv_path)[0] + COLUMNAR_SUFFIX
+
+class TrafficDataWriter:
+    """Append DataFrame chunks to a .csv, .feather (Arrow IPC) or .parquet file
+
+    Feather files are written uncompressed so they can be memory-mapped on read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = os.path.splitext(path)[1].lower().lstrip('.')
+        if self.format in ('feather', 'arrow', 'parquet') and not PYARROW_AVAILABLE:
+            raise ImportError(f"pyarrow is required to write {path}")
+        self._writer = None
+        self.rows_written = 0
+
+    def write(self, df):
+        df = apply_schema(df)
+        if self.format in ('feather', 'arrow', 'parquet'):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.format == 'parquet':
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self.rows_written == 0 else 'a',
+                      header=self.rows_written == 0, index=False)
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _csv_dtypes(csv_path):
+    """Schema restricted to the columns present in a CSV header"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return {column: dtype for column, dtype in TRAFFIC_SCHEMA.items() if column in header}
+
+def convert_csv(csv_path, output_path=None, chunk_size=CSV_CHUNK_SIZE):
+    """Convert a CSV dataset to columnar storage chunk by chunk; returns the new path"""
+    output_path = output_path or columnar_path(csv_path)
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.convert-', suffix=os.path.splitext(output_path)[1], dir=directory)
+    os.close(fd)
+
+    try:
+        with TrafficDataWriter(tmp_path) as writer:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=_csv_dtypes(csv_path)):
+                writer.write(chunk)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    print(f"Converted {csv_path} -> {output_path} ({writer.rows_written:,} rows)")
+    return output_path
+
+def _columnar_copy(csv_path):
+    """Path of an up-to-date Feather copy of csv_path, converting if needed"""
+    cached = columnar_path(csv_path)
+    if os.path.exists(csv_path) and (not os.path.exists(cached)
+                                     or os.path.getmtime(cached) < os.path.getmtime(csv_path)):
+        convert_csv(csv_path, cached)
+    return cached
+
+def load_traffic_data(path='traffic_data.csv', columns=None):
+    """Load a traffic dataset with the downcast schema
+
+    CSV files are converted once to a Feather file next to them (refreshed when the
+    CSV is newer) and read from there through a memory map. Without pyarrow the CSV
+    is parsed directly, still with the compact dtypes.
+    """
+    if path.lower().endswith('.csv'):
+        if not PYARROW_AVAILABLE:
+            return apply_schema(pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(path)))
+
+        path = _columnar_copy(path)
+
+    if path.lower().endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        df = table.to_pandas(split_blocks=True)
+    return apply_schema(df)
+
+def iter_traffic_data(path='traffic_data.csv', chunk_size=100_000, columns=None):
+    """Yield a dataset as typed DataFrames of at most chunk_size rows
+
+    Only one chunk is materialized at a time, so datasets far larger than memory
+    can be streamed. CSV files are read through their Feather copy when pyarrow
+    is available.
+    """
+    if path.lower().endswith('.csv'):
+        if not PYARROW_AVAILABLE:
+            for chunk in pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(path), chunksize=chunk_size):
+                yield apply_schema(chunk)
+            return
+        path = _columnar_copy(path)
+
+    if path.lower().endswith('.parquet'):
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        if columns is not None:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunk_size):
+            yield apply_schema(batch.slice(start, chunk_size).to_pandas())
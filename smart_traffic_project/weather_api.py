@@ -1,38 +1,166 @@
 import requests
 import json
+import threading
+import time
+import zlib
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 class WeatherAPI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url="http://api.openweathermap.org/data/2.5/weather",
+                 ttl=600, stale_ttl=3600, timeout=(3.05, 5), max_workers=4, climatology_seed=42,
+                 per_city_climatology=False, cache_size=1024, error_ttl=30):
         # Using a demo API key - replace with your own for production
         self.api_key = api_key or "demo_key"
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.base_url = base_url
+        # Fresh for ttl seconds; after that served stale for up to stale_ttl while a refresh runs
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # After a failed fetch, a city falls back without retrying for error_ttl seconds
+        self.error_ttl = error_ttl
+        self.cache_size = cache_size
+        self.timeout = timeout
+        # Offline fallback; the shared table is built up front so lookups never wait
+        self.climatology = WeatherClimatology(climatology_seed)
+        self.climatology.table()
+        self.per_city_climatology = per_city_climatology
+        
+        # One pooled keep-alive session shared by every fetch
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather')
+        
+        # City -> (weather, fetched at) and city -> last failure time, both LRU
+        self._cache = OrderedDict()
+        self._failures = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'failure_hits': 0,
+                         'fetches': 0, 'errors': 0, 'evictions': 0, 'fetch_seconds': 0.0}
     
     def get_weather_data(self, city="Bangalore"):
         """Get current weather data for a city"""
         try:
             if self.api_key == "demo_key":
                 # Return mock data for demo purposes
-                return self._get_mock_weather_data()
+                return self._get_mock_weather_data(city)
+            
+            return self.get_weather_data_async(city).result()
+        
+        except Exception as e:
+            print(f"Weather API error: {e}")
+            return self._get_mock_weather_data(city)
+    
+    def get_weather_data_async(self, city="Bangalore"):
+        """Future resolving to the weather for a city, served from the cache when possible
+        
+        Concurrent callers asking for the same city share one in-flight request. Data
+        older than ttl is returned immediately while a background refresh runs. Within
+        error_ttl of a failed fetch the fallback is returned without asking again.
+        """
+        key = city.strip().lower()
+        with self._lock:
+            cached = self._cache.get(key)
+            age = time.time() - cached[1] if cached else None
+            if cached:
+                self._cache.move_to_end(key)
+            
+            if cached and age < self.ttl:
+                self._metrics['hits'] += 1
+                return _resolved(cached[0])
+            
+            failed_at = self._failures.get(key)
+            if failed_at is not None and time.time() - failed_at < self.error_ttl:
+                self._metrics['failure_hits'] += 1
+                return _resolved(cached[0] if cached else self._get_mock_weather_data(city))
+            
+            if cached and age < self.ttl + self.stale_ttl:
+                self._metrics['stale_hits'] += 1
+                self._start_fetch(key, city)
+                return _resolved(cached[0])
             
+            if key in self._in_flight:
+                self._metrics['coalesced'] += 1
+            else:
+                self._metrics['misses'] += 1
+            return self._start_fetch(key, city)
+    
+    def get_weather_many(self, cities):
+        """Weather for several cities, fetched concurrently"""
+        futures = {city: self.get_weather_data_async(city) for city in cities}
+        return {city: future.result() for city, future in futures.items()}
+    
+    def _start_fetch(self, key, city):
+        """Return the in-flight fetch for key, starting one if needed (caller holds the lock)"""
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self.executor.submit(self._fetch, key, city)
+            self._in_flight[key] = future
+        return future
+    
+    def _fetch(self, key, city):
+        start = time.perf_counter()
+        try:
             params = {
                 'q': city,
                 'appid': self.api_key,
                 'units': 'metric'
             }
             
-            response = requests.get(self.base_url, params=params)
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
             
             if response.status_code == 200:
-                data = response.json()
-                return self._parse_weather_data(data)
-            else:
-                print(f"Error fetching weather data: {response.status_code}")
-                return self._get_mock_weather_data()
-                
+                data = self._parse_weather_data(response.json())
+                with self._lock:
+                    self._remember(self._cache, key, (data, time.time()))
+                    self._failures.pop(key, None)
+                return data
+            
+            print(f"Error fetching weather data: {response.status_code}")
         except Exception as e:
             print(f"Weather API error: {e}")
-            return self._get_mock_weather_data()
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                self._metrics['fetches'] += 1
+                self._metrics['fetch_seconds'] += time.perf_counter() - start
+        
+        # Failed: fall back to whatever we last had for this city, then to mock data
+        with self._lock:
+            self._metrics['errors'] += 1
+            self._remember(self._failures, key, time.time())
+            cached = self._cache.get(key)
+        return cached[0] if cached else self._get_mock_weather_data(city)
+    
+    def _remember(self, entries, key, value):
+        """Store value as the most recent entry, evicting the oldest past cache_size (caller holds the lock)"""
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.cache_size:
+            entries.popitem(last=False)
+            self._metrics['evictions'] += 1
+    
+    def metrics(self):
+        """Cache hit rates and fetch latency"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['cached_cities'] = len(self._cache)
+            metrics['in_flight'] = len(self._in_flight)
+        lookups = metrics['hits'] + metrics['stale_hits'] + metrics['misses'] + metrics['coalesced']
+        metrics['hit_rate'] = (metrics['hits'] + metrics['stale_hits']) / lookups if lookups else 0.0
+        fetch_seconds = metrics.pop('fetch_seconds')
+        metrics['avg_fetch_ms'] = fetch_seconds / metrics['fetches'] * 1000 if metrics['fetches'] else 0.0
+        return metrics
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+            self._failures.clear()
     
     def _parse_weather_data(self, data):
         """Parse OpenWeatherMap API response"""
@@ -58,48 +186,100 @@ class WeatherAPI:
             print(f"Error parsing weather data: {e}")
             return self._get_mock_weather_data()
     
-    def predict_weather_for_day(self, day_of_week, hour):
-        """Predict weather based on day and hour"""
-        import random
+    def predict_weather_for_day(self, day_of_week, hour, city=None):
+        """Predict weather based on day and hour (repeatable climatology lookup)"""
+        return self.climatology.lookup(day_of_week, hour, city)
+    
+    def weather_for_hours(self, day_of_week, hour, city=None):
+        """Vectorized climatology lookup: arrays of day_of_week and hour -> arrays per field"""
+        arrays = self.climatology.arrays(city if self.per_city_climatology else None)
+        day_of_week, hour = np.asarray(day_of_week) % 7, np.asarray(hour) % 24
+        return {field: values[day_of_week, hour] for field, values in arrays.items()}
+    
+    def _get_mock_weather_data(self, city=None):
+        """Return mock weather data for demo"""
+        now = datetime.now()
+        return self.predict_weather_for_day(now.weekday(), now.hour,
+                                            city if self.per_city_climatology else None)
+
+class WeatherClimatology:
+    """Seeded table of typical weather for every (day_of_week, hour), optionally per city
+    
+    Tables are drawn once per city from the same day and hour patterns the demo has
+    always used, so the same inputs always give the same weather and downstream
+    predictions can be cached and benchmarked.
+    """
+    
+    DESCRIPTIONS = ["Clear sky", "Few clouds", "Scattered clouds", "Broken clouds"]
+    
+    def __init__(self, seed=42):
+        self.seed = seed
+        self._tables = {}
+        self._arrays = {}
+        self._lock = threading.Lock()
+    
+    def table(self, city=None):
+        """The 7 x 24 table of weather dicts for a city (None for the default table)"""
+        key = city.strip().lower() if city else None
+        table = self._tables.get(key)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(key)
+                if table is None:
+                    table = self._tables[key] = self._build(key)
+        return table
+    
+    def arrays(self, city=None):
+        """The numeric fields of table(city) as 7 x 24 arrays, for vectorized lookups"""
+        key = city.strip().lower() if city else None
+        arrays = self._arrays.get(key)
+        if arrays is None:
+            table = self.table(city)
+            arrays = self._arrays[key] = {
+                field: np.array([[cell[field] for cell in day] for day in table])
+                for field in ('temperature', 'humidity', 'rain_intensity')
+            }
+        return arrays
+    
+    def lookup(self, day_of_week, hour, city=None):
+        return dict(self.table(city)[int(day_of_week) % 7][int(hour) % 24])
+    
+    def _build(self, city_key):
+        entropy = [self.seed] if city_key is None else [self.seed, zlib.crc32(city_key.encode())]
+        rng = np.random.default_rng(entropy)
+        days = np.arange(7)[:, None]
+        hours = np.arange(24)[None, :]
+        weekend = np.broadcast_to(days >= 5, (7, 24))
         
         # Day-based weather patterns
-        if day_of_week in [5, 6]:  # Weekend
-            temp_modifier = random.uniform(-2, 2)
-            rain_chance = 0.3
-        else:  # Weekday
-            temp_modifier = random.uniform(-1, 1)
-            rain_chance = 0.2
-            
+        temp_modifier = np.where(weekend, rng.uniform(-2, 2, (7, 24)), rng.uniform(-1, 1, (7, 24)))
+        rain_chance = np.where(weekend, 0.3, 0.2)
+        
         # Hour-based temperature
-        if 6 <= hour <= 10:
-            temp_base = 22
-        elif 11 <= hour <= 15:
-            temp_base = 28
-        elif 16 <= hour <= 19:
-            temp_base = 26
-        else:
-            temp_base = 20
-            
-        temperature = temp_base + temp_modifier
-        humidity = random.uniform(45, 80)
-        rain_intensity = random.choice([0.0, 0.1, 0.3]) if random.random() < rain_chance else 0.0
+        temp_base = np.select([(hours >= 6) & (hours <= 10), (hours >= 11) & (hours <= 15),
+                               (hours >= 16) & (hours <= 19)], [22, 28, 26], default=20)
         
-        descriptions = [
-            "Clear sky", "Few clouds", "Scattered clouds", 
-            "Broken clouds", "Light rain", "Moderate rain"
-        ]
+        temperature = temp_base + temp_modifier
+        humidity = rng.uniform(45, 80, (7, 24))
+        rain_intensity = np.where(rng.random((7, 24)) < rain_chance,
+                                  rng.choice([0.0, 0.1, 0.3], (7, 24)), 0.0)
+        clear_description = rng.integers(0, len(self.DESCRIPTIONS), (7, 24))
         
-        return {
-            'temperature': round(temperature, 1),
-            'humidity': round(humidity, 1),
-            'rain_intensity': rain_intensity,
-            'weather_description': random.choice(descriptions),
+        return [[{
+            'temperature': round(float(temperature[day, hour]), 1),
+            'humidity': round(float(humidity[day, hour]), 1),
+            'rain_intensity': float(rain_intensity[day, hour]),
+            'weather_description': ("Moderate rain" if rain_intensity[day, hour] >= 0.3
+                                    else "Light rain" if rain_intensity[day, hour] > 0
+                                    else self.DESCRIPTIONS[clear_description[day, hour]]),
             'city': 'AI Predicted Weather'
-        }
-    
-    def _get_mock_weather_data(self):
-        """Return mock weather data for demo"""
-        return self.predict_weather_for_day(datetime.now().weekday(), datetime.now().hour)
+        } for hour in range(24)] for day in range(7)]
+
+def _resolved(value):
+    """Already-completed future, so cache hits and fetches share one interface"""
+    future = Future()
+    future.set_result(value)
+    return future
 
 # Example usage
 if __name__ == "__main__":
@@ -107,4 +287,4 @@ if __name__ == "__main__":
     data = weather.get_weather_data("Bangalore")
     print("Current Weather Data:")
     for key, value in data.items():
-        print(f"{key}: {value}")
\ No newline at end of file
+        print(f"{key}: {value}")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenWeatherMap current-weather endpoint, for tests and benchmarks
+
+    with WeatherStubServer(delay=0.05) as server:
+        weather_api = WeatherAPI(api_key='test', base_url=server.url)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class WeatherStubServer:
+    """Serves OpenWeatherMap-shaped JSON on 127.0.0.1 with a configurable delay
+
+    `requests` counts calls per city, `status_code` can be switched to simulate outages.
+    """
+
+    def __init__(self, delay=0.0, port=0):
+        self.delay = delay
+        self.status_code = 200
+        self.requests = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                city = parse_qs(urlparse(self.path).query).get('q', ['Bangalore'])[0]
+                with stub._lock:
+                    stub.requests[city] = stub.requests.get(city, 0) + 1
+                time.sleep(stub.delay)
+
+                body = json.dumps(stub.weather_for(city)).encode()
+                self.send_response(stub.status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/data/2.5/weather"
+        self._thread = None
+
+    @staticmethod
+    def weather_for(city):
+        """Deterministic weather per city name"""
+        seed = sum(ord(c) for c in city)
+        return {
+            'name': city,
+            'main': {'temp': 18 + seed % 15, 'humidity': 40 + seed % 50},
+            'weather': [{'description': 'light rain' if seed % 3 == 0 else 'clear sky'}],
+            **({'rain': {'1h': 2.5}} if seed % 3 == 0 else {})
+        }
+
+    def total_requests(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    server = WeatherStubServer(port=8089)
+    print(f"Weather stub serving on {server.url}")
+    server.start()
+    server._thread.join()